@@ -0,0 +1,122 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict
+
+from app.config import Config
+from app.logging.logging_config import get_logger
+
+logger = get_logger()
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when a bounded executor already has its maximum number of queued tasks."""
+
+
+class BoundedExecutor:
+    """
+    Thread pool for blocking vector store work, awaitable from the event loop.
+
+    The number of worker threads and the number of tasks waiting for a worker are both
+    bounded, and queue-depth and in-flight gauges are kept for monitoring.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        """
+        Initialize the executor.
+
+        Args:
+            name: Name of the executor, used as thread name prefix and in stats
+            max_workers: Number of worker threads
+            max_queue: Maximum number of tasks waiting for a worker thread
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-executor")
+        self._lock = Lock()
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking callable on the executor and wait for its result.
+
+        Args:
+            func: The blocking callable
+            *args: Positional arguments for the callable
+            **kwargs: Keyword arguments for the callable
+
+        Returns:
+            The return value of the callable
+
+        Raises:
+            ExecutorSaturatedError: If the queue of waiting tasks is full
+        """
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturatedError(f"Executor '{self.name}' is saturated ({self.queued} tasks queued)")
+            self.queued += 1
+
+        # Run in a copy of the caller's context so records logged by the task keep the request id
+        context = contextvars.copy_context()
+        try:
+            future = self._executor.submit(functools.partial(context.run, self._execute, func, *args, **kwargs))
+        except BaseException:
+            self._dequeue()
+            raise
+        # A task cancelled before a worker picked it up never reaches _execute
+        future.add_done_callback(lambda done: self._dequeue() if done.cancelled() else None)
+        return await asyncio.wrap_future(future)
+
+    def _dequeue(self) -> None:
+        with self._lock:
+            self.queued -= 1
+
+    def _execute(self, func: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            self.queued -= 1
+            self.in_flight += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the current gauges and counters of the executor.
+
+        Returns:
+            Dictionary with the executor limits, queue depth, in-flight and completed counts
+        """
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop accepting tasks and release the worker threads.
+
+        Args:
+            wait: Whether to wait for running tasks to finish
+        """
+        self._executor.shutdown(wait=wait)
+        logger.info(f"Executor '{self.name}' shut down")
+
+
+ingest_executor = BoundedExecutor("ingest", Config.INGEST_EXECUTOR_WORKERS, Config.INGEST_EXECUTOR_QUEUE_SIZE)
+search_executor = BoundedExecutor("search", Config.SEARCH_EXECUTOR_WORKERS, Config.SEARCH_EXECUTOR_QUEUE_SIZE)
@@ -1,4 +1,27 @@
 import os
 class Config:
     VECTOR_STORE_QUEUE = os.getenv("VECTOR_STORE_QUEUE", "vector_store_queue")
-    VECTOR_STORE_RESPONSE_QUEUE = os.getenv("VECTOR_STORE_RESPONSE_QUEUE", "vector_store_response_queue")
\ No newline at end of file
+    VECTOR_STORE_RESPONSE_QUEUE = os.getenv("VECTOR_STORE_RESPONSE_QUEUE", "vector_store_response_queue")
+    INGEST_EXECUTOR_WORKERS = int(os.getenv("INGEST_EXECUTOR_WORKERS", "2"))
+    INGEST_EXECUTOR_QUEUE_SIZE = int(os.getenv("INGEST_EXECUTOR_QUEUE_SIZE", "32"))
+    SEARCH_EXECUTOR_WORKERS = int(os.getenv("SEARCH_EXECUTOR_WORKERS", "8"))
+    SEARCH_EXECUTOR_QUEUE_SIZE = int(os.getenv("SEARCH_EXECUTOR_QUEUE_SIZE", "256"))
+    STREAM_INGEST_CHUNK_SIZE = int(os.getenv("STREAM_INGEST_CHUNK_SIZE", "256"))
+    STREAM_INGEST_MAX_CHUNK_SIZE = int(os.getenv("STREAM_INGEST_MAX_CHUNK_SIZE", "2048"))
+    STREAM_INGEST_MAX_LINE_BYTES = int(os.getenv("STREAM_INGEST_MAX_LINE_BYTES", str(4 * 1024 * 1024)))
+    QUEUE_WORKERS = int(os.getenv("QUEUE_WORKERS", "4"))
+    QUEUE_WORKER_BACKLOG = int(os.getenv("QUEUE_WORKER_BACKLOG", "100"))
+    REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+    RESPONSE_FLUSH_INTERVAL_MS = float(os.getenv("RESPONSE_FLUSH_INTERVAL_MS", "2"))
+    RESPONSE_FLUSH_MAX_BATCH = int(os.getenv("RESPONSE_FLUSH_MAX_BATCH", "100"))
+    RESPONSE_FLUSH_MAX_ATTEMPTS = int(os.getenv("RESPONSE_FLUSH_MAX_ATTEMPTS", "5"))
+    QUEUE_DRAIN_BATCH_SIZE = int(os.getenv("QUEUE_DRAIN_BATCH_SIZE", "32"))
+    QUEUE_BACKEND = os.getenv("QUEUE_BACKEND", "list")
+    STREAM_MAX_LENGTH = int(os.getenv("STREAM_MAX_LENGTH", "100000"))
+    STREAM_CONSUMER_GROUP = os.getenv("STREAM_CONSUMER_GROUP", "vector_store")
+    STREAM_CLAIM_IDLE_MS = int(os.getenv("STREAM_CLAIM_IDLE_MS", "60000"))
+    STREAM_CLAIM_INTERVAL_SECONDS = float(os.getenv("STREAM_CLAIM_INTERVAL_SECONDS", "5"))
+    STREAM_MAX_DELIVERIES = int(os.getenv("STREAM_MAX_DELIVERIES", "5"))
+    WARM_UP_ON_STARTUP = os.getenv("WARM_UP_ON_STARTUP", "true").lower() == "true"
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+    RESPONSE_ENCODING = os.getenv("RESPONSE_ENCODING", "json")
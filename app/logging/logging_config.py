@@ -1,8 +1,73 @@
 import os
+import json
+import queue
+import reprlib
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
-from datetime import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler, QueueHandler, QueueListener
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, Iterator, List, Optional
+
+# Id of the HTTP request or queue message being handled by the current thread or task
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else on a record was passed through extra=
+_RECORD_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {"message", "asctime", "request_id"}
+
+# Renders nested payloads without walking more of them than can be logged
+_payload_repr = reprlib.Repr()
+_payload_repr.maxlevel = 4
+_payload_repr.maxdict = 20
+_payload_repr.maxlist = 20
+_payload_repr.maxstring = 200
+_payload_repr.maxother = 200
+
+class RequestContextFilter(logging.Filter):
+    """Adds the id of the request being handled to each record, in the thread that logs it"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including fields passed through extra="""
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that only merges the message arguments in the logging thread and leaves
+    formatting to the handlers of the listener thread.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks hold frames that must not outlive the logging call
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
 class LogConfig:
     def __init__(self):
@@ -10,7 +75,13 @@ class LogConfig:
         self.log_level = os.getenv('LOG_LEVEL', 'INFO')
         self.max_bytes = 10 * 1024 * 1024  # 10MB
         self.backup_count = 5
-        self.log_format = '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
+        self.log_format = '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - [%(request_id)s] - %(message)s'
+        # text or json
+        self.log_format_type = os.getenv('LOG_FORMAT', 'text').lower()
+        # Write records from a background thread instead of the thread that logs them
+        self.log_async = os.getenv('LOG_ASYNC', 'true').lower() == 'true'
+        self.payload_max_chars = int(os.getenv('LOG_PAYLOAD_MAX_CHARS', '1000'))
+        self._listeners = []
         
         # Create separate loggers for different components
         self.loggers = {
@@ -37,8 +108,32 @@ class LogConfig:
 
     def _create_formatter(self):
         """Create a formatter for the logs"""
+        if self.log_format_type == 'json':
+            return JsonFormatter()
         return logging.Formatter(self.log_format)
 
+    def _attach(self, logger, handlers: List[logging.Handler]):
+        """Attach handlers to a logger, behind a queue drained by a background listener when logging is async"""
+        if not self.log_async:
+            for handler in handlers:
+                handler.addFilter(RequestContextFilter())
+                logger.addHandler(handler)
+            return
+
+        log_queue = queue.Queue(-1)
+        queue_handler = DeferredQueueHandler(log_queue)
+        queue_handler.addFilter(RequestContextFilter())
+        logger.addHandler(queue_handler)
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        self._listeners.append(listener)
+
+    def stop(self):
+        """Write out the queued records and stop the background listeners"""
+        for listener in self._listeners:
+            listener.stop()
+        self._listeners = []
+
     def _setup_app_logger(self):
         """Setup the main application logger"""
         self._ensure_log_dir()
@@ -52,7 +147,6 @@ class LogConfig:
             backupCount=self.backup_count
         )
         fh.setFormatter(self._create_formatter())
-        logger.addHandler(fh)
 
         # Error handler with ERROR level
         eh = RotatingFileHandler(
@@ -62,13 +156,12 @@ class LogConfig:
         )
         eh.level = logging.ERROR
         eh.setFormatter(self._create_formatter())
-        logger.addHandler(eh)
 
         # Console handler
         ch = logging.StreamHandler()
         ch.setFormatter(self._create_formatter())
-        logger.addHandler(ch)
 
+        self._attach(logger, [fh, eh, ch])
         return logger
 
     def _setup_access_logger(self):
@@ -84,7 +177,7 @@ class LogConfig:
             backupCount=30
         )
         fh.setFormatter(self._create_formatter())
-        logger.addHandler(fh)
+        self._attach(logger, [fh])
 
         return logger
 
@@ -100,7 +193,7 @@ class LogConfig:
             backupCount=self.backup_count
         )
         fh.setFormatter(self._create_formatter())
-        logger.addHandler(fh)
+        self._attach(logger, [fh])
 
         return logger
 
@@ -116,7 +209,7 @@ class LogConfig:
             backupCount=self.backup_count
         )
         fh.setFormatter(self._create_formatter())
-        logger.addHandler(fh)
+        self._attach(logger, [fh])
 
         return logger
 
@@ -126,7 +219,39 @@ class LogConfig:
 
 # Create a global instance
 log_config = LogConfig()
+atexit.register(log_config.stop)
 
 # Convenience function to get loggers
 def get_logger(name='app'):
-    return log_config.get_logger(name)
\ No newline at end of file
+    return log_config.get_logger(name)
+
+@contextmanager
+def bind_request_id(request_id: Optional[str]) -> Iterator[None]:
+    """
+    Attach a request id to every record logged inside the block.
+
+    Args:
+        request_id: Id of the request being handled
+    """
+    token = request_id_var.set(request_id)
+    try:
+        yield
+    finally:
+        request_id_var.reset(token)
+
+def truncate_for_log(value: Any, max_chars: Optional[int] = None) -> str:
+    """
+    Render a payload for logging, capped in size so large payloads stay cheap to log.
+
+    Args:
+        value: The payload
+        max_chars: Maximum number of characters, defaults to LOG_PAYLOAD_MAX_CHARS
+
+    Returns:
+        The rendered payload, truncated with a note of how much was left out
+    """
+    max_chars = log_config.payload_max_chars if max_chars is None else max_chars
+    text = value if isinstance(value, str) else _payload_repr.repr(value)
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... ({len(text) - max_chars} more chars)"
\ No newline at end of file
@@ -0,0 +1,49 @@
+import time
+import uuid
+
+from app.logging.logging_config import get_logger, request_id_var
+
+access_logger = get_logger("access")
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware binding a request id to every HTTP request and writing one structured
+    access record per request. The id is taken from the X-Request-ID header when present
+    and echoed back in the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            access_logger.info(
+                f"{scope['method']} {scope['path']} {status} {duration_ms:.1f}ms",
+                extra={"method": scope["method"], "path": scope["path"], "status": status, "duration_ms": duration_ms}
+            )
+            request_id_var.reset(token)
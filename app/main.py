@@ -1,27 +1,159 @@
-from fastapi import FastAPI, HTTPException, Query
-from typing import List, Dict, Any, Optional
-from app.vector_store.chroma_vector_store import chroma_vector_store
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+from typing import List, Dict, Any, Literal, Optional, Union
+from app.vector_store.chroma_vector_store import CollectionNotFoundError, chroma_vector_store
 from app.startup import start_service
-from pydantic import BaseModel
+from app.async_executor import ingest_executor, search_executor, ExecutorSaturatedError
+from pydantic import BaseModel, Field
 from app.logging.logging_config import get_logger
+from app.config import Config
+from app.metrics import RequestMetricsMiddleware
+from app.logging.request_context import RequestContextMiddleware
+from app.serialization import MSGPACK_MEDIA_TYPE, dumps, media_type_for
+import prometheus_client
+import json
 import traceback
 import uvicorn
+from threading import Thread
 logger = get_logger()
 
 app = FastAPI(title="Vector Store API", description="API for interacting with ChromaDB vector store")
+app.add_middleware(RequestMetricsMiddleware)
+app.add_middleware(RequestContextMiddleware)
+
+SearchField = Literal["ids", "documents", "metadata", "distances"]
+
+class SearchFilters(BaseModel):
+    path_prefix: Optional[str] = None
+    directory: Optional[str] = None
+    extension: Optional[Union[str, List[str]]] = None
+    max_depth: Optional[int] = Field(None, ge=0)
 
 class SearchRequest(BaseModel):
     query: str
-    n_results: int = 25
+    n_results: int = Field(25, ge=1)
+    include: Optional[List[SearchField]] = None
+    snippet_length: Optional[int] = Field(None, ge=1)
+    filters: Optional[SearchFilters] = None
+    mode: Literal["vector", "lexical", "hybrid", "auto"] = "vector"
 
 class SearchResponse(BaseModel):
     results: List[Dict[str, Any]]
 
+class BatchSearchQuery(BaseModel):
+    # Fields shared by every query of a batch live on BatchSearchRequest
+    query: str
+    n_results: int = Field(25, ge=1)
+
+class BatchSearchRequest(BaseModel):
+    queries: List[BatchSearchQuery]
+    include: Optional[List[SearchField]] = None
+    snippet_length: Optional[int] = Field(None, ge=1)
+    filters: Optional[SearchFilters] = None
+
+class BatchSearchResponse(BaseModel):
+    results: List[List[Dict[str, Any]]]
+
+class FanOutSearchRequest(BaseModel):
+    query: str
+    n_results: int = Field(25, ge=1)
+    collection_name: Optional[str] = None
+    collection_names: List[str] = []
+    user_id: Optional[str] = None
+    max_concurrency: Optional[int] = None
+    include: Optional[List[SearchField]] = None
+    snippet_length: Optional[int] = Field(None, ge=1)
+    filters: Optional[SearchFilters] = None
+
+class HnswParams(BaseModel):
+    construction_ef: Optional[int] = Field(None, ge=1)
+    M: Optional[int] = Field(None, ge=2)
+    search_ef: Optional[int] = Field(None, ge=1)
+    num_threads: Optional[int] = Field(None, ge=1)
+    batch_size: Optional[int] = Field(None, gt=2)
+    sync_threshold: Optional[int] = Field(None, gt=2)
+    resize_factor: Optional[float] = Field(None, gt=1)
+
+class CreateCollectionRequest(BaseModel):
+    hnsw: Optional[HnswParams] = None
+    # Project directory of the collection; path filters are relative to it
+    base_path: Optional[str] = None
+
 class AddRequest(BaseModel):
     item_dict: Dict[str, str]
+    sync: bool = False
+    remove_missing: bool = False
+
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(request, exc: ExecutorSaturatedError):
+    logger.warning(str(exc))
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+def encoded_response(payload: Dict[str, Any], accept: Optional[str]) -> Response:
+    """
+    Serialize a search payload with orjson, or msgpack when the client accepts it.
+
+    Args:
+        payload: The response payload
+        accept: Value of the Accept header
 
+    Returns:
+        Response with the encoded payload
+    """
+    media_type = media_type_for(accept)
+    encoding = "msgpack" if media_type == MSGPACK_MEDIA_TYPE else "json"
+    return Response(content=dumps(payload, encoding), media_type=media_type)
+
+def filter_dict(filters: Optional[SearchFilters]) -> Optional[Dict[str, Any]]:
+    return filters.dict(exclude_none=True) if filters else None
+
+@app.on_event("startup")
+def start_warm_up():
+    if Config.WARM_UP_ON_STARTUP:
+        # Warm up in the background so the port binds, and liveness checks pass, right away
+        Thread(target=warm_up_vector_store, name="vector-store-warm-up", daemon=True).start()
+    else:
+        # Nothing will warm the model up; gating traffic on it would keep the service unready forever
+        chroma_vector_store.ready = True
+
+def warm_up_vector_store():
+    try:
+        chroma_vector_store.warm_up()
+    except Exception:
+        logger.error(f"Vector store warm-up failed: {traceback.format_exc()}")
+
+@app.get("/health/live")
+async def liveness():
+    """
+    Liveness check; does not touch the vector store.
+
+    Returns:
+        JSON response indicating the process is up
+    """
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness check; ready only once the model has run a warm-up encode, or right away
+    when WARM_UP_ON_STARTUP is off.
+
+    Returns:
+        JSON response indicating readiness, with status 503 while warming up
+    """
+    if not chroma_vector_store.ready:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
+
+@app.on_event("shutdown")
+def shutdown_executors():
+    ingest_executor.shutdown(wait=False)
+    search_executor.shutdown(wait=False)
+
+# Cheap metadata endpoints are plain functions so FastAPI runs them in its threadpool,
+# while embedding and query work goes through the bounded ingest and search executors.
 @app.get("/collections/{collection_name}/exists")
-async def check_collection(collection_name: str):
+def check_collection(collection_name: str):
     """
     Check if a collection exists in the vector store.
 
@@ -38,12 +170,14 @@ async def check_collection(collection_name: str):
     return {"exists": collection is not None}
 
 @app.post("/collections")
-async def create_collection(collection_name: str = Query(..., description="Name of the collection to create")):
+def create_collection(collection_name: str = Query(..., description="Name of the collection to create"),
+                      request: Optional[CreateCollectionRequest] = None):
     """
     Create a new collection in the vector store.
 
     Args:
         collection_name: Name of the collection to check
+        request: Optional body with the HNSW parameters and the base path of the new collection
 
     Returns:
         JSON response indicating if the collection exists
@@ -51,7 +185,9 @@ async def create_collection(collection_name: str = Query(..., description="Name
     collection = chroma_vector_store.get_collection(collection_name=collection_name)
     if collection is not None:
         return {"message": f"{collection} already exists"}
-    collection = chroma_vector_store.create_collection(collection_name)
+    hnsw = request.hnsw.dict(exclude_none=True) if request and request.hnsw else None
+    base_path = request.base_path if request else None
+    collection = chroma_vector_store.create_collection(collection_name, hnsw=hnsw, base_path=base_path)
     return {"message": f"{collection} created successfully!"}
 
 @app.post("/collections/{collection_name}/items")
@@ -61,7 +197,8 @@ async def add_items_to_collection(collection_name: str, request: AddRequest):
 
     Args:
         collection_name: Name of the collection to add items to
-        request: Request containing dictionary of items to add
+        request: Request containing dictionary of items to add. With sync set, items are
+            keyed by source path and only new or changed items are embedded.
 
     Returns:
         JSON response indicating the status of the operation
@@ -72,19 +209,122 @@ async def add_items_to_collection(collection_name: str, request: AddRequest):
     if not data:
         raise HTTPException(status_code=400, detail="No data provided to add")
     
-    collection = chroma_vector_store.get_collection(collection_name=collection_name)
+    # A registry miss reads the store, so the lookup runs on the pool of the ingest it precedes
+    collection = await ingest_executor.run(chroma_vector_store.get_collection, collection_name=collection_name)
     if collection is None:
         raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
     
     try:
-        chroma_vector_store.add_dictionary(collection_name, data)
+        if request.sync:
+            counts = await ingest_executor.run(
+                chroma_vector_store.sync_dictionary, collection_name, data, remove_missing=request.remove_missing
+            )
+            return {"message": "Data successfully synchronized with collection", **counts}
+        await ingest_executor.run(chroma_vector_store.add_dictionary, collection_name, data)
         return {"message": "Data successfully added to collection"}
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
         logger.error(f"Unable to add data to collection: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Unable to add data to the collection: {str(e)}")
 
+async def _read_ndjson_items(request: Request):
+    """
+    Incrementally parse a newline-delimited JSON request body into (source, document) pairs.
+    Records are either {"source": ..., "document": ...} or a mapping of sources to documents.
+    """
+    buffer = b""
+    line_number = 0
+
+    def parse(line: bytes):
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError("record is not a JSON object")
+        if "source" in record and "document" in record:
+            return [(str(record["source"]), str(record["document"]))]
+        return [(str(source), str(document)) for source, document in record.items()]
+
+    async for chunk in request.stream():
+        buffer += chunk
+        if len(buffer) > Config.STREAM_INGEST_MAX_LINE_BYTES and b"\n" not in buffer:
+            raise ValueError(f"line {line_number + 1} exceeds {Config.STREAM_INGEST_MAX_LINE_BYTES} bytes")
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                try:
+                    for item in parse(line):
+                        yield item
+                except ValueError as e:
+                    raise ValueError(f"invalid record on line {line_number}: {str(e)}")
+    if buffer.strip():
+        try:
+            for item in parse(buffer):
+                yield item
+        except ValueError as e:
+            raise ValueError(f"invalid record on line {line_number + 1}: {str(e)}")
+
+@app.post("/collections/{collection_name}/items/stream")
+async def stream_items_to_collection(
+    collection_name: str,
+    request: Request,
+    chunk_size: int = Query(None, ge=1, description="Number of records embedded and committed per chunk"),
+    sync: bool = Query(False, description="Synchronize items by source path instead of inserting them")
+):
+    """
+    Add items to a collection from a newline-delimited JSON body. Records are read incrementally
+    and committed in chunks; the body is not read further until the previous chunk is committed,
+    so memory stays bounded regardless of the payload size.
+
+    Args:
+        collection_name: Name of the collection to add items to
+        request: Request whose body holds one {"source": ..., "document": ...} record per line
+        chunk_size: Number of records committed per chunk
+        sync: Whether to synchronize items by source path instead of inserting them
+
+    Returns:
+        JSON response with per-chunk progress and the final count
+    """
+    # A registry miss reads the store, so the lookup runs on the pool of the ingest it precedes
+    collection = await ingest_executor.run(chroma_vector_store.get_collection, collection_name=collection_name)
+    if collection is None:
+        raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+
+    chunk_size = min(chunk_size or Config.STREAM_INGEST_CHUNK_SIZE, Config.STREAM_INGEST_MAX_CHUNK_SIZE)
+    add = chroma_vector_store.sync_dictionary if sync else chroma_vector_store.add_dictionary
+    chunks = []
+    total = 0
+
+    async def commit(items):
+        nonlocal total
+        await ingest_executor.run(add, collection_name, items)
+        total += len(items)
+        chunks.append({"chunk": len(chunks), "items": len(items), "total": total})
+
+    items = {}
+    try:
+        async for source, document in _read_ndjson_items(request):
+            items[source] = document
+            if len(items) >= chunk_size:
+                await commit(items)
+                items = {}
+        if items:
+            await commit(items)
+    except ExecutorSaturatedError:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"{str(e)}; {total} items were committed before the error")
+    except Exception as e:
+        logger.error(f"Unable to stream data to collection: {traceback.format_exc()}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Unable to add data to the collection: {str(e)}; {total} items were committed before the error"
+        )
+
+    return {"message": "Data successfully added to collection", "chunks": chunks, "total": total}
+
 @app.delete("/collections/{collection_name}")
-async def delete_collection(collection_name: str):
+def delete_collection(collection_name: str):
     """
     Delete a collection from the vector store.
 
@@ -105,35 +345,135 @@ async def delete_collection(collection_name: str):
     response_model=SearchResponse,
     responses={
         200: {"description": "Successful search results"},
+        400: {"description": "Invalid search parameters"},
         404: {"description": "Collection not found"},
         500: {"description": "Internal server error"}
     }
 )
-async def search(collection_name: str, request: SearchRequest):
+async def search(collection_name: str, request: SearchRequest, accept: Optional[str] = Header(None)):
     """
     Search for documents in a collection.
 
     Args:
         collection_name: Name of the collection to search in
-        request: Search request containing query and number of results
+        request: Search request containing query, number of results, the fields to return, path filters and search mode
+        accept: Accept header; "application/msgpack" returns a msgpack body
 
     Returns:
         Search results from the vector store
     """
     try:
-        results = chroma_vector_store.search(
+        results = await search_executor.run(
+            chroma_vector_store.search,
             query=request.query,
             n_results=request.n_results,
-            collection_name=collection_name
+            collection_name=collection_name,
+            include=request.include,
+            snippet_length=request.snippet_length,
+            filters=filter_dict(request.filters),
+            mode=request.mode
         )
-        return {"results": results}
-    except KeyError:
+        return encoded_response({"results": results}, accept)
+    except ExecutorSaturatedError:
+        raise
+    except CollectionNotFoundError:
         raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+    except ValueError as e:
+        # Invalid include fields, filters or search mode
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/collections/{collection_name}/search/batch",
+    response_model=BatchSearchResponse,
+    responses={
+        200: {"description": "Search results of each query, in request order"},
+        400: {"description": "Invalid search parameters"},
+        404: {"description": "Collection not found"},
+        500: {"description": "Internal server error"}
+    }
+)
+async def search_batch(collection_name: str, request: BatchSearchRequest, accept: Optional[str] = Header(None)):
+    """
+    Search several queries in a collection with one embedding pass and one query call.
+
+    Args:
+        collection_name: Name of the collection to search in
+        request: Batch search request containing the queries, their number of results and the fields to return
+        accept: Accept header; "application/msgpack" returns a msgpack body
+
+    Returns:
+        Search results of each query, in request order
+    """
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="No queries provided")
+    try:
+        results = await search_executor.run(
+            chroma_vector_store.search_batch,
+            queries=[query.dict() for query in request.queries],
+            collection_name=collection_name,
+            include=request.include,
+            snippet_length=request.snippet_length,
+            filters=filter_dict(request.filters)
+        )
+        return encoded_response({"results": results}, accept)
+    except ExecutorSaturatedError:
+        raise
+    except CollectionNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+    except ValueError as e:
+        # Invalid include fields, filters or search mode
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/search",
+    response_model=SearchResponse,
+    responses={
+        200: {"description": "Merged search results across collections"},
+        400: {"description": "No collections to search in"},
+        500: {"description": "Internal server error"}
+    }
+)
+async def search_collections(request: FanOutSearchRequest, accept: Optional[str] = Header(None)):
+    """
+    Search across several collections, given by name and/or by user id, and merge
+    the hits into one top-k by distance.
+
+    Args:
+        request: Fan-out search request containing the query, the target collections and the concurrency limit
+        accept: Accept header; "application/msgpack" returns a msgpack body
+
+    Returns:
+        Merged search results, each with the name of its collection
+    """
+    collection_names = list(request.collection_names)
+    if request.collection_name:
+        collection_names.append(request.collection_name)
+    if not collection_names and not request.user_id:
+        raise HTTPException(status_code=400, detail="Provide collection_names or user_id to search in")
+    try:
+        results = await search_executor.run(
+            chroma_vector_store.search_collections,
+            query=request.query,
+            n_results=request.n_results,
+            collection_names=collection_names,
+            user_id=request.user_id,
+            max_concurrency=request.max_concurrency,
+            include=request.include,
+            snippet_length=request.snippet_length,
+            filters=filter_dict(request.filters)
+        )
+        return encoded_response({"results": results}, accept)
+    except ExecutorSaturatedError:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/collections")
-async def list_collections():
+def list_collections():
     """"
     List all collections in the vector store.
 
@@ -147,6 +487,56 @@ async def list_collections():
         logger.error(f"Error in list_collections endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to list collections: {str(e)}")
 
+@app.get("/executors/stats")
+async def executor_stats():
+    """
+    Get queue-depth and in-flight gauges of the ingest and search executors.
+
+    Returns:
+        Stats for each executor
+    """
+    return {"executors": [ingest_executor.stats(), search_executor.stats()]}
+
+@app.get("/embeddings/stats")
+async def embedding_stats():
+    """
+    Get embedding cache counters and query batch-size and wait-time histograms.
+
+    Returns:
+        Embedding stats of the vector store
+    """
+    return chroma_vector_store.embedding_stats()
+
+@app.get("/search/cache/stats")
+async def search_cache_stats():
+    """
+    Get hit, miss and entry counts and the size in bytes of the search result cache.
+
+    Returns:
+        Search cache stats of the vector store
+    """
+    return chroma_vector_store.search_cache_stats()
+
+@app.get("/residency/stats")
+async def residency_stats():
+    """
+    Get resident and evicted collection counts of the collection memory budget.
+
+    Returns:
+        Residency stats of the vector store
+    """
+    return chroma_vector_store.residency_stats()
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus metrics of the API process.
+
+    Returns:
+        Metrics in the Prometheus text exposition format
+    """
+    return Response(prometheus_client.generate_latest(), media_type=prometheus_client.CONTENT_TYPE_LATEST)
+
 
 def start_api_service():
     """
@@ -1,24 +1,45 @@
 import redis
-import json
-from typing import Callable, Any
-from threading import Thread, Event
+import queue
+from collections import defaultdict
+from itertools import count
+from typing import Callable, Any, List, Optional
+from threading import Thread, Event, Lock
 from app.logging.logging_config import get_logger
+from app.config import Config
+from app.serialization import dumps, loads
+from app.metrics import QUEUE_MESSAGE_AGE
 from time import sleep
 import os
+import time
 
 logger = get_logger()
 
+_connection_pool = None
+_connection_pool_lock = Lock()
+
+def get_connection_pool() -> redis.ConnectionPool:
+    """
+    Get the connection pool shared by every publisher and subscriber of the process
+
+    Returns:
+        redis.ConnectionPool: The shared connection pool
+    """
+    global _connection_pool
+    with _connection_pool_lock:
+        if _connection_pool is None:
+            _connection_pool = redis.BlockingConnectionPool(
+                host=os.getenv("REDIS_HOST"),
+                port=os.getenv("REDIS_PORT"),
+                max_connections=Config.REDIS_MAX_CONNECTIONS
+            )
+        return _connection_pool
+
 class RedisPublisher:
     def __init__(self):
         """
-        Initialize Redis Publisher
-        
-        Args:
-            host (str): Redis host address
-            port (int): Redis port number
-            db (int): Redis database number
+        Initialize Redis Publisher using the shared connection pool
         """
-        self.redis_client = redis.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"))
+        self.redis_client = redis.Redis(connection_pool=get_connection_pool())
     
     def publish(self, channel: str, message: Any) -> None:
         """
@@ -26,51 +47,287 @@ class RedisPublisher:
         
         Args:
             channel (str): The channel to publish to
-            message (Any): The message to publish (will be JSON serialized)
+            message (Any): The message to publish; anything but str or bytes is JSON serialized
         """
         try:
-            if not isinstance(message, str):
-                message = json.dumps(message)
+            if not isinstance(message, (str, bytes)):
+                message = dumps(message)
             self.redis_client.rpush(channel, message)
             logger.debug(f"Published message to channel {channel}")
         except Exception as e:
             logger.error(f"Error publishing message to channel {channel}: {str(e)}")
             raise
 
+class BufferedRedisPublisher(RedisPublisher):
+    def __init__(self, flush_interval_ms: float = 2.0, max_batch_size: int = 100, max_attempts: int = 5):
+        """
+        Initialize a publisher that buffers messages and pushes them with one pipeline per flush.
+        A flush happens when max_batch_size messages are buffered or flush_interval_ms after the
+        first buffered message, whichever comes first. When a flush fails, its messages go back to
+        the front of the buffer and the flusher retries with exponential backoff; after max_attempts
+        consecutive failures the buffered messages are dropped and the error is logged.
+
+        Args:
+            flush_interval_ms (float): Maximum time a message stays buffered
+            max_batch_size (int): Number of buffered messages that triggers an immediate flush
+            max_attempts (int): Number of failed flushes after which the buffered messages are dropped
+        """
+        super().__init__()
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.max_attempts = max(max_attempts, 1)
+        self._failed_attempts = 0
+        self._buffer = []
+        self._lock = Lock()
+        # Serializes flushes so buffered messages reach Redis in publish order
+        self._flush_lock = Lock()
+        self._pending = Event()
+        self._closed = Event()
+        self.thread = Thread(target=self._flush_loop, name="redis-publisher-flusher", daemon=True)
+        self.thread.start()
+
+    def publish(self, channel: str, message: Any) -> None:
+        """
+        Buffer a message for a specific channel
+        
+        Args:
+            channel (str): The channel to publish to
+            message (Any): The message to publish; anything but str or bytes is JSON serialized
+        """
+        if not isinstance(message, (str, bytes)):
+            message = dumps(message)
+        with self._lock:
+            self._buffer.append((channel, message))
+            # While Redis is failing, retries are left to the flusher's backoff
+            full = len(self._buffer) >= self.max_batch_size and not self._failed_attempts
+        if full:
+            self.flush()
+        else:
+            self._pending.set()
+
+    def flush(self) -> bool:
+        """
+        Push all buffered messages, grouped per channel, in a single pipeline
+
+        Returns:
+            bool: False if the pipeline failed and the messages were put back in the buffer
+        """
+        with self._flush_lock:
+            with self._lock:
+                messages, self._buffer = self._buffer, []
+            if not messages:
+                return True
+            by_channel = defaultdict(list)
+            for channel, message in messages:
+                by_channel[channel].append(message)
+            try:
+                pipeline = self.redis_client.pipeline(transaction=False)
+                for channel, channel_messages in by_channel.items():
+                    self._enqueue(pipeline, channel, channel_messages)
+                pipeline.execute()
+                logger.debug(f"Published {len(messages)} messages to {len(by_channel)} channel(s)")
+            except Exception as e:
+                return self._requeue(messages, e)
+            self._failed_attempts = 0
+            return True
+
+    def _requeue(self, messages: List[Any], error: Exception) -> bool:
+        """Put the messages of a failed flush back in front of the buffer, or drop them once attempts run out"""
+        self._failed_attempts += 1
+        if self._failed_attempts >= self.max_attempts:
+            with self._lock:
+                dropped = len(messages) + len(self._buffer)
+                self._buffer = []
+            self._failed_attempts = 0
+            logger.error(f"Dropped {dropped} buffered messages after {self.max_attempts} failed flushes: {str(error)}")
+            return True
+        with self._lock:
+            self._buffer[:0] = messages
+        logger.warning(f"Error publishing {len(messages)} buffered messages "
+                       f"(attempt {self._failed_attempts} of {self.max_attempts}): {str(error)}")
+        return False
+
+    def _retry_delay(self) -> float:
+        # 0.1s after the first failure, doubling up to 5s
+        return min(0.1 * 2 ** max(self._failed_attempts - 1, 0), 5.0)
+
+    def _enqueue(self, pipeline, channel: str, messages: List[str]) -> None:
+        """Add the commands pushing messages to a channel to the pipeline"""
+        pipeline.rpush(channel, *messages)
+
+    def close(self) -> None:
+        """Flush the remaining messages, retrying failed flushes, and stop the background flusher"""
+        self._closed.set()
+        self._pending.set()
+        self.thread.join()
+        while not self.flush():
+            sleep(self._retry_delay())
+
+    def _flush_loop(self) -> None:
+        while not self._closed.is_set():
+            self._pending.wait()
+            self._pending.clear()
+            # Give messages finishing at the same time a chance to share the pipeline
+            self._closed.wait(self.flush_interval)
+            if not self.flush():
+                self._closed.wait(self._retry_delay())
+                self._pending.set()
+
 class RedisSubscriber:
     def __init__(self):
         """
-        Initialize Redis Subscriber
+        Initialize Redis Subscriber using the shared connection pool
         """
-        self.redis_client = redis.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"))
+        self.redis_client = redis.Redis(connection_pool=get_connection_pool())
         self.pubsub = self.redis_client.pubsub()
         self.thread = None
         self._running = Event()
+        self._worker_queues = []
+        self._worker_threads = []
+        self._round_robin = count()
 
-    def start(self, channel, callback) -> None:
+    def start(self, channel, callback, workers: int = 1, partition_key: Optional[Callable[[Any], Any]] = None,
+              worker_backlog: int = 100, batch_size: int = 1) -> None:
         """Start listening for messages
                 
         Args:
             channel (str): Channel to subscribe to
             callback (Callable): Function to call when message is received
+            workers (int): Number of worker threads running the callback; 1 runs it on the listener thread
+            partition_key (Callable): Function returning the ordering key of a message. Messages with the
+                same key are handled in order by the same worker, messages without a key are spread round-robin
+            worker_backlog (int): Maximum number of messages waiting per worker before the listener blocks
+            batch_size (int): Maximum number of messages drained from the queue in one read. When greater
+                than 1, the callback receives a list of consecutive messages instead of a single message
         """
         if self.thread is not None and self.thread.is_alive():
             raise RuntimeError("Subscriber already started")
         self.channel = channel
+        self._message_age = QUEUE_MESSAGE_AGE.labels(channel)
         self._running.set()
         self.callback = callback
+        self.partition_key = partition_key
+        self.batch_size = max(batch_size, 1)
+        self.worker_backlog = worker_backlog
+        self._supports_lpop_count = True
+        if workers > 1:
+            self._worker_queues = [queue.Queue(maxsize=worker_backlog) for _ in range(workers)]
+            self._worker_threads = [
+                Thread(target=self._work, args=(worker_queue,), name=f"{channel}-worker-{index}")
+                for index, worker_queue in enumerate(self._worker_queues)
+            ]
+            for worker_thread in self._worker_threads:
+                worker_thread.start()
         self.thread = Thread(target=self._listen)
         self.thread.start()
-        logger.info(f"Started subscriber for channel {self.channel}")
+        logger.info(f"Started subscriber for channel {self.channel} with {max(workers, 1)} worker(s)")
 
     def stop(self) -> None:
-        """Stop listening for messages"""
+        """Stop listening for messages, then let the workers drain the messages already received"""
         self._running.clear()
         if self.thread:
             self.thread.join()
             self.thread = None
+        for worker_queue in self._worker_queues:
+            worker_queue.put(None)
+        for worker_thread in self._worker_threads:
+            worker_thread.join()
+        self._worker_queues = []
+        self._worker_threads = []
         logger.info(f"Stopped subscriber for channel {self.channel}")
 
+    def _dispatch(self, messages: List[Any]) -> None:
+        """Run the callback inline, or hand each message to the worker owning its partition"""
+        self._observe_age(messages)
+        if not self._worker_queues:
+            self._run_callback(messages)
+            return
+        for message in messages:
+            key = self._partition_of(message)
+            index = hash(key) if key is not None else next(self._round_robin)
+            # Blocks when the worker is backlogged, which stops further reads from the queue
+            self._worker_queues[index % len(self._worker_queues)].put(message)
+
+    def _observe_age(self, messages: List[Any]) -> None:
+        now = time.time()
+        for message in messages:
+            sent_at = self._sent_at(message)
+            if sent_at is not None:
+                self._message_age.observe(max(now - sent_at, 0.0))
+
+    def _sent_at(self, message: Any) -> Optional[float]:
+        """Epoch time the producer sent the message, taken from its optional sent_at field"""
+        if isinstance(message, dict) and isinstance(message.get("sent_at"), (int, float)):
+            return float(message["sent_at"])
+        return None
+
+    def depth(self) -> float:
+        """Number of messages waiting in the queue, NaN when Redis cannot be reached
+
+        Returns:
+            float: The queue length
+        """
+        try:
+            return float(self.redis_client.llen(self.channel))
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Could not read the length of queue {self.channel}: {str(e)}")
+            return float("nan")
+
+    def _partition_of(self, message: Any) -> Any:
+        return self.partition_key(message) if self.partition_key else None
+
+    def _invoke(self, messages: List[Any]) -> None:
+        """Invoke the callback with the whole batch, or once per message when batching is off"""
+        if self.batch_size > 1:
+            self.callback(messages)
+        else:
+            for message in messages:
+                self.callback(message)
+
+    def _run_callback(self, messages: List[Any]) -> None:
+        try:
+            self._invoke(messages)
+        except Exception as e:
+            logger.error(f"Error handling message from queue {self.channel}: {str(e)}")
+
+    def _work(self, worker_queue: queue.Queue) -> None:
+        """Run the callback for messages of one worker until the stop sentinel is received"""
+        stopping = False
+        while not stopping:
+            message = worker_queue.get()
+            if message is None:
+                return
+            messages = [message]
+            while len(messages) < self.batch_size:
+                try:
+                    message = worker_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if message is None:
+                    stopping = True
+                    break
+                messages.append(message)
+            self._run_callback(messages)
+
+    def _drain(self, count: int) -> List[Any]:
+        """Pop up to count more messages without blocking, in one round trip"""
+        if count <= 0:
+            return []
+        if self._supports_lpop_count:
+            try:
+                return self.redis_client.lpop(self.channel, count) or []
+            except redis.exceptions.ResponseError:
+                # LPOP with a count needs Redis 6.2; fall back to a pipeline of single pops
+                self._supports_lpop_count = False
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for _ in range(count):
+            pipeline.lpop(self.channel)
+        return [data for data in pipeline.execute() if data is not None]
+
+    @staticmethod
+    def _parse(data: Any) -> Any:
+        return loads(data)
+
     def _listen(self) -> None:
         """Listen for messages (queue mode) and invoke callback"""
         while self._running.is_set():
@@ -80,15 +337,8 @@ class RedisSubscriber:
                     continue
 
                 _, data = result
-                if isinstance(data, bytes):
-                    data = data.decode('utf-8')
-
-                try:
-                    parsed_data = json.loads(data)
-                except json.JSONDecodeError:
-                    parsed_data = data
-
-                self.callback(parsed_data)
+                batch = [data] + self._drain(self.batch_size - 1)
+                self._dispatch([self._parse(item) for item in batch])
             except Exception as e:
                 logger.error(f"Error listening to queue {self.channel}: {str(e)}")
                 if self._running.is_set():
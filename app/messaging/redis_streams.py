@@ -0,0 +1,235 @@
+import redis
+import os
+import socket
+import time
+from threading import Condition
+from typing import Any, List, Optional
+from time import sleep
+from app.messaging.redis_pubsub import RedisPublisher, BufferedRedisPublisher, RedisSubscriber
+from app.logging.logging_config import get_logger
+from app.config import Config
+from app.serialization import dumps
+
+logger = get_logger()
+
+class _StreamMessage:
+    """A parsed stream entry together with the id needed to acknowledge it"""
+    __slots__ = ("entry_id", "payload")
+
+    def __init__(self, entry_id, payload):
+        self.entry_id = entry_id
+        self.payload = payload
+
+class RedisStreamPublisher(RedisPublisher):
+    def __init__(self, max_length: int = None):
+        """
+        Initialize a publisher appending messages to Redis Streams
+
+        Args:
+            max_length (int): Approximate maximum number of entries kept per stream
+        """
+        super().__init__()
+        self.max_length = max_length if max_length is not None else Config.STREAM_MAX_LENGTH
+
+    def publish(self, channel: str, message: Any) -> None:
+        """
+        Append a message to a specific stream, trimming the stream to its maximum length
+
+        Args:
+            channel (str): The stream to publish to
+            message (Any): The message to publish; anything but str or bytes is JSON serialized
+        """
+        try:
+            if not isinstance(message, (str, bytes)):
+                message = dumps(message)
+            self.redis_client.xadd(channel, {"data": message}, maxlen=self.max_length, approximate=True)
+            logger.debug(f"Published message to stream {channel}")
+        except Exception as e:
+            logger.error(f"Error publishing message to stream {channel}: {str(e)}")
+            raise
+
+class BufferedRedisStreamPublisher(BufferedRedisPublisher):
+    def __init__(self, flush_interval_ms: float = 2.0, max_batch_size: int = 100, max_attempts: int = 5,
+                 max_length: int = None):
+        """
+        Initialize a buffered publisher appending messages to Redis Streams with one pipeline per flush
+
+        Args:
+            flush_interval_ms (float): Maximum time a message stays buffered
+            max_batch_size (int): Number of buffered messages that triggers an immediate flush
+            max_attempts (int): Number of failed flushes after which the buffered messages are dropped
+            max_length (int): Approximate maximum number of entries kept per stream
+        """
+        self.max_length = max_length if max_length is not None else Config.STREAM_MAX_LENGTH
+        super().__init__(flush_interval_ms=flush_interval_ms, max_batch_size=max_batch_size, max_attempts=max_attempts)
+
+    def _enqueue(self, pipeline, channel: str, messages: List[str]) -> None:
+        for message in messages:
+            pipeline.xadd(channel, {"data": message}, maxlen=self.max_length, approximate=True)
+
+class RedisStreamSubscriber(RedisSubscriber):
+    def __init__(self, group: str = None, consumer: str = None):
+        """
+        Initialize a Redis Streams consumer-group subscriber. Entries are acknowledged only after
+        the callback returns; entries left pending by a crashed consumer are claimed by the others
+        once they have been idle for STREAM_CLAIM_IDLE_MS.
+
+        Args:
+            group (str): Consumer group shared by every node consuming the stream
+            consumer (str): Name of this consumer within the group, unique per process
+        """
+        super().__init__()
+        self.group = group or Config.STREAM_CONSUMER_GROUP
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self._last_claim = 0.0
+        # Entries dispatched by this consumer and not yet acknowledged or failed. They are pending
+        # in the group while they wait in a worker backlog or run, so claiming must skip them
+        self._in_progress = set()
+        self._in_progress_changed = Condition()
+
+    def start(self, channel, callback, **kwargs) -> None:
+        """Create the consumer group if needed, then start consuming the stream
+
+        Args:
+            channel (str): Stream to consume
+            callback (Callable): Function to call when message is received
+            **kwargs: Worker pool and batching options, see RedisSubscriber.start
+        """
+        try:
+            self.redis_client.xgroup_create(channel, self.group, id="0", mkstream=True)
+            logger.info(f"Created consumer group {self.group} on stream {channel}")
+        except redis.exceptions.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        super().start(channel, callback, **kwargs)
+
+    def _sent_at(self, message: _StreamMessage) -> Optional[float]:
+        # Entry ids start with the millisecond time Redis appended the entry
+        entry_id = message.entry_id.decode() if isinstance(message.entry_id, bytes) else message.entry_id
+        return int(entry_id.split("-")[0]) / 1000
+
+    def depth(self) -> float:
+        """Entries of the stream not yet acknowledged by the consumer group: pending plus unread
+
+        Returns:
+            float: The number of waiting entries
+        """
+        try:
+            for group in self.redis_client.xinfo_groups(self.channel):
+                name = group["name"].decode() if isinstance(group["name"], bytes) else group["name"]
+                if name == self.group:
+                    # lag is only reported by Redis 7 and is unknown after some trims
+                    lag = group.get("lag")
+                    return float(group["pending"] + (lag if lag is not None else 0))
+            return float(self.redis_client.xlen(self.channel))
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Could not read the depth of stream {self.channel}: {str(e)}")
+            return float("nan")
+
+    def _partition_of(self, message: _StreamMessage) -> Any:
+        return super()._partition_of(message.payload)
+
+    def _dispatch(self, messages: List[_StreamMessage]) -> None:
+        with self._in_progress_changed:
+            self._in_progress.update(message.entry_id for message in messages)
+        super()._dispatch(messages)
+
+    def _run_callback(self, messages: List[_StreamMessage]) -> None:
+        try:
+            self._invoke([message.payload for message in messages])
+        except Exception as e:
+            # Left pending, so the entries are redelivered through claiming
+            logger.error(f"Error handling message from stream {self.channel}: {str(e)}")
+        else:
+            self._ack([message.entry_id for message in messages])
+        finally:
+            with self._in_progress_changed:
+                self._in_progress.difference_update(message.entry_id for message in messages)
+                self._in_progress_changed.notify_all()
+
+    def _free_capacity(self) -> int:
+        """Number of entries that can be read without any of them waiting beyond the worker backlogs"""
+        if not self._worker_queues:
+            # The callback runs on the listener thread, so nothing is in progress while reading
+            return self.batch_size
+        with self._in_progress_changed:
+            return min(self.batch_size, len(self._worker_queues) * self.worker_backlog - len(self._in_progress))
+
+    def _ack(self, entry_ids: List[Any]) -> None:
+        try:
+            self.redis_client.xack(self.channel, self.group, *entry_ids)
+        except Exception as e:
+            logger.error(f"Error acknowledging {len(entry_ids)} entries on stream {self.channel}: {str(e)}")
+
+    def _to_messages(self, entries) -> List[_StreamMessage]:
+        messages = []
+        for entry_id, fields in entries:
+            if not fields:
+                # Entry was trimmed away while pending
+                self._ack([entry_id])
+                continue
+            data = fields.get(b"data", fields.get("data"))
+            messages.append(_StreamMessage(entry_id, self._parse(data)))
+        return messages
+
+    def _claim_stale(self) -> List[_StreamMessage]:
+        """Claim entries left pending too long by other consumers, dead-lettering repeatedly failing ones"""
+        with self._in_progress_changed:
+            in_progress = set(self._in_progress)
+        pending = self.redis_client.xpending_range(
+            self.channel, self.group, min="-", max="+", count=self.batch_size + len(in_progress),
+            idle=Config.STREAM_CLAIM_IDLE_MS
+        )
+        if not pending:
+            return []
+        claim_ids = []
+        for entry in pending:
+            if entry["message_id"] in in_progress:
+                # Still queued or running here; idle only because it has not been acknowledged yet
+                continue
+            if entry["times_delivered"] >= Config.STREAM_MAX_DELIVERIES:
+                logger.error(
+                    f"Dropping entry {entry['message_id']} of stream {self.channel} after "
+                    f"{entry['times_delivered']} deliveries"
+                )
+                self._ack([entry["message_id"]])
+            else:
+                claim_ids.append(entry["message_id"])
+        claim_ids = claim_ids[:max(self._free_capacity(), 0)]
+        if not claim_ids:
+            return []
+        entries = self.redis_client.xclaim(
+            self.channel, self.group, self.consumer, Config.STREAM_CLAIM_IDLE_MS, claim_ids
+        )
+        if entries:
+            logger.warning(f"Claimed {len(entries)} stale entries on stream {self.channel}")
+        return self._to_messages(entries)
+
+    def _listen(self) -> None:
+        """Read new entries for the consumer group, periodically claiming stale pending ones"""
+        while self._running.is_set():
+            try:
+                now = time.monotonic()
+                if now - self._last_claim >= Config.STREAM_CLAIM_INTERVAL_SECONDS:
+                    self._last_claim = now
+                    claimed = self._claim_stale()
+                    if claimed:
+                        self._dispatch(claimed)
+
+                capacity = self._free_capacity()
+                if capacity <= 0:
+                    # Worker backlogs are full; reading more would leave entries unacknowledged for longer
+                    with self._in_progress_changed:
+                        self._in_progress_changed.wait(timeout=1)
+                    continue
+                result = self.redis_client.xreadgroup(
+                    self.group, self.consumer, {self.channel: ">"}, count=capacity, block=1000
+                )
+                for _, entries in result or []:
+                    messages = self._to_messages(entries)
+                    if messages:
+                        self._dispatch(messages)
+            except Exception as e:
+                logger.error(f"Error listening to stream {self.channel}: {str(e)}")
+                if self._running.is_set():
+                    sleep(1)
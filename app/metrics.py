@@ -0,0 +1,165 @@
+import time
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+
+import prometheus_client
+from prometheus_client.core import GaugeMetricFamily
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUEST_LATENCY = prometheus_client.Histogram(
+    "vector_store_request_seconds", "End-to-end request handling time",
+    ["source", "endpoint"], buckets=LATENCY_BUCKETS
+)
+HANDLER_ERRORS = prometheus_client.Counter(
+    "vector_store_handler_errors", "Requests whose handler raised or returned a server error",
+    ["source", "endpoint"]
+)
+EMBEDDING_LATENCY = prometheus_client.Histogram(
+    "vector_store_embedding_seconds", "Time spent in embedding model calls", buckets=LATENCY_BUCKETS
+)
+CHROMA_QUERY_LATENCY = prometheus_client.Histogram(
+    "vector_store_chroma_query_seconds", "Chroma query time", buckets=LATENCY_BUCKETS
+)
+CHROMA_ADD_LATENCY = prometheus_client.Histogram(
+    "vector_store_chroma_add_seconds", "Chroma add, upsert and delete time, including document embedding",
+    ["operation"], buckets=LATENCY_BUCKETS
+)
+QUEUE_DEPTH = prometheus_client.Gauge(
+    "vector_store_queue_depth", "Messages waiting in the queue", ["queue"]
+)
+QUEUE_MESSAGE_AGE = prometheus_client.Histogram(
+    "vector_store_queue_message_age_seconds", "Time messages spent in the queue before being read",
+    ["queue"], buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+)
+RESIDENT_COLLECTIONS = prometheus_client.Gauge(
+    "vector_store_resident_collections", "Collections whose vector index is loaded in memory"
+)
+RESIDENT_COLLECTION_BYTES = prometheus_client.Gauge(
+    "vector_store_resident_collection_bytes", "Estimated size of the loaded vector indexes"
+)
+COLLECTION_EVICTIONS = prometheus_client.Counter(
+    "vector_store_collection_evictions", "Vector indexes unloaded to stay within the memory budget"
+)
+QUERY_BATCH_SIZE = prometheus_client.Histogram(
+    "vector_store_query_embedding_batch_size", "Number of texts encoded per merged query embedding batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+QUERY_BATCH_WAIT = prometheus_client.Histogram(
+    "vector_store_query_embedding_batch_wait_seconds", "Time a query embedding waited for its batch to start",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1)
+)
+BUCKET_PADDING_EFFICIENCY = prometheus_client.Histogram(
+    "vector_store_embedding_bucket_padding_efficiency", "Share of real tokens in each length bucket encoded",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+)
+
+
+def observe_request(source: str, endpoint: str, started: float, failed: bool = False) -> None:
+    """
+    Record the end-to-end time of a handled request.
+
+    Args:
+        source: Where the request came from, "http" or "redis"
+        endpoint: Route template or queue action
+        started: time.perf_counter() value taken when handling started
+        failed: Whether the handler failed
+    """
+    REQUEST_LATENCY.labels(source, endpoint).observe(time.perf_counter() - started)
+    if failed:
+        HANDLER_ERRORS.labels(source, endpoint).inc()
+
+
+def histogram_snapshot(histogram: prometheus_client.Histogram) -> Dict[str, Any]:
+    """
+    Get the current state of an unlabelled histogram, as exported to Prometheus.
+
+    Args:
+        histogram: The histogram
+
+    Returns:
+        Dictionary with the metric name, cumulative bucket counts keyed by upper bound, sum and count
+    """
+    snapshot: Dict[str, Any] = {"name": None, "buckets": {}, "sum": 0.0, "count": 0}
+    for metric in histogram.collect():
+        snapshot["name"] = metric.name
+        for sample in metric.samples:
+            if sample.name.endswith("_bucket"):
+                snapshot["buckets"][sample.labels["le"]] = int(sample.value)
+            elif sample.name.endswith("_sum"):
+                snapshot["sum"] = sample.value
+            elif sample.name.endswith("_count"):
+                snapshot["count"] = int(sample.value)
+    return snapshot
+
+
+class CollectionDocumentsCollector:
+    """
+    Prometheus collector reporting the document count of every collection. Counting touches
+    every collection, so the counts are reused for ttl seconds instead of recounted on every scrape.
+    """
+
+    def __init__(self, counts: Callable[[], Dict[str, int]], ttl: float = 60.0):
+        """
+        Initialize the collector.
+
+        Args:
+            counts: Callable returning the document count of each collection
+            ttl: Seconds the counts are reused for, 0 to count on every scrape
+        """
+        self.counts = counts
+        self.ttl = ttl
+        self._cached: Dict[str, int] = {}
+        self._counted_at: Optional[float] = None
+        self._lock = Lock()
+
+    def describe(self):
+        return []
+
+    def _current_counts(self) -> Dict[str, int]:
+        # Concurrent scrapes wait for one count instead of each counting
+        with self._lock:
+            if self._counted_at is None or time.monotonic() - self._counted_at >= self.ttl:
+                self._cached = self.counts()
+                self._counted_at = time.monotonic()
+            return self._cached
+
+    def collect(self):
+        gauge = GaugeMetricFamily(
+            "vector_store_collection_documents", "Documents stored per collection", labels=["collection"]
+        )
+        for collection_name, count in self._current_counts().items():
+            gauge.add_metric([collection_name], count)
+        yield gauge
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording the end-to-end time of every HTTP request by route template,
+    and counting requests answered with a server error.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            endpoint = f"{scope['method']} {route.path}" if route is not None else "unmatched"
+            observe_request("http", endpoint, started, failed=status >= 500)
+
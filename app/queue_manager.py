@@ -1,22 +1,57 @@
 import json
 from typing import Dict, List, Any, Optional
 import traceback
-from app.messaging.redis_pubsub import RedisPublisher, RedisSubscriber
+from app.messaging.redis_pubsub import RedisPublisher, BufferedRedisPublisher, RedisSubscriber
+from app.messaging.redis_streams import RedisStreamPublisher, BufferedRedisStreamPublisher, RedisStreamSubscriber
+from app.config import Config
 
+# Publisher, buffered publisher and subscriber classes of each transport
+QUEUE_BACKENDS = {
+    "list": (RedisPublisher, BufferedRedisPublisher, RedisSubscriber),
+    "streams": (RedisStreamPublisher, BufferedRedisStreamPublisher, RedisStreamSubscriber),
+}
     
 class QueueManager:
-    def __init__(self, send_queue_url: str=None, receive_queue_url:str=None):
+    def __init__(self, send_queue_url: str=None, receive_queue_url:str=None, buffered: bool=False, backend: str=None):
         self.send_queue_url = send_queue_url
         self.receive_queue_url = receive_queue_url
+        self.backend = backend or Config.QUEUE_BACKEND
+        if self.backend not in QUEUE_BACKENDS:
+            raise ValueError(f"Unknown queue backend '{self.backend}', expected one of {list(QUEUE_BACKENDS)}")
+        publisher_class, buffered_publisher_class, subscriber_class = QUEUE_BACKENDS[self.backend]
         if self.send_queue_url is not None:
-            self.redis_publisher = RedisPublisher()
+            if buffered:
+                self.redis_publisher = buffered_publisher_class(
+                    flush_interval_ms=Config.RESPONSE_FLUSH_INTERVAL_MS,
+                    max_batch_size=Config.RESPONSE_FLUSH_MAX_BATCH,
+                    max_attempts=Config.RESPONSE_FLUSH_MAX_ATTEMPTS
+                )
+            else:
+                self.redis_publisher = publisher_class()
         if self.receive_queue_url is not None:
-            self.redis_subscriber = RedisSubscriber()
+            self.redis_subscriber = subscriber_class()
 
 
     def send_message(self, message_body: Dict[str, Any]) -> Dict[str, Any]:
         return self.redis_publisher.publish(self.send_queue_url, message_body)
 
 
-    def start_background_processing(self, message_handler):
-        self.redis_subscriber.start(self.receive_queue_url, message_handler)
\ No newline at end of file
+    def start_background_processing(self, message_handler, workers: int = 1, partition_key=None, batch_size: int = 1):
+        self.redis_subscriber.start(
+            self.receive_queue_url,
+            message_handler,
+            workers=workers,
+            partition_key=partition_key,
+            worker_backlog=Config.QUEUE_WORKER_BACKLOG,
+            batch_size=batch_size
+        )
+
+    def queue_depth(self) -> float:
+        return self.redis_subscriber.depth()
+
+    def stop_background_processing(self):
+        self.redis_subscriber.stop()
+
+    def close(self):
+        if isinstance(getattr(self, "redis_publisher", None), BufferedRedisPublisher):
+            self.redis_publisher.close()
\ No newline at end of file
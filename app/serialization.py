@@ -0,0 +1,76 @@
+from typing import Any, Optional
+
+import msgpack
+import orjson
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# Encodings of search responses on the REST and Redis paths
+ENCODINGS = ("json", "msgpack")
+
+# First byte of a msgpack map or array; JSON and plain text never start with one of these as ASCII
+_MSGPACK_CONTAINER_PREFIXES = set(range(0x80, 0xA0)) | {0xDC, 0xDD, 0xDE, 0xDF}
+
+
+def _default(value: Any) -> Any:
+    # numpy scalars and arrays, e.g. distances
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def dumps(payload: Any, encoding: str = "json") -> bytes:
+    """
+    Serialize a payload with orjson or msgpack.
+
+    Args:
+        payload: The payload
+        encoding: "json" or "msgpack"
+
+    Returns:
+        The encoded payload
+    """
+    if encoding == "json":
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    if encoding == "msgpack":
+        return msgpack.packb(payload, default=_default, use_bin_type=True)
+    raise ValueError(f"Unknown encoding '{encoding}', expected one of {list(ENCODINGS)}")
+
+
+def loads(data: Any) -> Any:
+    """
+    Deserialize a JSON or msgpack payload; anything else is returned as text.
+
+    Args:
+        data: The encoded payload
+
+    Returns:
+        The decoded payload
+    """
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        pass
+    if isinstance(data, bytes):
+        if data and data[0] in _MSGPACK_CONTAINER_PREFIXES:
+            try:
+                return msgpack.unpackb(data, raw=False)
+            except (ValueError, msgpack.UnpackException):
+                pass
+        return data.decode("utf-8", errors="replace")
+    return data
+
+
+def media_type_for(accept: Optional[str]) -> str:
+    """
+    Pick the response media type from an Accept header.
+
+    Args:
+        accept: Value of the Accept header
+
+    Returns:
+        MSGPACK_MEDIA_TYPE when the client accepts msgpack, JSON_MEDIA_TYPE otherwise
+    """
+    if accept and ("application/msgpack" in accept or "application/x-msgpack" in accept):
+        return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
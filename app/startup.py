@@ -1,13 +1,41 @@
 import os
 import time
+import logging
 from app.vector_store.chroma_vector_store import chroma_vector_store
 from app.queue_manager import QueueManager
-from app.logging.logging_config import get_logger
+from app.logging.logging_config import get_logger, bind_request_id, truncate_for_log
 import json
 from app.config import Config
+from app.metrics import QUEUE_DEPTH, observe_request
+from app.serialization import ENCODINGS, dumps
+import prometheus_client
 import traceback
+import atexit
+from threading import Lock
 logger = get_logger()
 
+# Actions reported as metric labels; anything else is reported as "unknown"
+MESSAGE_ACTIONS = (
+    "create_collection", "delete_collection", "add_data", "search", "search_batch", "search_collections"
+)
+
+_response_queue_manager = None
+_response_queue_manager_lock = Lock()
+
+def get_response_queue_manager():
+    """
+    Get the long-lived queue manager publishing responses, creating it on first use
+
+    Returns:
+        QueueManager with a buffered publisher for the response queue
+    """
+    global _response_queue_manager
+    with _response_queue_manager_lock:
+        if _response_queue_manager is None:
+            _response_queue_manager = QueueManager(send_queue_url=Config.VECTOR_STORE_RESPONSE_QUEUE, buffered=True)
+            atexit.register(_response_queue_manager.close)
+        return _response_queue_manager
+
 def message_handler(message):
     """
     Handle incoming messages from the queue
@@ -15,14 +43,23 @@ def message_handler(message):
     Args:
         message: The message received from the queue
     """
+    request_id = message.get("request_id") if isinstance(message, dict) else None
+    with bind_request_id(request_id):
+        _handle_message(message)
+
+def _handle_message(message):
+    started = time.perf_counter()
+    action = None
+    failed = False
     try:
-        logger.info(f"Received message: {message}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Received message: {truncate_for_log(message)}")
 
         if isinstance(message, str):
             try:
                 message = json.loads(message)
             except json.JSONDecodeError:
-                logger.error(f"Failed to parse message as JSON: {message}")
+                logger.error(f"Failed to parse message as JSON: {truncate_for_log(message)}")
                 return
 
         # Process message based on action
@@ -39,7 +76,9 @@ def message_handler(message):
                 response["status"] = "error"
                 response["error"] = "Missing collection_name"
             else:
-                chroma_vector_store.create_collection(collection_name)
+                chroma_vector_store.create_collection(
+                    collection_name, hnsw=message.get('hnsw'), base_path=message.get('base_path')
+                )
                 response["status"] = "success"
                 response["message"] = f"Collection {collection_name} created"
         elif action == "delete_collection":
@@ -57,6 +96,13 @@ def message_handler(message):
             if not collection_name or not data:
                 response["status"] = "error"
                 response["error"] = "Missing collection_name or data"
+            elif message.get('sync'):
+                counts = chroma_vector_store.sync_dictionary(
+                    collection_name, data, remove_missing=message.get('remove_missing', False)
+                )
+                response["status"] = "success"
+                response["message"] = f"Synchronized {len(data)} items with {collection_name}"
+                response.update(counts)
             else:
                 chroma_vector_store.add_dictionary(collection_name, data)
                 response["status"] = "success"
@@ -70,7 +116,44 @@ def message_handler(message):
                 response["status"] = "error"
                 response["error"] = "Missing collection_name or query"
             else:
-                results = chroma_vector_store.search(query, n_results, collection_name)
+                results = chroma_vector_store.search(
+                    query, n_results, collection_name,
+                    include=message.get('include'), snippet_length=message.get('snippet_length'),
+                    filters=message.get('filters'), mode=message.get('mode', 'vector')
+                )
+                response["status"] = "success"
+                response["results"] = results
+
+        elif action == "search_batch":
+            collection_name = message.get('collection_name')
+            queries = message.get('queries')
+            if not collection_name or not queries or not all(item.get('query') for item in queries):
+                response["status"] = "error"
+                response["error"] = "Missing collection_name or queries"
+            else:
+                results = chroma_vector_store.search_batch(
+                    queries, collection_name,
+                    include=message.get('include'), snippet_length=message.get('snippet_length'),
+                    filters=message.get('filters')
+                )
+                response["status"] = "success"
+                response["results"] = results
+
+        elif action == "search_collections":
+            collection_names = message.get('collection_names')
+            user_id = message.get('user_id')
+            query = message.get('query')
+            n_results = message.get('n_results', 25)
+            if not query or not (collection_names or user_id):
+                response["status"] = "error"
+                response["error"] = "Missing query, or collection_names and user_id"
+            else:
+                results = chroma_vector_store.search_collections(
+                    query, n_results, collection_names=collection_names, user_id=user_id,
+                    max_concurrency=message.get('max_concurrency'),
+                    include=message.get('include'), snippet_length=message.get('snippet_length'),
+                    filters=message.get('filters')
+                )
                 response["status"] = "success"
                 response["results"] = results
 
@@ -79,26 +162,146 @@ def message_handler(message):
             response["error"] = f"Unknown action: {action}"
 
         response["action"] = action
-        # Send response if response queue is configured
-        if Config.VECTOR_STORE_RESPONSE_QUEUE:
-            queue_manager = QueueManager(send_queue_url=Config.VECTOR_STORE_RESPONSE_QUEUE)
-            queue_manager.send_message(response)
+        _send_response(response, message.get('encoding'))
 
     except Exception as e:
+        failed = True
         logger.error(f"Error processing message: {traceback.format_exc()}")
 
         # Try to send error response
-        if Config.VECTOR_STORE_RESPONSE_QUEUE:
+        _send_response({
+            "request_id": message.get("request_id", "unknown") if isinstance(message, dict) else "unknown",
+            "status": "error",
+            "error": str(e)
+        }, message.get('encoding') if isinstance(message, dict) else None)
+    finally:
+        label = action if action in MESSAGE_ACTIONS else "unknown"
+        observe_request("redis", label, started, failed=failed)
+        duration_ms = (time.perf_counter() - started) * 1000
+        logger.info(
+            f"Handled {label} message in {duration_ms:.1f}ms",
+            extra={"action": label, "duration_ms": duration_ms, "failed": failed}
+        )
+
+def _add_data_group_key(message):
+    """
+    Key under which an add_data message can be merged with adjacent ones, or None if it cannot be merged
+    """
+    if not isinstance(message, dict) or message.get('action') != 'add_data' or message.get('remove_missing'):
+        return None
+    if not message.get('collection_name') or not isinstance(message.get('data'), dict) or not message['data']:
+        return None
+    return (message['collection_name'], bool(message.get('sync')))
+
+def batch_message_handler(messages):
+    """
+    Handle a batch of messages drained from the queue. Adjacent add_data messages for the same
+    collection are merged into one embed-and-write call, as long as no source appears in two of
+    them; every other message is handled on its own. Each original message still gets its own response.
+
+    Args:
+        messages: List of messages received from the queue, in queue order
+    """
+    group, group_key, group_sources = [], None, set()
+    for message in messages:
+        if isinstance(message, str):
             try:
-                error_response = {
-                    "request_id": message.get("request_id", "unknown") if isinstance(message, dict) else "unknown",
-                    "status": "error",
-                    "error": str(e)
-                }
-                queue_manager = QueueManager(send_queue_url=Config.VECTOR_STORE_RESPONSE_QUEUE)
-                queue_manager.send_message(error_response)
-            except Exception:
-                logger.error("Failed to send error response", exc_info=True)
+                message = json.loads(message)
+            except json.JSONDecodeError:
+                pass
+        key = _add_data_group_key(message)
+        # A source sent twice would be merged into one item, where handling the messages in turn keeps both
+        if group and key == group_key and group_sources.isdisjoint(message['data']):
+            group.append(message)
+            group_sources.update(message['data'])
+            continue
+        _handle_add_data_group(group)
+        group, group_key = ([message], key) if key is not None else ([], None)
+        group_sources = set(message['data']) if key is not None else set()
+        if key is None:
+            message_handler(message)
+    _handle_add_data_group(group)
+
+def _handle_add_data_group(group):
+    if not group:
+        return
+    if len(group) == 1:
+        message_handler(group[0])
+        return
+
+    collection_name, sync = _add_data_group_key(group[0])
+    merged = {}
+    for message in group:
+        merged.update(message['data'])
+    logger.info(
+        f"Coalesced {len(group)} add_data messages into {len(merged)} items for {collection_name}",
+        extra={"request_ids": [message.get("request_id") for message in group]}
+    )
+
+    started = time.perf_counter()
+    try:
+        if sync:
+            outcomes = chroma_vector_store.sync_dictionary_by_source(collection_name, merged)
+        else:
+            chroma_vector_store.add_dictionary(collection_name, merged)
+    except Exception:
+        # One bad message must not fail the others: handle them in turn, each with its own response
+        logger.warning(
+            f"Coalesced add_data messages failed, handling them one by one: {traceback.format_exc()}"
+        )
+        for message in group:
+            message_handler(message)
+        return
+
+    duration_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"Handled {len(group)} coalesced add_data messages in {duration_ms:.1f}ms",
+        extra={"action": "add_data", "duration_ms": duration_ms, "failed": False}
+    )
+    for message in group:
+        observe_request("redis", "add_data", started)
+        response = {"request_id": message.get("request_id", "unknown"), "status": "success", "action": "add_data"}
+        if sync:
+            response["message"] = f"Synchronized {len(message['data'])} items with {collection_name}"
+            # Same counts as the message would have got on its own: only its items
+            response.update(chroma_vector_store.sync_counts(outcomes[source] for source in message['data']))
+        else:
+            response["message"] = f"Added {len(message['data'])} items to {collection_name}"
+        _send_response(response, message.get('encoding'))
+
+def _send_response(response, encoding=None):
+    """
+    Publish a response to the response queue, if one is configured
+
+    Args:
+        response: The response
+        encoding: "json" or "msgpack" as requested by the message; defaults to RESPONSE_ENCODING
+    """
+    if not Config.VECTOR_STORE_RESPONSE_QUEUE:
+        return
+    if encoding not in ENCODINGS:
+        if encoding is not None:
+            logger.warning(f"Unknown response encoding '{encoding}', using {Config.RESPONSE_ENCODING}")
+        encoding = Config.RESPONSE_ENCODING
+    try:
+        get_response_queue_manager().send_message(dumps(response, encoding))
+    except Exception:
+        logger.error("Failed to send response", exc_info=True)
+
+def message_partition_key(message):
+    """
+    Ordering key of a queue message: messages for the same collection are handled in order,
+    messages for different collections run in parallel.
+
+    Args:
+        message: The message received from the queue
+
+    Returns:
+        The collection name of the message, or None if it has none
+    """
+    if isinstance(message, dict):
+        return message.get('collection_name')
+    return None
 
 def start_service():
     """
@@ -112,11 +315,26 @@ def start_service():
 
     logger.info(f"Connecting to Redis at {redis_host}:{redis_port}")
 
+    # Load the model before consuming so the first messages do not pay for it
+    chroma_vector_store.warm_up()
+
     # Initialize queue manager for receiving messages
     queue_manager = QueueManager(receive_queue_url=Config.VECTOR_STORE_QUEUE)
 
+    # Queue depth is read from Redis at scrape time rather than on every message
+    QUEUE_DEPTH.labels(Config.VECTOR_STORE_QUEUE).set_function(queue_manager.queue_depth)
+    if Config.METRICS_PORT:
+        prometheus_client.start_http_server(Config.METRICS_PORT)
+        logger.info(f"Serving worker metrics on port {Config.METRICS_PORT}")
+
     # Start listening for messages
     logger.info(f"Starting to listen for messages on queue: {Config.VECTOR_STORE_QUEUE}")
-    queue_manager.start_background_processing(message_handler)
+    queue_manager.start_background_processing(
+        batch_message_handler,
+        workers=Config.QUEUE_WORKERS,
+        partition_key=message_partition_key,
+        batch_size=Config.QUEUE_DRAIN_BATCH_SIZE
+    )
 
-    logger.info("Vector Store service started successfully")
\ No newline at end of file
+    logger.info("Vector Store service started successfully")
+    return queue_manager
\ No newline at end of file
@@ -0,0 +1,80 @@
+import argparse
+import json
+from typing import Dict, List
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+
+from app.vector_store.chroma_vector_store import Config, chroma_vector_store, default_model_name
+from app.vector_store.embedding_backends import EMBEDDING_BACKENDS, create_embedding_backend
+
+
+def check_parity(candidate: EmbeddingFunction, reference: EmbeddingFunction, texts: List[str]) -> Dict[str, float]:
+    """
+    Compare the vectors of a candidate backend with those of a reference backend.
+
+    Args:
+        candidate: Embedding function being evaluated
+        reference: Embedding function producing the reference vectors
+        texts: Sample texts to embed with both
+
+    Returns:
+        Dictionary with the mean, minimum and 1st percentile cosine similarity between
+        paired vectors, and the fraction of texts whose nearest neighbour among the
+        sample is the same under both backends
+    """
+    candidate_vectors = np.asarray(candidate(texts), dtype=np.float32)
+    reference_vectors = np.asarray(reference(texts), dtype=np.float32)
+    candidate_vectors /= np.linalg.norm(candidate_vectors, axis=1, keepdims=True)
+    reference_vectors /= np.linalg.norm(reference_vectors, axis=1, keepdims=True)
+
+    cosines = np.sum(candidate_vectors * reference_vectors, axis=1)
+
+    def nearest_neighbours(vectors):
+        similarities = vectors @ vectors.T
+        np.fill_diagonal(similarities, -np.inf)
+        return similarities.argmax(axis=1)
+
+    neighbour_agreement = float(np.mean(nearest_neighbours(candidate_vectors) == nearest_neighbours(reference_vectors)))
+    return {
+        "texts": len(texts),
+        "mean_cosine": float(cosines.mean()),
+        "min_cosine": float(cosines.min()),
+        "p1_cosine": float(np.percentile(cosines, 1)),
+        "nearest_neighbour_agreement": neighbour_agreement
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report cosine agreement of an embedding backend with a reference backend")
+    parser.add_argument("--backend", required=True, choices=list(EMBEDDING_BACKENDS))
+    parser.add_argument("--reference", default="sentence_transformers", choices=list(EMBEDDING_BACKENDS))
+    parser.add_argument("--collection", help="Sample documents from this collection")
+    parser.add_argument("--texts-file", help="File with one sample text per line")
+    parser.add_argument("--limit", type=int, default=500, help="Maximum number of sample texts")
+    args = parser.parse_args()
+
+    if args.texts_file:
+        with open(args.texts_file) as f:
+            texts = [line.strip() for line in f if line.strip()][:args.limit]
+    elif args.collection:
+        collection = chroma_vector_store.get_collection(args.collection)
+        if collection is None:
+            parser.error(f"Collection '{args.collection}' does not exist")
+        texts = collection.get(limit=args.limit, include=["documents"])["documents"]
+    else:
+        parser.error("Provide --collection or --texts-file")
+    if len(texts) < 2:
+        parser.error("At least two sample texts are needed")
+
+    model_name = default_model_name()
+    report = check_parity(
+        create_embedding_backend(args.backend, model_name, Config),
+        create_embedding_backend(args.reference, model_name, Config),
+        texts
+    )
+    print(json.dumps({"backend": args.backend, "reference": args.reference, **report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import argparse
+import json
+
+from app.vector_store.chroma_vector_store import chroma_vector_store
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Add the path metadata used by search filters to items written before it existed"
+    )
+    parser.add_argument("--collection", nargs="+", help="Collections to backfill, all collections by default")
+    args = parser.parse_args()
+
+    collection_names = args.collection or chroma_vector_store.list_collections()
+    updated = {}
+    for collection_name in collection_names:
+        if chroma_vector_store.get_collection(collection_name) is None:
+            parser.error(f"Collection '{collection_name}' does not exist")
+        updated[collection_name] = chroma_vector_store.backfill_path_metadata(collection_name)
+    print(json.dumps({"updated": updated, "total": sum(updated.values())}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,32 @@
+import atexit
 import chromadb
-from typing import Dict, List, Any, Optional, Union
+import contextvars
+import logging
+import prometheus_client
+from typing import Dict, Iterable, List, Any, Optional, Sequence, Tuple, Union
 import uuid
-from chromadb.utils import embedding_functions
+import hashlib
+import heapq
+import json
+import time
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import os
-from app.logging.logging_config import get_logger
+from app.logging.logging_config import get_logger, truncate_for_log
+from app.vector_store.embedding_cache import EmbeddingCache, CachedEmbeddingFunction
+from app.vector_store.collection_registry import CollectionRegistry
+from app.vector_store.embedding_batcher import BatchingEmbeddingFunction
+from app.vector_store.search_cache import SearchResultCache
+from app.vector_store.lazy_embedding import LazyEmbeddingFunction
+from app.vector_store.embedding_backends import create_embedding_backend
+from app.vector_store.timed_embedding import TimedEmbeddingFunction
+from app.vector_store.path_filters import BASE_PATH_KEY, build_where, has_path_metadata, path_metadata
+from app.vector_store.lexical_index import LexicalHit, LexicalIndex
+from app.vector_store.collection_residency import ChromaSegments, CollectionResidencyManager
+from app.metrics import (
+    CHROMA_ADD_LATENCY, CHROMA_QUERY_LATENCY, EMBEDDING_LATENCY, RESIDENT_COLLECTION_BYTES, RESIDENT_COLLECTIONS,
+    CollectionDocumentsCollector
+)
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,6 +35,57 @@ logger = get_logger()
 
 class Config:
     CHROMA_DB_STORE = os.getenv("CHROMA_DB_STORE", "/chroma")
+    EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+    EMBEDDING_CACHE_DISK = os.getenv("EMBEDDING_CACHE_DISK", "false").lower() == "true"
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(CHROMA_DB_STORE, "embedding_cache.sqlite3"))
+    COLLECTION_REGISTRY_TTL = float(os.getenv("COLLECTION_REGISTRY_TTL", "30"))
+    QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+    QUERY_BATCH_MAX_WAIT_MS = float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", "5"))
+    FANOUT_MAX_WORKERS = int(os.getenv("FANOUT_MAX_WORKERS", "16"))
+    FANOUT_MAX_CONCURRENCY = int(os.getenv("FANOUT_MAX_CONCURRENCY", "8"))
+    SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1000"))
+    SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+    SEARCH_CACHE_MAX_MB = float(os.getenv("SEARCH_CACHE_MAX_MB", "64"))
+    COLLECTION_COUNTS_TTL_SECONDS = float(os.getenv("COLLECTION_COUNTS_TTL_SECONDS", "60"))
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence_transformers")
+    ONNX_MODEL_FILE = os.getenv("ONNX_MODEL_FILE")
+    EMBEDDING_PROCESS_WORKERS = int(os.getenv("EMBEDDING_PROCESS_WORKERS", "4"))
+    EMBEDDING_THREADS_PER_WORKER = int(os.getenv("EMBEDDING_THREADS_PER_WORKER", "1"))
+    ENCODE_BATCH_SIZE = int(os.getenv("ENCODE_BATCH_SIZE", "32"))
+    LEXICAL_CANDIDATES = int(os.getenv("LEXICAL_CANDIDATES", "200"))
+    LEXICAL_AUTO_MARGIN = float(os.getenv("LEXICAL_AUTO_MARGIN", "1.5"))
+    COLLECTION_MEMORY_BUDGET_MB = float(os.getenv("COLLECTION_MEMORY_BUDGET_MB", "0"))
+    COLLECTION_PRELOAD_COUNT = int(os.getenv("COLLECTION_PRELOAD_COUNT", "20"))
+    COLLECTION_ACCESS_HISTORY_PATH = os.getenv(
+        "COLLECTION_ACCESS_HISTORY_PATH", os.path.join(CHROMA_DB_STORE, "collection_access_history.json")
+    )
+
+# Fields a search can return, in result order
+SEARCH_INCLUDE = ("ids", "documents", "metadata", "distances")
+# Chroma include value of each field; ids are always returned by Chroma
+_CHROMA_INCLUDE = {"documents": "documents", "metadata": "metadatas", "distances": "distances"}
+# vector: embedding search; lexical: BM25 over sources and documents; hybrid: both, fused by rank;
+# auto: lexical when the index has a clear answer, hybrid otherwise
+SEARCH_MODES = ("vector", "lexical", "hybrid", "auto")
+# HNSW parameters a collection can be created with, stored as "hnsw:<name>" collection metadata.
+# construction_ef and M shape the graph and are fixed at creation; search_ef trades recall for query latency
+HNSW_PARAMS = ("construction_ef", "M", "search_ef", "num_threads", "batch_size", "sync_threshold", "resize_factor")
+# What sync_dictionary did with a source: new, changed content, or left as it was
+SYNC_OUTCOMES = ("added", "updated", "unchanged")
+# Reciprocal rank fusion constant; dampens the weight of the very first ranks
+_RRF_K = 60
+
+class CollectionNotFoundError(ValueError):
+    """Raised when an operation targets a collection that does not exist."""
+
+def default_model_name() -> str:
+    """
+    Name of the default SentenceTransformer model: downloaded by name in development,
+    loaded from the image otherwise.
+    """
+    if os.getenv("FLASK_ENV", "")== "development":
+        return "all-mpnet-base-v2"
+    return "/app/models/all-mpnet-base-v2"
 
 class ChromaVectorStore:
     """
@@ -19,48 +93,223 @@ class ChromaVectorStore:
     and provides simplified methods for adding data and searching across collections.
     """
 
-    def __init__(self, client=None, embedding_function=None):
+    def __init__(self, client=None, embedding_function=None, model_name: Optional[str] = None):
         """
         Initialize the ChromaVectorStore with an optional client and embedding function.
+        Construction is cheap: the persistent client is created on first use and the default
+        model is loaded on the first embedding call or by warm_up.
 
         Args:
-            client: Optional ChromaDB client. If not provided, a new in-memory client will be created.
+            client: Optional ChromaDB client. If not provided, a persistent client at CHROMA_DB_STORE will be created.
             embedding_function: Optional embedding function to use with ChromaDB.
+            model_name: Identifier of the model behind embedding_function, part of every embedding cache key.
+                Required with an embedding_function that has no model_name attribute.
         """
-        self.client = client if client else chromadb.PersistentClient(path=Config.CHROMA_DB_STORE)
+        self._client = client
+        self._client_lock = Lock()
+        self._collection_registry = None
+        self.ready = False
         if embedding_function is not None:
-            self.embedding_function = embedding_function
+            base_embedding_function = embedding_function
+            # Cached vectors are keyed by this, so a generic fallback could mix up the vectors of different models
+            model_name = model_name or getattr(embedding_function, "model_name", None)
+            if not model_name:
+                raise ValueError("An embedding_function without a model_name attribute needs an explicit model_name")
         else:
-            if os.getenv("FLASK_ENV", "")== "development":
-                self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-                                         model_name="all-mpnet-base-v2")
-            else:
-                self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-                                        model_name="/app/models/all-mpnet-base-v2")
+            if model_name is not None:
+                raise ValueError("model_name can only be given together with an embedding_function")
+            base_model_name = default_model_name()
+            backend = Config.EMBEDDING_BACKEND
+            # Backends produce slightly different vectors, so they must not share embedding cache entries
+            model_name = base_model_name if backend == "sentence_transformers" else f"{base_model_name}@{backend}"
+            base_embedding_function = LazyEmbeddingFunction(
+                lambda: create_embedding_backend(backend, base_model_name, Config),
+                model_name=model_name
+            )
+
+        self.model_name = model_name
+        self.base_embedding_function = base_embedding_function
+        # Every path below reaches the model through this, so model calls are timed but cache hits are not
+        timed_embedding_function = TimedEmbeddingFunction(base_embedding_function, EMBEDDING_LATENCY)
+        self.embedding_cache = None
+        if Config.EMBEDDING_CACHE_SIZE > 0 or Config.EMBEDDING_CACHE_DISK:
+            self.embedding_cache = EmbeddingCache(
+                max_entries=Config.EMBEDDING_CACHE_SIZE,
+                disk_path=Config.EMBEDDING_CACHE_PATH if Config.EMBEDDING_CACHE_DISK else None
+            )
+            self.embedding_function = CachedEmbeddingFunction(
+                timed_embedding_function, cache=self.embedding_cache, model_name=model_name
+            )
+        else:
+            self.embedding_function = timed_embedding_function
+
+        # Queries are embedded through a micro-batcher so concurrent searches share a forward pass;
+        # cache hits are answered before joining a batch.
+        self.query_batcher = None
+        query_embedding_function = timed_embedding_function
+        if Config.QUERY_BATCH_MAX_WAIT_MS > 0 and Config.QUERY_BATCH_MAX_SIZE > 1:
+            self.query_batcher = BatchingEmbeddingFunction(
+                timed_embedding_function,
+                max_batch_size=Config.QUERY_BATCH_MAX_SIZE,
+                max_wait_ms=Config.QUERY_BATCH_MAX_WAIT_MS
+            )
+            query_embedding_function = self.query_batcher
+        if self.embedding_cache is not None:
+            query_embedding_function = CachedEmbeddingFunction(
+                query_embedding_function, cache=self.embedding_cache, model_name=model_name
+            )
+        self.query_embedding_function = query_embedding_function
+
+        self.search_cache = SearchResultCache(
+            max_entries=Config.SEARCH_CACHE_SIZE, ttl_seconds=Config.SEARCH_CACHE_TTL_SECONDS,
+            max_bytes=int(Config.SEARCH_CACHE_MAX_MB * 1024 * 1024)
+        )
+        self.lexical_index = LexicalIndex()
+        self.residency = CollectionResidencyManager(
+            ChromaSegments(lambda: self.client),
+            budget_bytes=int(Config.COLLECTION_MEMORY_BUDGET_MB * 1024 * 1024),
+            history_path=Config.COLLECTION_ACCESS_HISTORY_PATH or None,
+            # An unloaded collection is cold, so its lexical index is rebuilt on demand too
+            on_evict=self.lexical_index.drop
+        )
+        if client is not None:
+            self._check_residency_support(client)
+        atexit.register(self.residency.save_history)
+        if self.embedding_cache is not None:
+            atexit.register(self.embedding_cache.flush)
+        # Shared by all fan-out searches so the total number of concurrent collection queries stays bounded
+        self._fanout_executor = ThreadPoolExecutor(max_workers=Config.FANOUT_MAX_WORKERS, thread_name_prefix="fanout-search")
+
+    @property
+    def client(self):
+        """The ChromaDB client, created on first use"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    client = chromadb.PersistentClient(path=Config.CHROMA_DB_STORE)
+                    self._check_residency_support(client)
+                    self._client = client
+        return self._client
+
+    def _check_residency_support(self, client: Any) -> None:
+        """Fail when a memory budget is set but this Chroma client's segments cannot be unloaded"""
+        if self.residency.budget_bytes and not ChromaSegments.manages(client):
+            raise RuntimeError(
+                f"COLLECTION_MEMORY_BUDGET_MB is set, but Chroma {chromadb.__version__} does not expose the "
+                f"segment manager internals the budget relies on; use the chromadb version pinned in "
+                f"requirements.txt or set COLLECTION_MEMORY_BUDGET_MB=0"
+            )
+
+    @property
+    def collection_registry(self) -> CollectionRegistry:
+        """The collection handle registry, created with the client on first use"""
+        if self._collection_registry is None:
+            client = self.client
+            with self._client_lock:
+                if self._collection_registry is None:
+                    self._collection_registry = CollectionRegistry(
+                        client, self.embedding_function, ttl=Config.COLLECTION_REGISTRY_TTL
+                    )
+        return self._collection_registry
+
+    def warm_up(self) -> None:
+        """
+        Create the client and load the embedding model by running a dummy encode, then mark
+        the store as ready.
+        """
+        started_at = time.monotonic()
+        self.client.heartbeat()
+        # Bypass the embedding cache so the model really runs
+        self.base_embedding_function(["warm up"])
+        self.preload_collections()
+        self.ready = True
+        logger.info(f"Vector store warmed up in {time.monotonic() - started_at:.2f}s")
+
+    def preload_collections(self, limit: Optional[int] = None) -> int:
+        """
+        Load the indexes of the most recently used collections of the access history,
+        as far as the memory budget allows.
+
+        Args:
+            limit: Maximum number of collections to load, COLLECTION_PRELOAD_COUNT by default
 
-    def create_collection(self, collection_name: str) -> Any:
+        Returns:
+            Number of resident collections among them
+        """
+        limit = Config.COLLECTION_PRELOAD_COUNT if limit is None else limit
+        preloaded = 0
+        for collection_name in self.residency.hot_collections(limit):
+            collection = self.collection_registry.get(collection_name)
+            if collection is None:
+                self.residency.forget(collection_name)
+                continue
+            try:
+                if not self.residency.preload(collection):
+                    break
+            except Exception:
+                logger.warning(f"Failed to preload collection '{collection_name}'", exc_info=True)
+                continue
+            preloaded += 1
+        if preloaded:
+            logger.info(f"Preloaded {preloaded} collections from the access history")
+        return preloaded
+
+    def create_collection(self, collection_name: str, hnsw: Optional[Dict[str, Any]] = None,
+                          base_path: Optional[str] = None) -> Any:
         """
         Create a new collection in ChromaDB.
 
         Args:
             collection_name: Name of the collection to create
+            hnsw: HNSW parameters of the collection, some of HNSW_PARAMS; Chroma's defaults otherwise.
+                They only apply to a new collection.
+            base_path: Project directory of the collection; path filters are relative to it.
+                It only applies to a new collection.
 
         Returns:
             The created collection object
         """
+        metadata = {"hnsw:space": "cosine", **self._hnsw_metadata(hnsw)}
+        if base_path:
+            metadata[BASE_PATH_KEY] = base_path
         collection = self.get_collection(collection_name=collection_name)
         if collection is not None:
             logger.warning(f"Collection '{collection_name}' already exists. Returning existing collection.")
+            if hnsw:
+                logger.warning(f"HNSW parameters {hnsw} ignored: they cannot be changed on an existing collection")
+            if base_path and (collection.metadata or {}).get(BASE_PATH_KEY) != base_path:
+                logger.warning(f"Base path '{base_path}' ignored: it cannot be changed on an existing collection")
             return collection
 
-        collection = self.client.create_collection(
+        # get_or_create tolerates another worker creating the same collection concurrently
+        collection = self.client.get_or_create_collection(
             name=collection_name,
             embedding_function=self.embedding_function,
-            metadata={"hnsw:space": "cosine"}
+            metadata=metadata
         )
+        self.collection_registry.put(collection_name, collection)
 
         return collection
 
+    @staticmethod
+    def _hnsw_metadata(hnsw: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Validate HNSW parameters, returning them as collection metadata"""
+        hnsw = {name: value for name, value in (hnsw or {}).items() if value is not None}
+        if not hnsw:
+            return {}
+        unknown = set(hnsw) - set(HNSW_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown HNSW parameters {sorted(unknown)}, expected some of {list(HNSW_PARAMS)}")
+        for name, value in hnsw.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                raise ValueError(f"HNSW parameter '{name}' must be a positive number, got {value!r}")
+            if name != "resize_factor" and not float(value).is_integer():
+                raise ValueError(f"HNSW parameter '{name}' must be an integer, got {value!r}")
+        return {
+            f"hnsw:{name}": float(value) if name == "resize_factor" else int(value)
+            for name, value in hnsw.items()
+        }
+
     def get_collection(self, collection_name: str) -> Any:
         """
         Get an existing collection by name.
@@ -71,81 +320,543 @@ class ChromaVectorStore:
         Returns:
             The collection object if it exists, None otherwise
         """
-        if collection_name in self.client.list_collections():
-            return self.client.get_collection(name=collection_name)
-        logger.warning(f"Collection '{collection_name}' does not exist.")
-        return None
-            
-            
+        collection = self.collection_registry.get(collection_name)
+        if collection is None:
+            logger.warning(f"Collection '{collection_name}' does not exist.")
+        return collection
+
+    def _run_on_collection(self, collection_name: str, operation, create_missing: bool = False) -> Any:
+        """
+        Run an operation against a collection handle. If the operation fails because the handle
+        went stale (the collection was deleted or recreated by another worker), the handle is
+        re-resolved and the operation retried once.
+
+        Args:
+            collection_name: Name of the collection to operate on
+            operation: Callable receiving the collection handle
+            create_missing: Whether to create the collection if it does not exist
+
+        Returns:
+            The return value of the operation
+        """
+        for attempt in range(2):
+            collection = self.get_collection(collection_name)
+            if collection is None:
+                if not create_missing:
+                    raise CollectionNotFoundError(f"Collection '{collection_name}' does not exist")
+                collection = self.create_collection(collection_name)
+            try:
+                return operation(collection)
+            except Exception:
+                if attempt > 0 or not self.collection_registry.is_stale(collection_name, collection):
+                    raise
+                logger.warning(f"Collection handle for '{collection_name}' was stale, retrying")
 
     def add_dictionary(self, collection_name: str, dictionary: Dict[str, str]) -> None:
         """
-        Add items from a dictionary to a collection. The keys will be stored in metadata
-        and the values will be stored as documents.
+        Add items from a dictionary to a collection. The keys will be stored in metadata,
+        together with their directory, extension and depth, and the values will be stored as documents.
 
         Args:
             collection_name: Name of the collection to add items to
             dictionary: Dictionary with keys as metadata and values as documents
         """
-        collection = self.get_collection(collection_name)
-        if not collection:
-            collection = self.create_collection(collection_name)
-
         # Prepare data for batch addition
-        ids = []
+        ids = [str(uuid.uuid4()) for _ in dictionary]
+        documents = list(dictionary.values())
+
+        def add(collection):
+            base_path = self._base_path(collection)
+            metadatas = [{"source": key, **path_metadata(key, base_path)} for key in dictionary]
+            return self._write(collection, "add", ids=ids, documents=documents, metadatas=metadatas)
+
+        # Add data to collection
+        try:
+            self._run_on_collection(collection_name, add, create_missing=True)
+            self.lexical_index.add(collection_name, zip(ids, dictionary.keys(), documents))
+        finally:
+            # Invalidate after the write so no search can cache pre-write results under the new generation
+            self.search_cache.invalidate(collection_name)
+
+        logger.info(f"Added {len(dictionary)} items to collection '{collection_name}'")
+
+    def sync_dictionary(self, collection_name: str, dictionary: Dict[str, str], remove_missing: bool = False) -> Dict[str, int]:
+        """
+        Synchronize items from a dictionary into a collection, using each key (the source path)
+        as the document id. Unchanged items are skipped without embedding them, new and changed
+        items are upserted. Unchanged items written before path metadata existed get it
+        without being embedded again.
+
+        Args:
+            collection_name: Name of the collection to synchronize
+            dictionary: Dictionary with source paths as keys and documents as values
+            remove_missing: Whether to delete documents whose source is not in the dictionary
+
+        Returns:
+            Dictionary with the number of added, updated, unchanged and removed items
+        """
+        outcomes, removed = self._sync(collection_name, dictionary, remove_missing)
+        return self.sync_counts(outcomes.values(), removed)
+
+    def sync_dictionary_by_source(self, collection_name: str, dictionary: Dict[str, str]) -> Dict[str, str]:
+        """
+        Synchronize items like sync_dictionary, reporting what happened to each source. Used when
+        one call serves several requests, so each can be answered with the counts of its own items.
+
+        Args:
+            collection_name: Name of the collection to synchronize
+            dictionary: Dictionary with source paths as keys and documents as values
+
+        Returns:
+            Dictionary mapping every source to one of SYNC_OUTCOMES
+        """
+        return self._sync(collection_name, dictionary, remove_missing=False)[0]
+
+    @staticmethod
+    def sync_counts(outcomes: Iterable[str], removed: int = 0) -> Dict[str, int]:
+        """
+        Count sync outcomes in the shape returned by sync_dictionary.
+
+        Args:
+            outcomes: Outcome of every synchronized source, one of SYNC_OUTCOMES
+            removed: Number of removed items
+
+        Returns:
+            Dictionary with the number of added, updated, unchanged and removed items
+        """
+        counts = dict.fromkeys(SYNC_OUTCOMES, 0)
+        for outcome in outcomes:
+            counts[outcome] += 1
+        counts["removed"] = removed
+        return counts
+
+    def _sync(self, collection_name: str, dictionary: Dict[str, str],
+              remove_missing: bool) -> Tuple[Dict[str, str], int]:
+        try:
+            outcomes, removed = self._run_on_collection(
+                collection_name,
+                lambda collection: self._sync_collection(collection, dictionary, remove_missing),
+                create_missing=True
+            )
+        finally:
+            self.search_cache.invalidate(collection_name)
+        logger.info(f"Synchronized collection '{collection_name}': {self.sync_counts(outcomes.values(), removed)}")
+        return outcomes, removed
+
+    def _sync_collection(self, collection: Any, dictionary: Dict[str, str],
+                         remove_missing: bool) -> Tuple[Dict[str, str], int]:
+        ids = list(dictionary.keys())
+        existing = collection.get(ids=ids, include=["metadatas"]) if ids else {"ids": [], "metadatas": []}
+        existing_hashes = {
+            doc_id: (metadata or {}).get("content_hash")
+            for doc_id, metadata in zip(existing["ids"], existing["metadatas"])
+        }
+        missing_path_metadata = {
+            doc_id for doc_id, metadata in zip(existing["ids"], existing["metadatas"])
+            if not has_path_metadata(metadata)
+        }
+        base_path = self._base_path(collection)
+
+        upsert_ids = []
         documents = []
         metadatas = []
-
+        backfill_ids = []
+        backfill_metadatas = []
+        outcomes = {}
         for key, value in dictionary.items():
-            doc_id = str(uuid.uuid4())
-            ids.append(doc_id)
+            content_hash = hashlib.sha256(value.encode("utf-8")).hexdigest()
+            if key not in existing_hashes:
+                outcomes[key] = "added"
+            elif existing_hashes[key] != content_hash:
+                outcomes[key] = "updated"
+            else:
+                outcomes[key] = "unchanged"
+                if key in missing_path_metadata:
+                    backfill_ids.append(key)
+                    backfill_metadatas.append(
+                        {"source": key, "content_hash": content_hash, **path_metadata(key, base_path)}
+                    )
+                continue
+            upsert_ids.append(key)
             documents.append(value)
-            metadatas.append({"source": key})
+            metadatas.append({"source": key, "content_hash": content_hash, **path_metadata(key, base_path)})
+
+        if upsert_ids:
+            self._write(
+                collection,
+                "upsert",
+                ids=upsert_ids,
+                documents=documents,
+                metadatas=metadatas
+            )
+            self.lexical_index.add(collection.name, zip(upsert_ids, upsert_ids, documents))
+        if backfill_ids:
+            self._write(collection, "update", ids=backfill_ids, metadatas=backfill_metadatas)
 
-        # Add data to collection
-        collection.add(
-            ids=ids,
-            documents=documents,
-            metadatas=metadatas
-        )
+        removed = 0
+        if remove_missing:
+            stale_ids = [doc_id for doc_id in collection.get(include=[])["ids"] if doc_id not in dictionary]
+            if stale_ids:
+                self._write(collection, "delete", ids=stale_ids)
+                self.lexical_index.remove(collection.name, stale_ids)
+            removed = len(stale_ids)
 
-        logger.info(f"Added {len(dictionary)} items to collection '{collection_name}'")
+        return outcomes, removed
 
-    def search(self, query: str, n_results: int = 25, collection_name=None) -> Dict[str, List[Dict[str, Any]]]:
+    @staticmethod
+    def _base_path(collection: Any) -> Optional[str]:
+        return (collection.metadata or {}).get(BASE_PATH_KEY)
+
+    def backfill_path_metadata(self, collection_name: str, page_size: int = 1000) -> int:
         """
-        Search the query across all collections.
+        Add path metadata to the items of a collection written before it existed, e.g. by
+        add_dictionary, which sync_dictionary cannot reach because their ids are not their
+        sources. Reads the whole collection, so it runs as a one-off command
+        (app.vector_store.backfill_path_metadata) rather than on the search path.
+
+        Args:
+            collection_name: Name of the collection
+            page_size: Items read per call
+
+        Returns:
+            Number of items updated
+        """
+        return self._run_on_collection(
+            collection_name, lambda collection: self._backfill_path_metadata(collection, page_size)
+        )
+
+    def _backfill_path_metadata(self, collection: Any, page_size: int) -> int:
+        base_path = self._base_path(collection)
+        backfilled = 0
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            ids = []
+            metadatas = []
+            for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+                source = (metadata or {}).get("source")
+                if source is not None and not has_path_metadata(metadata):
+                    ids.append(doc_id)
+                    metadatas.append({**metadata, **path_metadata(source, base_path)})
+            if ids:
+                self._write(collection, "update", ids=ids, metadatas=metadatas)
+                backfilled += len(ids)
+            if len(page["ids"]) < page_size:
+                break
+            offset += page_size
+        if backfilled:
+            self.search_cache.invalidate(collection.name)
+            logger.info(f"Added path metadata to {backfilled} items of collection '{collection.name}'")
+        return backfilled
+
+    def _write(self, collection: Any, operation: str, **kwargs) -> Any:
+        # Run a collection write method by name, timed and with the collection marked in use
+        with self.residency.use(collection, resize=True), CHROMA_ADD_LATENCY.labels(operation).time():
+            return getattr(collection, operation)(**kwargs)
+
+    @staticmethod
+    def _projection(include: Optional[Sequence[str]]) -> Tuple[str, ...]:
+        """Validate the requested result fields, returning them in result order"""
+        if include is None:
+            return SEARCH_INCLUDE
+        unknown = set(include) - set(SEARCH_INCLUDE)
+        if unknown:
+            raise ValueError(f"Unknown include fields {sorted(unknown)}, expected some of {list(SEARCH_INCLUDE)}")
+        return tuple(field for field in SEARCH_INCLUDE if field in include)
+
+    @staticmethod
+    def _check_n_results(*limits: int) -> None:
+        """Validate requested result counts; Chroma fails on them with a TypeError otherwise"""
+        for limit in limits:
+            if not isinstance(limit, int) or limit < 1:
+                raise ValueError(f"n_results must be a positive integer, got {limit!r}")
+
+    def _query(self, collection: Any, query_embeddings: Any, n_results: int,
+               fields: Sequence[str] = SEARCH_INCLUDE, where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # Only fetch what will be returned; skipping documents saves reading them from storage
+        include = [_CHROMA_INCLUDE[field] for field in fields if field in _CHROMA_INCLUDE]
+        with self.residency.use(collection), CHROMA_QUERY_LATENCY.time():
+            return collection.query(query_embeddings=query_embeddings, n_results=n_results, include=include, where=where)
+
+    def search(self, query: str, n_results: int = 25, collection_name=None, include: Optional[Sequence[str]] = None,
+               snippet_length: Optional[int] = None, filters: Optional[Dict[str, Any]] = None,
+               mode: str = "vector") -> List[Dict[str, Any]]:
+        """
+        Search the query in a collection. Use search_collections to search several collections.
 
         Args:
             query: The query string to search for
-            n_results: Number of results to return from each collection
+            n_results: Number of results to return
+            collection_name: Name of the collection to search in
+            include: Fields to return, some of "ids", "documents", "metadata" and "distances"; all by default
+            snippet_length: Truncate returned documents to this many characters
+            filters: Path filters applied inside Chroma, some of "path_prefix", "directory",
+                "extension" and "max_depth" (see path_filters.build_where)
+            mode: One of SEARCH_MODES; lexical, hybrid and auto results carry a "score" (higher is better)
+                instead of a "distance", even when "distances" is included
 
         Returns:
-            Dictionary with collection names as keys and search results as values
+            List of search results ordered by distance, or by score outside vector mode
         """
-        if  len(self.list_collections()) == 0:
-            logger.warning("No collections available to search.")
+        if collection_name is None:
+            raise ValueError("Please provide a valid collection to search in.")
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {list(SEARCH_MODES)}")
+        self._check_n_results(n_results)
+        fields = self._projection(include)
+        where = build_where(filters)
+
+        cache_params = (
+            SearchResultCache.normalize_query(query), n_results, fields, snippet_length,
+            json.dumps(where, sort_keys=True), mode
+        )
+        cached = self.search_cache.get(collection_name, cache_params)
+        if cached is not None:
+            return cached
+        generation = self.search_cache.generation(collection_name)
+
+        if mode == "vector":
+            query_embeddings = self.query_embedding_function([query])
+            query_results = self._run_on_collection(
+                collection_name,
+                lambda collection: self._query(collection, query_embeddings, n_results, fields, where)
+            )
+            formatted_results = self._format_results(query_results, 0, fields, snippet_length)
+        else:
+            formatted_results = self._lexical_search(collection_name, query, n_results, fields, snippet_length, where, mode)
+        logger.info(f"Search in collection '{collection_name}' returned {len(formatted_results)} results")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Results {truncate_for_log(formatted_results)}")
+        self.search_cache.put(collection_name, cache_params, formatted_results, generation)
+        return formatted_results
+
+    def _lexical_search(self, collection_name: str, query: str, n_results: int, fields: Sequence[str],
+                        snippet_length: Optional[int], where: Optional[Dict[str, Any]], mode: str) -> List[Dict[str, Any]]:
+        hits = self._run_on_collection(
+            collection_name, lambda collection: self._lexical_hits(collection_name, collection, query, where)
+        )
+        # Lexical hits have no distance, so scored results never carry one, even for items the vector search found
+        fields = tuple(field for field in fields if field != "distances")
+        if mode == "lexical" or (mode == "auto" and LexicalIndex.is_strong(hits, Config.LEXICAL_AUTO_MARGIN)):
+            if mode == "auto":
+                logger.info(f"Lexical index answered '{query}' in collection '{collection_name}' without a vector search")
+            hits = hits[:n_results]
+            results = self._fetch_results(collection_name, [hit.id for hit in hits], fields, snippet_length)
+            return [
+                self._scored(results[hit.id], hit.score, fields) for hit in hits if hit.id in results
+            ]
+
+        # Hybrid: fuse the vector and lexical rankings by reciprocal rank, looking twice as deep as returned
+        depth = 2 * n_results
+        vector_fields = fields if "ids" in fields else ("ids",) + fields
+        query_embeddings = self.query_embedding_function([query])
+        query_results = self._run_on_collection(
+            collection_name,
+            lambda collection: self._query(collection, query_embeddings, depth, vector_fields, where)
+        )
+        results = {
+            result["id"]: result for result in self._format_results(query_results, 0, vector_fields, snippet_length)
+        }
+        scores: Dict[str, float] = {}
+        for rank, doc_id in enumerate(results):
+            scores[doc_id] = 1 / (_RRF_K + rank + 1)
+        for rank, hit in enumerate(hits[:depth]):
+            scores[hit.id] = scores.get(hit.id, 0.0) + 1 / (_RRF_K + rank + 1)
+        top = heapq.nlargest(n_results, scores, key=scores.get)
+        missing = [doc_id for doc_id in top if doc_id not in results]
+        if missing:
+            results.update(self._fetch_results(collection_name, missing, vector_fields, snippet_length))
+        return [self._scored(results[doc_id], scores[doc_id], fields) for doc_id in top if doc_id in results]
+
+    def _lexical_hits(self, collection_name: str, collection: Any, query: str,
+                      where: Optional[Dict[str, Any]]) -> List[LexicalHit]:
+        # Marked in use like a vector query, so the lexical index is evicted with the collection
+        with self.residency.use(collection):
+            # The item count catches writes of other processes that added or removed items
+            index = self.lexical_index.ensure(collection_name, lambda: self._lexical_items(collection), collection.count())
+            hits = self.lexical_index.search(index, query, Config.LEXICAL_CANDIDATES)
+            if where is not None and hits:
+                allowed = set(collection.get(ids=[hit.id for hit in hits], where=where, include=[])["ids"])
+                hits = [hit for hit in hits if hit.id in allowed]
+        return hits
+
+    @staticmethod
+    def _lexical_items(collection: Any, page_size: int = 1000):
+        # Read the collection in pages so building the index does not load every document at once
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            for doc_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                yield doc_id, (metadata or {}).get("source"), document
+            if len(page["ids"]) < page_size:
+                return
+            offset += page_size
+
+    def _fetch_results(self, collection_name: str, ids: List[str], fields: Sequence[str],
+                       snippet_length: Optional[int]) -> Dict[str, Dict[str, Any]]:
+        # Results of the given items by id, formatted like query results without a distance
+        if not ids:
             return {}
-        if collection_name is None or self.get_collection(collection_name=collection_name) is None:
+        include = [_CHROMA_INCLUDE[field] for field in fields if field in ("documents", "metadata")]
+        items = self._run_on_collection(collection_name, lambda collection: collection.get(ids=ids, include=include))
+        columns = {key: [items[key]] for key in ["ids"] + include}
+        fetch_fields = fields if "ids" in fields else ("ids",) + fields
+        return {result["id"]: result for result in self._format_results(columns, 0, fetch_fields, snippet_length)}
+
+    @staticmethod
+    def _scored(result: Dict[str, Any], score: float, fields: Sequence[str]) -> Dict[str, Any]:
+        result["score"] = score
+        if "ids" not in fields:
+            del result["id"]
+        return result
+
+    def search_batch(self, queries: List[Dict[str, Any]], collection_name=None, include: Optional[Sequence[str]] = None,
+                     snippet_length: Optional[int] = None,
+                     filters: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search several queries in one collection, embedding them in one pass and running a
+        single query call.
+
+        Args:
+            queries: List of dictionaries with a "query" string and an optional "n_results" (default 25)
+            collection_name: Name of the collection to search in
+            include: Fields to return for every query, see search
+            snippet_length: Truncate returned documents to this many characters
+            filters: Path filters applied to every query, see search
+
+        Returns:
+            List with the search results of each query, in the order of the queries
+        """
+        if collection_name is None:
             raise ValueError("Please provide a valid collection to search in.")
-        collection = self.get_collection(collection_name=collection_name)
+        if not queries:
+            return []
+        fields = self._projection(include)
+        where = build_where(filters)
+
+        texts = [item["query"] for item in queries]
+        limits = [item.get("n_results", 25) for item in queries]
+        self._check_n_results(*limits)
+        query_embeddings = self.query_embedding_function(texts)
+        query_results = self._run_on_collection(
+            collection_name,
+            lambda collection: self._query(collection, query_embeddings, max(limits), fields, where)
+        )
+        logger.info(f"Batch search of {len(texts)} queries in collection '{collection_name}'")
+        return [
+            self._format_results(query_results, i, fields, snippet_length)[:limit] for i, limit in enumerate(limits)
+        ]
+
+    def search_collections(self, query: str, n_results: int = 25, collection_names: Optional[List[str]] = None,
+                           user_id: Optional[str] = None, max_concurrency: Optional[int] = None,
+                           include: Optional[Sequence[str]] = None, snippet_length: Optional[int] = None,
+                           filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Search the query across several collections and merge the hits into one global top-k by distance.
+        The query is embedded once and the collections are queried in parallel.
+
+        Args:
+            query: The query string to search for
+            n_results: Number of merged results to return
+            collection_names: Names of the collections to search in
+            user_id: Search every project collection of this user (in addition to collection_names)
+            max_concurrency: Maximum number of collections queried at once for this search
+            include: Fields to return, see search
+            snippet_length: Truncate returned documents to this many characters
+            filters: Path filters applied in every collection, see search
 
-        query_results = collection.query(
-                query_texts=[query],
-                n_results=n_results
+        Returns:
+            List of search results ordered by distance, each with the name of its collection
+        """
+        fields = self._projection(include)
+        where = build_where(filters)
+        self._check_n_results(n_results)
+        # Distances are needed to merge the hits even when they are not returned
+        query_fields = fields if "distances" in fields else fields + ("distances",)
+        targets = list(dict.fromkeys(collection_names or []))
+        if user_id:
+            targets.extend(name for name in self.get_user_collection_names(user_id) if name not in targets)
+        if not targets:
+            raise ValueError("Please provide valid collections to search in.")
+
+        max_concurrency = max(1, min(max_concurrency or Config.FANOUT_MAX_CONCURRENCY, len(targets)))
+        query_embeddings = self.query_embedding_function([query])
+
+        def query_collection(collection_name):
+            try:
+                query_results = self._run_on_collection(
+                    collection_name,
+                    lambda collection: self._query(collection, query_embeddings, n_results, query_fields, where)
+                )
+            except ValueError:
+                logger.warning(f"Skipping collection '{collection_name}' in fan-out search: it does not exist")
+                return []
+            hits = self._format_results(query_results, 0, query_fields, snippet_length)
+            for hit in hits:
+                hit["collection"] = collection_name
+            return hits
+
+        # Keep at most max_concurrency queries of this search in flight
+        hits = []
+        remaining = iter(targets)
+        in_flight = set()
+        for collection_name in remaining:
+            in_flight.add(self._fanout_executor.submit(contextvars.copy_context().run, query_collection, collection_name))
+            if len(in_flight) >= max_concurrency:
+                break
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                hits.extend(future.result())
+                next_collection = next(remaining, None)
+                if next_collection is not None:
+                    in_flight.add(
+                        self._fanout_executor.submit(contextvars.copy_context().run, query_collection, next_collection)
+                    )
+
+        logger.info(f"Fan-out search across {len(targets)} collections returned {len(hits)} hits")
+        merged = heapq.nsmallest(
+            n_results, hits, key=lambda hit: hit["distance"] if hit["distance"] is not None else float("inf")
+        )
+        if "distances" not in fields:
+            for hit in merged:
+                del hit["distance"]
+        return merged
+
+    def get_user_collection_names(self, user_id: str) -> List[str]:
+        """
+        List the names of the project collections of a user, as named by get_collection_name.
+        Collections whose name was truncated before the user id cannot be matched.
+
+        Args:
+            user_id: The user id
+
+        Returns:
+            List of collection names
+        """
+        suffix = ("_" + user_id).lower()
+        return [name for name in self.list_collections() if name.endswith(suffix)]
+
+    def _format_results(self, query_results: Dict[str, Any], index: int, fields: Sequence[str] = SEARCH_INCLUDE,
+                        snippet_length: Optional[int] = None) -> List[Dict[str, Any]]:
+        # Format results of the query at the given index for easier consumption, keeping only the requested fields
+        ids = query_results['ids'][index]
+        columns = []
+        if "ids" in fields:
+            columns.append(("id", ids))
+        if "documents" in fields:
+            documents = query_results['documents'][index]
+            if snippet_length:
+                documents = [document[:snippet_length] if document is not None else None for document in documents]
+            columns.append(("document", documents))
+        if "metadata" in fields:
+            columns.append(("metadata", query_results['metadatas'][index]))
+        if "distances" in fields:
+            columns.append(
+                ("distance", query_results['distances'][index] if query_results.get('distances') else [None] * len(ids))
             )
-        logger.info(f"Results {query_results}")
-        # Format results for easier consumption
-        formatted_results = []
-        for i in range(len(query_results['ids'][0])):
-            result = {
-                "id": query_results['ids'][0][i],
-                "document": query_results['documents'][0][i],
-                "metadata": query_results['metadatas'][0][i],
-                "distance": query_results.get('distances', [[]])[0][i] if query_results.get('distances') else None
-            }
-            formatted_results.append(result)
 
-        return formatted_results
+        return [{key: values[i] for key, values in columns} for i in range(len(ids))]
 
     def search_in_project(self, query: str, n_results: int = 25, user_id=None, project_base_path=None) -> Dict[str, List[Dict[str, Any]]]:
         """
@@ -171,7 +882,26 @@ class ChromaVectorStore:
         collections = self.client.list_collections()
         if collections is None or len(collections)== 0:
             return []
-        return collections
+        # Some Chroma releases return collection objects rather than names
+        return [collection if isinstance(collection, str) else collection.name for collection in collections]
+
+    def collection_document_counts(self) -> Dict[str, int]:
+        """
+        Count the documents of every collection. Nothing is counted before the client is opened.
+
+        Returns:
+            Dictionary mapping collection names to document counts
+        """
+        if self._client is None:
+            return {}
+        counts = {}
+        for collection_name in self.list_collections():
+            try:
+                counts[collection_name] = self._run_on_collection(collection_name, lambda collection: collection.count())
+            except ValueError:
+                # Deleted since it was listed
+                continue
+        return counts
 
     def delete_collection(self, collection_name: str) -> bool:
         """
@@ -187,13 +917,68 @@ class ChromaVectorStore:
         if collection is None:
             logger.warning(f"Collection with {collection_name} does not exist")
             return False
-        self.client.delete_collection(name=collection_name)
+        try:
+            self.client.delete_collection(name=collection_name)
+        except Exception:
+            # Another worker sharing the store may have deleted it first
+            logger.warning(f"Collection with {collection_name} could not be deleted: it no longer exists")
+            return False
+        finally:
+            self.collection_registry.discard(collection_name)
+            self.search_cache.forget(collection_name)
+            self.lexical_index.drop(collection_name)
+            self.residency.forget(collection_name)
         logger.info("Collection deleted successfully")
         return True
 
+    def embedding_stats(self) -> Dict[str, Any]:
+        """
+        Get embedding cache counters, query batching histograms and encoder padding efficiency.
+
+        Returns:
+            Dictionary with cache, batcher and encoder stats, None for disabled or unloaded components
+        """
+        return {
+            "cache": self.embedding_cache.stats() if self.embedding_cache is not None else None,
+            "query_batcher": self.query_batcher.stats() if self.query_batcher is not None else None,
+            "encoder": self._encoding_stats()
+        }
+
+    def _encoding_stats(self) -> Optional[Dict[str, Any]]:
+        embedding_function = self.base_embedding_function
+        if isinstance(embedding_function, LazyEmbeddingFunction):
+            if not embedding_function.loaded:
+                return None
+            embedding_function = embedding_function.load()
+        encoding_stats = getattr(embedding_function, "encoding_stats", None)
+        return encoding_stats() if encoding_stats is not None else None
+
+    def residency_stats(self) -> Dict[str, Any]:
+        """
+        Get collection residency counters.
+
+        Returns:
+            Dictionary with resident and evicted collection counts, resident bytes and the memory budget
+        """
+        return self.residency.stats()
+
+    def search_cache_stats(self) -> Dict[str, int]:
+        """
+        Get search result cache counters.
+
+        Returns:
+            Dictionary with hit, miss and entry counts and the size of the entries in bytes
+        """
+        return self.search_cache.stats()
+
     def get_collection_name(self, user_id, project_base_path):
         sanitized_project_base_path = project_base_path.replace(os.sep, "_")
         collection_name = (sanitized_project_base_path + "_" + user_id).lower()[:60]
         return collection_name
 
-chroma_vector_store = ChromaVectorStore()
\ No newline at end of file
+chroma_vector_store = ChromaVectorStore()
+prometheus_client.REGISTRY.register(
+    CollectionDocumentsCollector(chroma_vector_store.collection_document_counts, ttl=Config.COLLECTION_COUNTS_TTL_SECONDS)
+)
+RESIDENT_COLLECTIONS.set_function(lambda: chroma_vector_store.residency.stats()["resident"])
+RESIDENT_COLLECTION_BYTES.set_function(lambda: chroma_vector_store.residency.stats()["resident_bytes"])
@@ -0,0 +1,104 @@
+import time
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from app.logging.logging_config import get_logger
+
+logger = get_logger()
+
+
+class CollectionRegistry:
+    """
+    In-process registry of collection handles keyed by name.
+
+    Lookups are served from a dictionary instead of scanning every collection in the
+    store. Entries older than ttl seconds are re-resolved by name, so collections deleted
+    or recreated by other workers sharing the same persistent store are picked up.
+    """
+
+    def __init__(self, client, embedding_function, ttl: float = 30.0):
+        """
+        Initialize the registry.
+
+        Args:
+            client: ChromaDB client used to resolve handles
+            embedding_function: Embedding function attached to resolved handles
+            ttl: Seconds after which a cached handle is re-resolved, 0 to never expire
+        """
+        self.client = client
+        self.embedding_function = embedding_function
+        self.ttl = ttl
+        self._handles: Dict[str, Tuple[Any, float]] = {}
+        self._lock = Lock()
+
+    def get(self, collection_name: str) -> Optional[Any]:
+        """
+        Get the handle of a collection, resolving it from the client when not cached.
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            The collection handle, or None if the collection does not exist
+        """
+        with self._lock:
+            entry = self._handles.get(collection_name)
+        if entry is not None:
+            handle, resolved_at = entry
+            if not self.ttl or time.monotonic() - resolved_at < self.ttl:
+                return handle
+        return self.refresh(collection_name)
+
+    def refresh(self, collection_name: str) -> Optional[Any]:
+        """
+        Re-resolve a collection handle from the client, replacing any cached handle.
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            The collection handle, or None if the collection does not exist
+        """
+        try:
+            handle = self.client.get_collection(name=collection_name, embedding_function=self.embedding_function)
+        except Exception:
+            self.discard(collection_name)
+            return None
+        self.put(collection_name, handle)
+        return handle
+
+    def put(self, collection_name: str, handle: Any) -> None:
+        """
+        Register the handle of a collection.
+
+        Args:
+            collection_name: Name of the collection
+            handle: The collection handle
+        """
+        with self._lock:
+            self._handles[collection_name] = (handle, time.monotonic())
+
+    def discard(self, collection_name: str) -> None:
+        """
+        Forget the handle of a collection.
+
+        Args:
+            collection_name: Name of the collection
+        """
+        with self._lock:
+            self._handles.pop(collection_name, None)
+
+    def is_stale(self, collection_name: str, handle: Any) -> bool:
+        """
+        Check whether a handle no longer refers to the collection currently stored under its name,
+        e.g. because another worker deleted or recreated it. The registry is refreshed as a side effect.
+
+        Args:
+            collection_name: Name of the collection
+            handle: The handle to check
+
+        Returns:
+            True if the handle is stale, False otherwise
+        """
+        current = self.refresh(collection_name)
+        return current is None or current.id != handle.id
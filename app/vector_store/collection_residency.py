@@ -0,0 +1,375 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Event, RLock
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.logging.logging_config import get_logger
+from app.metrics import COLLECTION_EVICTIONS
+
+logger = get_logger()
+
+
+class ChromaSegments:
+    """
+    Loads, unloads and sizes the vector (HNSW) segments of an embedded Chroma client.
+
+    Chroma keeps a vector segment in memory from its first query or write until the process
+    exits. This goes through the local segment manager, the same way Chroma's own LRU
+    segment cache evicts; a client without one (e.g. an HTTP client) is not supported.
+    Unloading is safe: a reloaded segment replays the writes it had not persisted yet.
+
+    The manager's attributes are private to Chroma, so requirements.txt pins the Chroma
+    version this was written against, and manages() checks that they are still there.
+    """
+
+    def __init__(self, client_provider: Callable[[], Any]):
+        """
+        Initialize the adapter.
+
+        Args:
+            client_provider: Callable returning the Chroma client, resolved on first use
+        """
+        self.client_provider = client_provider
+
+    @staticmethod
+    def _manager_of(client: Any) -> Optional[Any]:
+        manager = getattr(getattr(client, "_server", None), "_manager", None)
+        required = ("_instances", "segment_cache", "_lock", "_get_segment_disk_size", "get_segment")
+        return manager if all(hasattr(manager, name) for name in required) else None
+
+    @classmethod
+    def manages(cls, client: Any) -> bool:
+        """
+        Whether segments of this client can be loaded, unloaded and sized.
+
+        Args:
+            client: Chroma client
+
+        Returns:
+            True if the client has a local segment manager with the internals used here
+        """
+        return cls._manager_of(client) is not None
+
+    @property
+    def _manager(self) -> Optional[Any]:
+        return self._manager_of(self.client_provider())
+
+    @property
+    def supported(self) -> bool:
+        return self._manager is not None
+
+    def size(self, collection_id: Any) -> int:
+        """
+        Size of the persisted vector segment, which the loaded HNSW index roughly matches in memory.
+
+        Args:
+            collection_id: Id of the collection
+
+        Returns:
+            Size in bytes, 0 if unknown
+        """
+        manager = self._manager
+        if manager is None:
+            return 0
+        try:
+            return manager._get_segment_disk_size(collection_id)
+        except Exception:
+            logger.warning(f"Could not size the vector segment of collection {collection_id}", exc_info=True)
+            return 0
+
+    def load(self, collection_id: Any) -> None:
+        """
+        Load the vector segment of a collection.
+
+        Args:
+            collection_id: Id of the collection
+        """
+        from chromadb.segment import VectorReader
+
+        manager = self._manager
+        if manager is not None:
+            manager.get_segment(collection_id, VectorReader)
+
+    def unload(self, collection_id: Any) -> bool:
+        """
+        Stop and drop the vector segment of a collection so its index is freed.
+
+        Args:
+            collection_id: Id of the collection
+
+        Returns:
+            True if a loaded segment was dropped
+        """
+        from chromadb.types import SegmentScope
+
+        manager = self._manager
+        if manager is None:
+            return False
+        segment = manager.segment_cache[SegmentScope.VECTOR].pop(collection_id)
+        if segment is None:
+            return False
+        with manager._lock:
+            instance = manager._instances.pop(segment["id"], None)
+        file_handles = getattr(manager, "_vector_instances_file_handle_cache", None)
+        if file_handles is not None:
+            file_handles.cache.pop(collection_id, None)
+        if instance is None:
+            return False
+        instance.stop()
+        return True
+
+
+class _Resident:
+    def __init__(self, collection_id: Any):
+        self.collection_id = collection_id
+        self.size = 0
+        self.in_use = 0
+        self.oversize_warned = False
+
+
+class CollectionResidencyManager:
+    """
+    Keeps the vector indexes of recently used collections in memory within a byte budget.
+
+    Every query or write goes through use(), which marks the collection resident and most
+    recently used. When the resident indexes exceed the budget, the least recently used
+    collections that are not in use are unloaded; their next query loads them again.
+    The collection just used is never unloaded, even when it alone exceeds the budget.
+    Access times are saved to a history file so the hottest collections can be preloaded
+    on the next start.
+    """
+
+    def __init__(self, segments: ChromaSegments, budget_bytes: int = 0, history_path: Optional[str] = None,
+                 history_size: int = 10000, save_interval: float = 60.0,
+                 on_evict: Optional[Callable[[str], None]] = None):
+        """
+        Initialize the manager.
+
+        Args:
+            segments: Adapter loading, unloading and sizing vector segments
+            budget_bytes: Memory budget of the resident indexes, 0 for no limit
+            history_path: JSON file the access history is kept in, None to keep it in memory only
+            history_size: Maximum number of collections in the access history
+            save_interval: Minimum seconds between two saves of the access history
+            on_evict: Called with the name of every unloaded collection
+        """
+        self.segments = segments
+        self.budget_bytes = budget_bytes
+        self.history_path = history_path
+        self.history_size = history_size
+        self.save_interval = save_interval
+        self.on_evict = on_evict
+        self._resident: "OrderedDict[str, _Resident]" = OrderedDict()
+        # Collections being unloaded; use() waits for their unload to finish
+        self._unloading: Dict[str, Event] = {}
+        self._history: "OrderedDict[str, float]" = self._load_history()
+        self._lock = RLock()
+        self._saved_at = time.monotonic()
+        self._dirty = False
+        self.loads = 0
+        self.evictions = 0
+        self.preloaded = 0
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(entry.size for entry in self._resident.values())
+
+    @contextmanager
+    def use(self, collection: Any, resize: bool = False) -> Iterator[None]:
+        """
+        Mark a collection as in use for the duration of a query or write. Collections in
+        use are never unloaded.
+
+        Args:
+            collection: Collection handle, providing name and id
+            resize: Whether to measure the index again afterwards, e.g. after a write
+        """
+        name = collection.name
+        while True:
+            with self._lock:
+                unloading = self._unloading.get(name)
+                if unloading is None:
+                    entry = self._resident.get(name)
+                    if entry is None or entry.collection_id != collection.id:
+                        # New, or recreated under the same name
+                        entry = _Resident(collection.id)
+                        self._resident[name] = entry
+                        self.loads += 1
+                        resize = True
+                    entry.in_use += 1
+                    self._resident.move_to_end(name)
+                    self._history[name] = time.time()
+                    self._history.move_to_end(name)
+                    self._dirty = True
+                    while len(self._history) > self.history_size:
+                        self._history.popitem(last=False)
+                    break
+            unloading.wait()
+        try:
+            yield
+        finally:
+            size = self.segments.size(entry.collection_id) if resize else None
+            with self._lock:
+                entry.in_use -= 1
+                if size is not None:
+                    entry.size = size
+                    self._warn_if_oversize(name, entry)
+                evicted = self._evict_over_budget(keep=name)
+            for evicted_name, evicted_entry in evicted:
+                self._unload(evicted_name, evicted_entry)
+            self._maybe_save_history()
+
+    def _warn_if_oversize(self, name: str, entry: _Resident) -> None:
+        if self.budget_bytes and entry.size > self.budget_bytes and not entry.oversize_warned:
+            entry.oversize_warned = True
+            logger.warning(f"Collection '{name}' ({entry.size} bytes) alone exceeds the memory budget of "
+                           f"{self.budget_bytes} bytes; it stays loaded while it is the most recently used")
+
+    def _evict_over_budget(self, keep: str) -> List[Tuple[str, _Resident]]:
+        # Pick the collections to unload, least recently used first, and mark them as unloading.
+        # Called with the lock held; the caller unloads them after releasing it.
+        evicted = []
+        if not self.budget_bytes:
+            return evicted
+        resident_bytes = self.resident_bytes
+        for name in list(self._resident):
+            if resident_bytes <= self.budget_bytes:
+                break
+            entry = self._resident[name]
+            if entry.in_use or name == keep:
+                continue
+            del self._resident[name]
+            resident_bytes -= entry.size
+            self._unloading[name] = Event()
+            evicted.append((name, entry))
+        return evicted
+
+    def _unload(self, name: str, entry: _Resident) -> None:
+        try:
+            unloaded = self.segments.unload(entry.collection_id)
+            with self._lock:
+                self.evictions += 1
+            COLLECTION_EVICTIONS.inc()
+            logger.info(f"Evicted collection '{name}' ({entry.size} bytes"
+                        f"{'' if unloaded else ', vector index not loaded'}) to stay within the memory budget")
+            # Also called when only the collection's lexical index was in memory
+            if self.on_evict is not None:
+                self.on_evict(name)
+        except Exception:
+            logger.warning(f"Failed to unload collection '{name}'", exc_info=True)
+        finally:
+            with self._lock:
+                self._unloading.pop(name).set()
+
+    def forget(self, collection_name: str) -> None:
+        """
+        Stop tracking a deleted collection.
+
+        Args:
+            collection_name: Name of the collection
+        """
+        with self._lock:
+            self._resident.pop(collection_name, None)
+            if self._history.pop(collection_name, None) is not None:
+                self._dirty = True
+
+    def hot_collections(self, limit: int) -> List[str]:
+        """
+        List the most recently used collections of the access history.
+
+        Args:
+            limit: Maximum number of collections
+
+        Returns:
+            Collection names, most recently used first
+        """
+        with self._lock:
+            return list(reversed(self._history))[:limit]
+
+    def preload(self, collection: Any) -> bool:
+        """
+        Load the index of a collection ahead of its first query, if it fits in the budget.
+
+        Args:
+            collection: Collection handle, providing name and id
+
+        Returns:
+            True if the collection is resident afterwards
+        """
+        with self._lock:
+            if collection.name in self._resident:
+                return True
+        if not self.segments.supported:
+            return False
+        size = self.segments.size(collection.id)
+        if self.budget_bytes and self.resident_bytes + size > self.budget_bytes:
+            return False
+        self.segments.load(collection.id)
+        with self._lock:
+            if collection.name not in self._resident:
+                entry = _Resident(collection.id)
+                entry.size = size
+                # Preloaded collections are the coldest residents until they are used
+                self._resident[collection.name] = entry
+                self._resident.move_to_end(collection.name, last=False)
+                self.loads += 1
+                self.preloaded += 1
+        return True
+
+    def _load_history(self) -> "OrderedDict[str, float]":
+        history = OrderedDict()
+        if not self.history_path or not os.path.exists(self.history_path):
+            return history
+        try:
+            with open(self.history_path) as f:
+                accessed = json.load(f)
+        except (OSError, ValueError):
+            logger.warning(f"Could not read collection access history {self.history_path}", exc_info=True)
+            return history
+        for name, accessed_at in sorted(accessed.items(), key=lambda item: item[1])[-self.history_size:]:
+            history[name] = accessed_at
+        return history
+
+    def _maybe_save_history(self) -> None:
+        if self.history_path and time.monotonic() - self._saved_at >= self.save_interval:
+            self.save_history()
+
+    def save_history(self) -> None:
+        """Write the access history to the history file, if it changed since the last save"""
+        if not self.history_path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            accessed = dict(self._history)
+            self._saved_at = time.monotonic()
+            self._dirty = False
+        temporary_path = f"{self.history_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.history_path)), exist_ok=True)
+            with open(temporary_path, "w") as f:
+                json.dump(accessed, f)
+            os.replace(temporary_path, self.history_path)
+        except OSError:
+            logger.warning(f"Could not write collection access history {self.history_path}", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get residency counters.
+
+        Returns:
+            Dictionary with resident collections and bytes, the budget, and load, preload and eviction counts
+        """
+        with self._lock:
+            return {
+                "resident": len(self._resident),
+                "resident_bytes": self.resident_bytes,
+                "budget_bytes": self.budget_bytes,
+                "loads": self.loads,
+                "preloaded": self.preloaded,
+                "evictions": self.evictions,
+                "history": len(self._history),
+            }
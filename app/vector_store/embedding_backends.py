@@ -0,0 +1,126 @@
+import importlib.util
+from typing import Any, Callable, Dict, Optional
+
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from app.logging.logging_config import get_logger
+from app.vector_store.length_bucketing import LengthBucketedEncoder
+from app.vector_store.process_pool_embedding import ProcessPoolEmbeddingFunction
+
+logger = get_logger()
+
+
+class SentenceTransformerBackend(EmbeddingFunction[Documents]):
+    """
+    SentenceTransformer embedding function running on PyTorch or ONNX Runtime,
+    optionally with dynamic int8 quantization of the PyTorch linear layers.
+    Documents are encoded in token-length buckets to keep padding low.
+    """
+
+    def __init__(self, model_name: str, backend: str = "torch", quantize: bool = False,
+                 model_kwargs: Optional[Dict[str, Any]] = None, device: str = "cpu", batch_size: int = 32):
+        """
+        Load the model.
+
+        Args:
+            model_name: Name or path of the SentenceTransformer model
+            backend: SentenceTransformer inference backend, "torch" or "onnx"
+            quantize: Whether to apply dynamic int8 quantization (torch backend only)
+            model_kwargs: Extra keyword arguments for the backend, e.g. the ONNX file_name
+            device: Device the model runs on
+            batch_size: Maximum number of documents encoded per length bucket
+        """
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        kwargs = {"device": device}
+        if backend != "torch":
+            # Non-default backends need sentence-transformers >= 3.2 with the optimum extra
+            kwargs["backend"] = backend
+        if model_kwargs:
+            kwargs["model_kwargs"] = model_kwargs
+        self.model = SentenceTransformer(model_name, **kwargs)
+
+        if quantize:
+            import torch
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.encoder = LengthBucketedEncoder(self.model, batch_size=batch_size)
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return list(self.encoder.encode(list(input)))
+
+    def encoding_stats(self) -> Dict[str, Any]:
+        """
+        Get padding-efficiency counters of the length-bucketed encoder.
+
+        Returns:
+            Dictionary with the encoder stats
+        """
+        return self.encoder.stats()
+
+
+def _sentence_transformers(model_name: str, config) -> EmbeddingFunction:
+    return SentenceTransformerBackend(model_name, batch_size=config.ENCODE_BATCH_SIZE)
+
+
+def _require_onnx_support() -> None:
+    # Checked up front: otherwise the model load fails with an unrelated-looking TypeError or import error
+    import sentence_transformers
+
+    version = tuple(int(part) for part in sentence_transformers.__version__.split(".")[:2] if part.isdigit())
+    missing = []
+    if version < (3, 2):
+        missing.append(f"sentence-transformers>=3.2 (installed: {sentence_transformers.__version__})")
+    if importlib.util.find_spec("optimum") is None or importlib.util.find_spec("onnxruntime") is None:
+        missing.append("optimum[onnxruntime]")
+    if missing:
+        raise ImportError(
+            f"The 'onnx' embedding backend needs {' and '.join(missing)}; "
+            f"install them with: pip install -r requirements-onnx.txt"
+        )
+
+
+def _onnx(model_name: str, config) -> EmbeddingFunction:
+    _require_onnx_support()
+    model_kwargs = {"file_name": config.ONNX_MODEL_FILE} if config.ONNX_MODEL_FILE else None
+    return SentenceTransformerBackend(model_name, backend="onnx", model_kwargs=model_kwargs,
+                                      batch_size=config.ENCODE_BATCH_SIZE)
+
+
+def _quantized(model_name: str, config) -> EmbeddingFunction:
+    return SentenceTransformerBackend(model_name, quantize=True, batch_size=config.ENCODE_BATCH_SIZE)
+
+
+def _process_pool(model_name: str, config) -> EmbeddingFunction:
+    return ProcessPoolEmbeddingFunction(
+        model_name,
+        workers=config.EMBEDDING_PROCESS_WORKERS,
+        threads_per_worker=config.EMBEDDING_THREADS_PER_WORKER
+    )
+
+
+# Factories receiving the model name and the vector store Config
+EMBEDDING_BACKENDS: Dict[str, Callable[[str, Any], EmbeddingFunction]] = {
+    "sentence_transformers": _sentence_transformers,
+    "onnx": _onnx,
+    "quantized": _quantized,
+    "process_pool": _process_pool,
+}
+
+
+def create_embedding_backend(name: str, model_name: str, config) -> EmbeddingFunction:
+    """
+    Build an embedding function from the backend registry.
+
+    Args:
+        name: Name of the backend
+        model_name: Name or path of the model
+        config: Configuration providing the backend options
+
+    Returns:
+        The embedding function
+    """
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}', expected one of {list(EMBEDDING_BACKENDS)}")
+    logger.info(f"Creating '{name}' embedding backend for {model_name}")
+    return EMBEDDING_BACKENDS[name](model_name, config)
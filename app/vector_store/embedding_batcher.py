@@ -0,0 +1,114 @@
+import queue
+import time
+from threading import Event, Lock, Thread
+from typing import Any, Dict, List, Optional
+
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from app.logging.logging_config import get_logger
+from app.metrics import QUERY_BATCH_SIZE, QUERY_BATCH_WAIT, histogram_snapshot
+
+logger = get_logger()
+
+
+class _PendingEncode:
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.enqueued_at = time.monotonic()
+        self.done = Event()
+        self.result: Optional[Embeddings] = None
+        self.error: Optional[BaseException] = None
+
+
+class BatchingEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Embedding function wrapper that merges concurrent calls into one forward pass.
+
+    Calls made from different threads within max_wait_ms of each other (up to
+    max_batch_size texts) are encoded together by a background thread, and each
+    caller receives the vectors for its own texts.
+    """
+
+    def __init__(self, embedding_function: EmbeddingFunction, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        """
+        Initialize the batcher.
+
+        Args:
+            embedding_function: The embedding function running the merged batches
+            max_batch_size: Maximum number of texts encoded in one forward pass
+            max_wait_ms: Maximum time the first call of a batch waits for others to join
+        """
+        self.embedding_function = embedding_function
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: "queue.Queue[_PendingEncode]" = queue.Queue()
+        self._thread = None
+        self._thread_lock = Lock()
+
+    def __call__(self, input: Documents) -> Embeddings:
+        request = _PendingEncode(list(input))
+        self._ensure_started()
+        self._pending.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="query-embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._pending.get()]
+            size = len(batch[0].texts)
+            deadline = batch[0].enqueued_at + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.texts)
+            self._encode(batch)
+
+    def _encode(self, batch: List[_PendingEncode]) -> None:
+        started_at = time.monotonic()
+        texts = [text for request in batch for text in request.texts]
+        QUERY_BATCH_SIZE.observe(len(texts))
+        for request in batch:
+            QUERY_BATCH_WAIT.observe(started_at - request.enqueued_at)
+
+        try:
+            vectors = self.embedding_function(texts)
+        except Exception as e:
+            logger.error(f"Batched query embedding of {len(texts)} texts failed: {str(e)}")
+            for request in batch:
+                request.error = e
+                request.done.set()
+            return
+
+        offset = 0
+        for request in batch:
+            request.result = vectors[offset:offset + len(request.texts)]
+            offset += len(request.texts)
+            request.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the batch-size and wait-time histograms, read from the Prometheus metrics.
+
+        Returns:
+            Dictionary with both histogram snapshots
+        """
+        return {
+            "batch_size": histogram_snapshot(QUERY_BATCH_SIZE),
+            "wait_time_seconds": histogram_snapshot(QUERY_BATCH_WAIT)
+        }
@@ -0,0 +1,216 @@
+import hashlib
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from app.logging.logging_config import get_logger
+
+logger = get_logger()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed store of embedding vectors with a bounded in-memory LRU tier
+    and an optional SQLite tier on disk.
+
+    Disk reads and writes happen outside the lock of the memory tier, so memory hits never
+    wait for SQLite. New vectors are written to disk in one transaction per commit_batch_size
+    vectors, or by the first put more than commit_interval_seconds after the oldest unwritten
+    one; flush writes the rest, and vectors not flushed when the process dies are recomputed.
+    """
+
+    def __init__(self, max_entries: int = 10000, disk_path: Optional[str] = None,
+                 commit_batch_size: int = 256, commit_interval_seconds: float = 1.0):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of vectors kept in memory
+            disk_path: Optional path of the SQLite file backing the disk tier
+            commit_batch_size: Number of new vectors written to disk in one transaction
+            commit_interval_seconds: Age of the oldest unwritten vector after which a put writes them all
+        """
+        self.max_entries = max_entries
+        self.commit_batch_size = commit_batch_size
+        self.commit_interval = commit_interval_seconds
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = Lock()
+        # Vectors not written to disk yet, and when the oldest of them was added
+        self._unwritten: Dict[str, np.ndarray] = {}
+        self._unwritten_since: Optional[float] = None
+        # The SQLite connection is not safe for concurrent use
+        self._db_lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+            logger.info(f"Embedding cache disk tier enabled at {disk_path}")
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        """
+        Build the cache key for a text embedded by a given model.
+
+        Args:
+            model_name: Name of the embedding model
+            text: The embedded text
+
+        Returns:
+            Hex digest identifying the (model, text) pair
+        """
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up several keys, falling back to the disk tier for memory misses.
+
+        Args:
+            keys: Cache keys to look up
+
+        Returns:
+            Dictionary of the keys that were found and their vectors
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is None:
+                    vector = self._unwritten.get(key)
+                if vector is not None:
+                    if key in self._memory:
+                        self._memory.move_to_end(key)
+                    found[key] = vector
+                else:
+                    missing.append(key)
+
+        loaded = self._read(missing) if missing and self._db is not None else {}
+        with self._lock:
+            for key, vector in loaded.items():
+                self._remember(key, vector)
+            found.update(loaded)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def _read(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        loaded = {}
+        with self._db_lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    loaded[key] = np.frombuffer(blob, dtype=np.float32)
+        return loaded
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        """
+        Store vectors in the memory tier and, when enabled, queue them for the disk tier.
+
+        Args:
+            items: Dictionary of cache keys to vectors
+        """
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            if self._db is None or not items:
+                return
+            if not self._unwritten:
+                self._unwritten_since = time.monotonic()
+            self._unwritten.update(items)
+            due = (len(self._unwritten) >= self.commit_batch_size
+                   or time.monotonic() - self._unwritten_since >= self.commit_interval)
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the vectors not written to the disk tier yet, in one transaction"""
+        if self._db is None:
+            return
+        with self._db_lock:
+            with self._lock:
+                unwritten, self._unwritten = self._unwritten, {}
+            if not unwritten:
+                return
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in unwritten.items()]
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error writing {len(unwritten)} embeddings to the disk cache: {str(e)}")
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with hit, miss and size counts
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "memory_entries": len(self._memory)}
+
+
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Embedding function wrapper that only runs the wrapped function on texts
+    that are not already in the cache.
+    """
+
+    def __init__(self, embedding_function: EmbeddingFunction, cache: EmbeddingCache, model_name: str):
+        """
+        Initialize the wrapper.
+
+        Args:
+            embedding_function: The embedding function computing cache misses
+            cache: Cache shared by every wrapper of the same model
+            model_name: Name of the model, part of every cache key
+        """
+        self.embedding_function = embedding_function
+        self.cache = cache
+        self.model_name = model_name
+
+    def __call__(self, input: Documents) -> Embeddings:
+        keys = [EmbeddingCache.make_key(self.model_name, text) for text in input]
+        found = self.cache.get_many(keys)
+
+        # Embed each distinct missing text once, even if repeated in the batch
+        missing = {}
+        for key, text in zip(keys, input):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.embedding_function(list(missing.values()))
+            computed = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(missing.keys(), vectors)
+            }
+            self.cache.put_many(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
@@ -0,0 +1,201 @@
+import argparse
+import itertools
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import hnswlib
+import numpy as np
+
+from app.vector_store.chroma_vector_store import chroma_vector_store
+
+
+def load_embeddings(collection: Any, limit: Optional[int] = None, page_size: int = 5000) -> np.ndarray:
+    """
+    Read the stored embeddings of a collection.
+
+    Args:
+        collection: Collection handle
+        limit: Maximum number of embeddings
+        page_size: Embeddings read per call
+
+    Returns:
+        Array with one embedding per row
+    """
+    pages = []
+    offset = 0
+    while limit is None or offset < limit:
+        size = page_size if limit is None else min(page_size, limit - offset)
+        page = collection.get(include=["embeddings"], limit=size, offset=offset)["embeddings"]
+        if page is None or len(page) == 0:
+            break
+        pages.append(np.asarray(page, dtype=np.float32))
+        offset += len(page)
+        if len(page) < size:
+            break
+    return np.concatenate(pages) if pages else np.zeros((0, 0), dtype=np.float32)
+
+
+def exact_neighbours(vectors: np.ndarray, query_rows: np.ndarray, k: int, space: str,
+                     chunk_size: int = 256) -> np.ndarray:
+    """
+    Find the true k nearest neighbours of stored vectors by brute force, excluding each query itself.
+
+    Args:
+        vectors: All indexed vectors
+        query_rows: Row numbers of the vectors used as queries
+        k: Number of neighbours
+        space: Distance of the collection, "cosine", "ip" or "l2"
+
+    Returns:
+        Array of neighbour row numbers, one row per query
+    """
+    if space == "cosine":
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    neighbours = []
+    for start in range(0, len(query_rows), chunk_size):
+        rows = query_rows[start:start + chunk_size]
+        queries = vectors[rows]
+        if space == "l2":
+            distances = (
+                np.sum(queries ** 2, axis=1, keepdims=True) - 2 * queries @ vectors.T + np.sum(vectors ** 2, axis=1)
+            )
+        else:
+            distances = -(queries @ vectors.T)
+        distances[np.arange(len(rows)), rows] = np.inf
+        nearest = np.argpartition(distances, k, axis=1)[:, :k]
+        order = np.take_along_axis(distances, nearest, axis=1).argsort(axis=1)
+        neighbours.append(np.take_along_axis(nearest, order, axis=1))
+    return np.concatenate(neighbours)
+
+
+def calibrate(vectors: np.ndarray, space: str, m_values: Sequence[int], construction_ef_values: Sequence[int],
+              search_ef_values: Sequence[int], queries: int = 200, k: int = 10, num_threads: int = 4,
+              seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Measure recall against exact search and query latency of every HNSW parameter combination.
+    Indexes are built with hnswlib, the library Chroma's local segments use, so one graph per
+    (M, construction_ef) serves every search_ef. Stored vectors serve as queries, with each
+    query's own entry excluded from both the exact and the approximate neighbours.
+
+    Args:
+        vectors: Embeddings of the collection
+        space: Distance of the collection, "cosine", "ip" or "l2"
+        m_values: Values of M to try
+        construction_ef_values: Values of construction_ef to try
+        search_ef_values: Values of search_ef to try
+        queries: Number of sampled query vectors
+        k: Number of neighbours compared
+        num_threads: Threads used to build the indexes; queries run on one thread
+        seed: Seed of the query sample
+
+    Returns:
+        One result per combination with M, construction_ef, search_ef, recall,
+        p50_ms, p99_ms and the build time of its index
+    """
+    if len(vectors) <= k:
+        raise ValueError(f"Need more than k={k} vectors, the collection has {len(vectors)}")
+    rng = np.random.default_rng(seed)
+    query_rows = rng.choice(len(vectors), size=min(queries, len(vectors)), replace=False)
+    truth = exact_neighbours(vectors, query_rows, k, space)
+
+    results = []
+    for m, construction_ef in itertools.product(m_values, construction_ef_values):
+        index = hnswlib.Index(space=space, dim=vectors.shape[1])
+        started = time.perf_counter()
+        index.init_index(max_elements=len(vectors), ef_construction=construction_ef, M=m)
+        index.set_num_threads(num_threads)
+        index.add_items(vectors, np.arange(len(vectors)))
+        build_seconds = time.perf_counter() - started
+        index.set_num_threads(1)
+
+        for search_ef in search_ef_values:
+            # hnswlib needs ef >= k; Chroma raises it the same way
+            index.set_ef(max(search_ef, k + 1))
+            latencies = []
+            hits = 0
+            for query_row, expected in zip(query_rows, truth):
+                started = time.perf_counter()
+                labels, _ = index.knn_query(vectors[query_row], k=k + 1)
+                latencies.append(time.perf_counter() - started)
+                found = [label for label in labels[0] if label != query_row][:k]
+                hits += len(set(found) & set(expected.tolist()))
+            results.append({
+                "M": m,
+                "construction_ef": construction_ef,
+                "search_ef": search_ef,
+                "recall": hits / (len(query_rows) * k),
+                "p50_ms": float(np.percentile(latencies, 50) * 1000),
+                "p99_ms": float(np.percentile(latencies, 99) * 1000),
+                "build_seconds": build_seconds
+            })
+    return results
+
+
+def recommend(results: List[Dict[str, Any]], target_recall: float) -> Tuple[Dict[str, Any], bool]:
+    """
+    Pick the combination with the lowest p99 latency among those reaching the target recall,
+    or the one with the best recall when none does.
+
+    Args:
+        results: Results of calibrate
+        target_recall: Minimum acceptable recall
+
+    Returns:
+        The recommended result and whether it reaches the target recall
+    """
+    passing = [result for result in results if result["recall"] >= target_recall]
+    if passing:
+        return min(passing, key=lambda result: (result["p99_ms"], result["build_seconds"])), True
+    return max(results, key=lambda result: (result["recall"], -result["p99_ms"])), False
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure recall and latency of HNSW parameters on a collection and recommend settings"
+    )
+    parser.add_argument("--collection", required=True, help="Collection whose stored embeddings are indexed")
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32], help="Values of M")
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[64, 100, 200],
+                        help="Values of construction_ef")
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 25, 50, 100, 200],
+                        help="Values of search_ef")
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled query vectors")
+    parser.add_argument("--k", type=int, default=10, help="Number of neighbours compared")
+    parser.add_argument("--target-recall", type=float, default=0.95, help="Minimum recall of the recommendation")
+    parser.add_argument("--limit", type=int, help="Maximum number of embeddings read from the collection")
+    parser.add_argument("--threads", type=int, default=4, help="Threads used to build the indexes")
+    args = parser.parse_args()
+
+    collection = chroma_vector_store.get_collection(args.collection)
+    if collection is None:
+        parser.error(f"Collection '{args.collection}' does not exist")
+    space = (collection.metadata or {}).get("hnsw:space", "l2")
+    vectors = load_embeddings(collection, limit=args.limit)
+    if len(vectors) <= args.k:
+        parser.error(f"Collection '{args.collection}' needs more than {args.k} items")
+
+    results = calibrate(
+        vectors, space, args.m, args.construction_ef, args.search_ef,
+        queries=args.queries, k=args.k, num_threads=args.threads
+    )
+    best, reaches_target = recommend(results, args.target_recall)
+    current = {
+        name: (collection.metadata or {}).get(f"hnsw:{name}") for name in ("M", "construction_ef", "search_ef")
+    }
+    print(json.dumps({
+        "collection": args.collection,
+        "items": len(vectors),
+        "space": space,
+        "k": args.k,
+        "current": current,
+        "results": results,
+        "target_recall": args.target_recall,
+        "reaches_target_recall": reaches_target,
+        # Body of POST /collections for a collection created with the recommended settings
+        "recommended": {"hnsw": {name: best[name] for name in ("M", "construction_ef", "search_ef")}},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
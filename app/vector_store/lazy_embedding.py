@@ -0,0 +1,49 @@
+from threading import Lock
+from typing import Callable
+
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from app.logging.logging_config import get_logger
+
+logger = get_logger()
+
+
+class LazyEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Embedding function that builds the wrapped function, and so loads its model,
+    only when it is first called or explicitly loaded.
+    """
+
+    def __init__(self, factory: Callable[[], EmbeddingFunction], model_name: str):
+        """
+        Initialize the lazy embedding function.
+
+        Args:
+            factory: Callable building the real embedding function
+            model_name: Name of the model, used for logging
+        """
+        self.factory = factory
+        self.model_name = model_name
+        self._embedding_function = None
+        self._lock = Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._embedding_function is not None
+
+    def load(self) -> EmbeddingFunction:
+        """
+        Build the wrapped embedding function if it has not been built yet.
+
+        Returns:
+            The wrapped embedding function
+        """
+        if self._embedding_function is None:
+            with self._lock:
+                if self._embedding_function is None:
+                    logger.info(f"Loading embedding model {self.model_name}")
+                    self._embedding_function = self.factory()
+        return self._embedding_function
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return self.load()(input)
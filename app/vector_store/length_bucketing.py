@@ -0,0 +1,119 @@
+from threading import Lock
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.logging.logging_config import get_logger
+from app.metrics import BUCKET_PADDING_EFFICIENCY, histogram_snapshot
+
+logger = get_logger()
+
+
+class LengthBucketedEncoder:
+    """
+    Encoding stage that groups documents into buckets of similar length and encodes each
+    bucket on its own, so a batch is only padded to the longest document of its bucket
+    instead of the longest document of the whole input. Vectors are returned in the original order.
+
+    Lengths are counted with the model's tokenizer, so documents longer than the model's
+    maximum sequence length are reported exactly; the model only sees their first
+    max_seq_length tokens.
+    """
+
+    def __init__(self, model, batch_size: int = 32):
+        """
+        Initialize the encoder.
+
+        Args:
+            model: SentenceTransformer model providing tokenizer, max_seq_length and encode
+            batch_size: Maximum number of documents per bucket
+        """
+        self.model = model
+        self.batch_size = batch_size
+        self._lock = Lock()
+        self.documents = 0
+        self.over_length_documents = 0
+        self.tokens = 0
+        self.padded_tokens = 0
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        """
+        Count the tokens of every text, including special tokens, without truncation.
+
+        Args:
+            texts: Texts to tokenize
+
+        Returns:
+            Token count of each text
+        """
+        # Only the lengths are needed: skip the attention masks and type ids
+        encoded = self.model.tokenizer(
+            texts, add_special_tokens=True, truncation=False, verbose=False,
+            return_attention_mask=False, return_token_type_ids=False, return_length=True
+        )
+        return list(encoded["length"])
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts bucket by bucket.
+
+        Args:
+            texts: Texts to encode
+
+        Returns:
+            Array of vectors in the order of the texts
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        max_length = self.model.max_seq_length
+        raw_lengths = self.token_lengths(texts)
+        over_length = [index for index, length in enumerate(raw_lengths) if length > max_length]
+        if over_length:
+            logger.warning(
+                f"{len(over_length)} of {len(texts)} documents exceed the maximum sequence length of "
+                f"{max_length} tokens and are truncated by the model (longest {max(raw_lengths)} tokens, "
+                f"positions {over_length[:10]})"
+            )
+        lengths = [min(length, max_length) for length in raw_lengths]
+
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
+        vectors = None
+        padded_tokens = 0
+        for start in range(0, len(order), self.batch_size):
+            bucket = order[start:start + self.batch_size]
+            bucket_vectors = self.model.encode(
+                [texts[index] for index in bucket], batch_size=len(bucket), convert_to_numpy=True
+            )
+            if vectors is None:
+                vectors = np.empty((len(texts), bucket_vectors.shape[1]), dtype=bucket_vectors.dtype)
+            vectors[bucket] = bucket_vectors
+            bucket_tokens = sum(lengths[index] for index in bucket)
+            bucket_padded = lengths[bucket[-1]] * len(bucket)
+            padded_tokens += bucket_padded
+            BUCKET_PADDING_EFFICIENCY.observe(bucket_tokens / bucket_padded)
+
+        with self._lock:
+            self.documents += len(texts)
+            self.over_length_documents += len(over_length)
+            self.tokens += sum(lengths)
+            self.padded_tokens += padded_tokens
+        return vectors
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get padding-efficiency counters.
+
+        Returns:
+            Dictionary with document and token counts and the padding efficiency overall and per bucket
+        """
+        with self._lock:
+            return {
+                "documents": self.documents,
+                "over_length_documents": self.over_length_documents,
+                "tokens": self.tokens,
+                "padded_tokens": self.padded_tokens,
+                "padding_efficiency": self.tokens / self.padded_tokens if self.padded_tokens else None,
+                "bucket_padding_efficiency": histogram_snapshot(BUCKET_PADDING_EFFICIENCY)
+            }
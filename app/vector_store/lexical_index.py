@@ -0,0 +1,292 @@
+import heapq
+import math
+import posixpath
+import re
+from collections import Counter
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.logging.logging_config import get_logger
+
+logger = get_logger()
+
+_WORD = re.compile(r"[A-Za-z0-9]+")
+# Sub-words of camelCase and PascalCase identifiers, e.g. HTTPServer -> HTTP, Server
+_CAMEL_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lower-case terms: every alphanumeric word, plus the parts of
+    camelCase words, so "RedisSubscriber" yields redissubscriber, redis and subscriber.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of terms, with repetitions
+    """
+    terms = []
+    for word in _WORD.findall(text):
+        terms.append(word.lower())
+        parts = _CAMEL_PART.findall(word)
+        if len(parts) > 1:
+            terms.extend(part.lower() for part in parts)
+    return terms
+
+
+def source_terms(source: str) -> List[str]:
+    """Terms of a source path: its words plus the whole file name and path as literal terms"""
+    path = source.replace("\\", "/").lower()
+    return tokenize(source) + [posixpath.basename(path), path]
+
+
+def query_terms(query: str) -> List[str]:
+    """Distinct terms of a query; a query without whitespace also matches file names and paths literally"""
+    terms = tokenize(query)
+    literal = query.strip()
+    if literal and not any(character.isspace() for character in literal):
+        terms.append(literal.replace("\\", "/").lower())
+    return list(dict.fromkeys(terms))
+
+
+class LexicalHit(NamedTuple):
+    id: str
+    score: float
+    # Share of the distinct query terms found in the document
+    coverage: float
+
+
+class _CollectionIndex:
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+        # Guards the fields above once the index is published, so scoring only blocks its own collection
+        self.lock = Lock()
+
+    def apply(self, updates: Iterable[Tuple[str, Optional[Counter]]]) -> None:
+        for doc_id, terms in updates:
+            if terms is None:
+                self.remove(doc_id)
+            else:
+                self.add(doc_id, terms)
+
+    def add(self, doc_id: str, terms: Counter) -> None:
+        self.remove(doc_id)
+        self.doc_terms[doc_id] = terms
+        length = sum(terms.values())
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+
+    def remove(self, doc_id: str) -> None:
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        for term in terms:
+            postings = self.postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self.postings[term]
+
+
+class LexicalIndex:
+    """
+    In-memory BM25 inverted index over the sources and documents of each collection.
+
+    A collection's index is built from the store on its first lexical search and kept up to
+    date by the writes of this process afterwards. Writes of other processes are only noticed
+    when they change the number of items, which makes the next search rebuild the index.
+    Source terms count source_weight times, so a file name match outranks a passing mention
+    in a document body.
+
+    Each collection's index has its own lock, so scoring a query in a large collection does not
+    hold up searches and writes of the other collections.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, source_weight: int = 3):
+        """
+        Initialize the index.
+
+        Args:
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+            source_weight: How many times a source term counts compared to a document term
+        """
+        self.k1 = k1
+        self.b = b
+        self.source_weight = source_weight
+        self._indexes: Dict[str, _CollectionIndex] = {}
+        # Writes made while a collection's index is being built, replayed on top of it
+        self._pending: Dict[str, List[Tuple[str, Optional[Counter]]]] = {}
+        self._build_locks: Dict[str, Lock] = {}
+        self._lock = Lock()
+
+    def _terms(self, source: Optional[str], document: Optional[str]) -> Counter:
+        terms = Counter(tokenize(document or ""))
+        for term in source_terms(source or ""):
+            terms[term] += self.source_weight
+        return terms
+
+    @staticmethod
+    def _is_current(index: Optional[_CollectionIndex], count: Optional[int]) -> bool:
+        return index is not None and (count is None or len(index.doc_lengths) == count)
+
+    def ensure(self, collection_name: str,
+               loader: Callable[[], Iterable[Tuple[str, Optional[str], Optional[str]]]],
+               count: Optional[int] = None) -> _CollectionIndex:
+        """
+        Build the index of a collection if it has not been built yet, or if it no longer
+        holds as many items as the collection. The collection is read without holding the
+        lock of the other collections' indexes.
+
+        Args:
+            collection_name: Name of the collection
+            loader: Callable yielding (id, source, document) for every item of the collection
+            count: Number of items of the collection, None to skip the staleness check
+
+        Returns:
+            The index of the collection, to pass to search
+        """
+        with self._lock:
+            index = self._indexes.get(collection_name)
+            if self._is_current(index, count):
+                return index
+            build_lock = self._build_locks.setdefault(collection_name, Lock())
+
+        with build_lock:
+            with self._lock:
+                index = self._indexes.get(collection_name)
+                # Built by another search while this one waited
+                if self._is_current(index, count):
+                    return index
+                pending = self._pending[collection_name] = []
+            if index is not None:
+                logger.info(f"Lexical index of collection '{collection_name}' holds {len(index.doc_lengths)} "
+                            f"of {count} items, rebuilding it")
+
+            index = _CollectionIndex()
+            try:
+                for doc_id, source, document in loader():
+                    index.add(doc_id, self._terms(source, document))
+            except BaseException:
+                with self._lock:
+                    if self._pending.get(collection_name) is pending:
+                        del self._pending[collection_name]
+                raise
+
+            with self._lock:
+                index.apply(pending)
+                # A collection dropped during the build keeps no index; this search still uses it
+                if self._pending.get(collection_name) is pending:
+                    del self._pending[collection_name]
+                    self._indexes[collection_name] = index
+        logger.info(f"Built lexical index of collection '{collection_name}' with {len(index.doc_lengths)} items")
+        return index
+
+    def add(self, collection_name: str, items: Iterable[Tuple[str, Optional[str], Optional[str]]]) -> None:
+        """
+        Index new or replaced items of a collection. Collections whose index is not built are skipped,
+        their items are read from the store when it is.
+
+        Args:
+            collection_name: Name of the collection
+            items: (id, source, document) of every item
+        """
+        if self._is_tracked(collection_name):
+            self._update(collection_name, [
+                (doc_id, self._terms(source, document)) for doc_id, source, document in items
+            ])
+
+    def remove(self, collection_name: str, ids: Iterable[str]) -> None:
+        """
+        Remove items from the index of a collection.
+
+        Args:
+            collection_name: Name of the collection
+            ids: Ids of the removed items
+        """
+        if self._is_tracked(collection_name):
+            self._update(collection_name, [(doc_id, None) for doc_id in ids])
+
+    def _is_tracked(self, collection_name: str) -> bool:
+        # Whether the collection's index is built or being built, so writes must reach it
+        with self._lock:
+            return collection_name in self._indexes or collection_name in self._pending
+
+    def _update(self, collection_name: str, updates: List[Tuple[str, Optional[Counter]]]) -> None:
+        # Updates are queued for a build in progress and the published index is looked up under the same
+        # lock hold, so a build that publishes in between still sees them
+        with self._lock:
+            pending = self._pending.get(collection_name)
+            if pending is not None:
+                pending.extend(updates)
+            index = self._indexes.get(collection_name)
+        if index is not None:
+            with index.lock:
+                index.apply(updates)
+
+    def drop(self, collection_name: str) -> None:
+        """
+        Forget the index of a collection, including one being built.
+
+        Args:
+            collection_name: Name of the collection
+        """
+        with self._lock:
+            self._indexes.pop(collection_name, None)
+            self._pending.pop(collection_name, None)
+            self._build_locks.pop(collection_name, None)
+
+    def search(self, index: _CollectionIndex, query: str, limit: int) -> List[LexicalHit]:
+        """
+        Rank the items of a collection against a query with BM25.
+
+        Args:
+            index: Index of the collection, as returned by ensure
+            query: The query string
+            limit: Maximum number of hits
+
+        Returns:
+            Hits ordered by descending score
+        """
+        terms = query_terms(query)
+        with index.lock:
+            documents = len(index.doc_lengths)
+            if not terms or not documents:
+                return []
+            average_length = index.total_length / documents
+            scores: Dict[str, float] = {}
+            matched: Counter = Counter()
+            for term in terms:
+                postings = index.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * index.doc_lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+                    matched[doc_id] += 1
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [LexicalHit(doc_id, score, matched[doc_id] / len(terms)) for doc_id, score in top]
+
+    @staticmethod
+    def is_strong(hits: List[LexicalHit], margin: float) -> bool:
+        """
+        Whether the top hit answers the query on its own: it contains every query term
+        and outscores the runner-up by the given margin.
+
+        Args:
+            hits: Hits ordered by descending score
+            margin: Minimum ratio between the top and the second score
+
+        Returns:
+            True if the lexical hits can be returned without a vector search
+        """
+        if not hits or hits[0].coverage < 1.0:
+            return False
+        return len(hits) == 1 or hits[0].score >= margin * hits[1].score
@@ -0,0 +1,123 @@
+import posixpath
+from typing import Any, Dict, List, Optional
+
+# Filters a search accepts, each translated into a Chroma where condition
+FILTER_KEYS = ("path_prefix", "directory", "extension", "max_depth")
+# Metadata key holding the first n directory components of a source, e.g. dir_2 = "src/app"
+ANCESTOR_KEY = "dir_{}"
+# Collection metadata key of the project directory that path metadata is relative to
+BASE_PATH_KEY = "base_path"
+
+
+def _normalize(path: str) -> str:
+    path = path.replace("\\", "/")
+    normalized = posixpath.normpath(path) if path else ""
+    return "" if normalized == "." else normalized
+
+
+def _components(directory: str) -> List[str]:
+    return [part for part in directory.split("/") if part]
+
+
+def _ancestor(directory: str, depth: int) -> str:
+    root = "/" if directory.startswith("/") else ""
+    return root + "/".join(_components(directory)[:depth])
+
+
+def _extension(extension: str) -> str:
+    extension = extension.lower()
+    return extension if extension.startswith(".") else "." + extension
+
+
+def relative_source(source: str, base_path: Optional[str] = None) -> str:
+    """
+    Normalize a source path, relative to base_path when the source lies under it.
+
+    Args:
+        source: Source path of the document
+        base_path: Project directory of the collection
+
+    Returns:
+        The normalized path, e.g. "src/a.py" for "/workspace/project/src/a.py" under "/workspace/project"
+    """
+    normalized = _normalize(source)
+    base = _normalize(base_path or "").rstrip("/")
+    if base_path and normalized.startswith(base + "/"):
+        return normalized[len(base) + 1:]
+    return normalized
+
+
+def path_metadata(source: str, base_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Derive the filterable path components of a source path.
+    Chroma's where clause has no prefix match, so every ancestor directory is stored
+    under its own dir_<n> key and a prefix filter becomes an equality on one key.
+    Components are counted from base_path for sources under it, so filters such as
+    path_prefix="src" work with absolute sources.
+
+    Args:
+        source: Source path of the document
+        base_path: Project directory of the collection, None to count from the root of the source
+
+    Returns:
+        Dictionary with the directory, the lower-case extension, the depth (number of
+        directory components) and the dir_<n> ancestors
+    """
+    normalized = relative_source(source, base_path)
+    directory = posixpath.dirname(normalized)
+    depth = len(_components(directory))
+    metadata = {
+        "directory": directory,
+        "extension": posixpath.splitext(normalized)[1].lower(),
+        "depth": depth,
+    }
+    for level in range(1, depth + 1):
+        metadata[ANCESTOR_KEY.format(level)] = _ancestor(directory, level)
+    return metadata
+
+
+def has_path_metadata(metadata: Optional[Dict[str, Any]]) -> bool:
+    """Whether the metadata already carries the fields written by path_metadata"""
+    return bool(metadata) and "directory" in metadata and "depth" in metadata
+
+
+def build_where(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Translate search filters into a Chroma where clause.
+
+    Args:
+        filters: Dictionary with some of
+            path_prefix: only documents under this directory, e.g. "src" or "src/app"
+            directory: only documents directly in this directory
+            extension: a file extension or list of extensions, e.g. ".py" or ["py", "pyi"]
+            max_depth: only documents at most this many directories deep
+
+    Returns:
+        The where clause, or None when there is nothing to filter on
+    """
+    if not filters:
+        return None
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown filters {sorted(unknown)}, expected some of {list(FILTER_KEYS)}")
+
+    conditions = []
+    if filters.get("path_prefix"):
+        prefix = _normalize(filters["path_prefix"])
+        depth = len(_components(prefix))
+        if depth:
+            conditions.append({ANCESTOR_KEY.format(depth): _ancestor(prefix, depth)})
+    if filters.get("directory") is not None:
+        conditions.append({"directory": _normalize(filters["directory"])})
+    if filters.get("extension"):
+        extensions = filters["extension"]
+        if isinstance(extensions, str):
+            conditions.append({"extension": _extension(extensions)})
+        else:
+            conditions.append({"extension": {"$in": [_extension(extension) for extension in extensions]}})
+    if filters.get("max_depth") is not None:
+        conditions.append({"depth": {"$lte": int(filters["max_depth"])}})
+
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
@@ -0,0 +1,126 @@
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from threading import Lock
+from typing import List, Optional
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from app.logging.logging_config import get_logger
+
+logger = get_logger()
+
+# Model replica of the current worker process, loaded by _init_worker
+_worker_model = None
+
+
+def _init_worker(model_name: str, threads_per_worker: int, device: str) -> None:
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads_per_worker)
+    _worker_model = SentenceTransformer(model_name, device=device)
+
+
+def _worker_dimension() -> int:
+    return _worker_model.get_sentence_embedding_dimension()
+
+
+def _encode_into(shm_name: str, start_row: int, texts: List[str], dimension: int) -> int:
+    # Spawned workers share the parent's resource tracker, so attaching here does not
+    # transfer ownership: the parent still unlinks the segment
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray(
+            (len(texts), dimension), dtype=np.float32, buffer=shm.buf, offset=start_row * dimension * 4
+        )
+        out[:] = _worker_model.encode(texts, convert_to_numpy=True)
+        del out
+    finally:
+        shm.close()
+    return len(texts)
+
+
+class ProcessPoolEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Embedding function that shards large batches across worker processes, each holding its
+    own SentenceTransformer replica, so encoding is not limited by one interpreter's GIL.
+    Workers write vectors straight into a shared memory block instead of pickling them back.
+
+    Pass an instance as the embedding_function argument of ChromaVectorStore.
+    """
+
+    def __init__(self, model_name: str, workers: int = 4, threads_per_worker: int = 1,
+                 min_shard_size: int = 32, device: str = "cpu"):
+        """
+        Initialize the backend. Worker processes are started on first use.
+
+        Args:
+            model_name: Name or path of the SentenceTransformer model
+            workers: Number of worker processes
+            threads_per_worker: Number of PyTorch threads in each worker
+            min_shard_size: Minimum number of texts sent to one worker
+            device: Device the replicas run on
+        """
+        self.model_name = model_name
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self.min_shard_size = min_shard_size
+        self.device = device
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._dimension: Optional[int] = None
+        self._lock = Lock()
+
+    def _start(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    logger.info(
+                        f"Starting {self.workers} embedding worker processes for {self.model_name} "
+                        f"with {self.threads_per_worker} thread(s) each"
+                    )
+                    executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        # Forking a process that already initialized PyTorch threads is unsafe
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                        initargs=(self.model_name, self.threads_per_worker, self.device)
+                    )
+                    # Submitting one task per worker starts, and loads the model in, every process
+                    dimensions = [executor.submit(_worker_dimension) for _ in range(self.workers)]
+                    self._dimension = dimensions[0].result()
+                    wait(dimensions)
+                    self._executor = executor
+        return self._executor
+
+    def __call__(self, input: Documents) -> Embeddings:
+        texts = list(input)
+        if not texts:
+            return []
+        executor = self._start()
+        dimension = self._dimension
+
+        shard_size = max(self.min_shard_size, math.ceil(len(texts) / self.workers))
+        shm = shared_memory.SharedMemory(create=True, size=len(texts) * dimension * 4)
+        try:
+            futures = [
+                executor.submit(_encode_into, shm.name, start, texts[start:start + shard_size], dimension)
+                for start in range(0, len(texts), shard_size)
+            ]
+            for future in futures:
+                future.result()
+            vectors = np.ndarray((len(texts), dimension), dtype=np.float32, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+        return list(vectors)
+
+    def close(self) -> None:
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
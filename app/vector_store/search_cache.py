@@ -0,0 +1,160 @@
+import pickle
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.logging.logging_config import get_logger
+
+logger = get_logger()
+
+
+class SearchResultCache:
+    """
+    Bounded LRU cache of search results with a TTL.
+
+    Every collection has a generation counter that is part of the cache key. Bumping it on
+    writes makes all earlier entries of the collection unreachable, so stale results are never
+    served by this process; they age out of the LRU. Writes made by other processes sharing the
+    store are only picked up once entries expire after ttl seconds.
+
+    Results are stored pickled: callers can modify what they put or get without changing the
+    cached entry, and the pickled size bounds the memory of the cache.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 300.0, max_bytes: int = 0):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached results
+            ttl_seconds: Seconds after which a cached result expires
+            max_bytes: Maximum total size of the pickled results, 0 for no limit
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, Tuple[float, bytes]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        # Bumped when a collection is forgotten, so a search that started before cannot cache its result
+        self._epoch = 0
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """
+        Normalize a query so that queries differing only in whitespace share a cache entry.
+
+        Args:
+            query: The query string
+
+        Returns:
+            The normalized query
+        """
+        return " ".join(query.split())
+
+    def _key(self, collection_name: str, params: Hashable) -> Tuple:
+        return (collection_name, self._generations.get(collection_name, 0), params)
+
+    def _remove(self, key: Tuple) -> None:
+        self._bytes -= len(self._entries.pop(key)[1])
+
+    def get(self, collection_name: str, params: Hashable) -> Optional[Any]:
+        """
+        Get the cached result of a search.
+
+        Args:
+            collection_name: Name of the searched collection
+            params: Hashable search parameters, including the normalized query
+
+        Returns:
+            A copy of the cached result, or None on a miss
+        """
+        with self._lock:
+            key = self._key(collection_name, params)
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                data = entry[1]
+            else:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+        return pickle.loads(data)
+
+    def put(self, collection_name: str, params: Hashable, result: Any, generation: Tuple[int, int]) -> None:
+        """
+        Cache the result of a search, unless the collection was written to while it ran.
+
+        Args:
+            collection_name: Name of the searched collection
+            params: Hashable search parameters, including the normalized query
+            result: The search result
+            generation: Value of generation() read before the search started
+        """
+        if self.max_entries <= 0:
+            return
+        data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        if self.max_bytes and len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if (self._epoch, self._generations.get(collection_name, 0)) != generation:
+                return
+            key = self._key(collection_name, params)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), data)
+            self._bytes += len(data)
+            while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def generation(self, collection_name: str) -> Tuple[int, int]:
+        """
+        Get the current generation of a collection.
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            Opaque generation value to pass to put
+        """
+        with self._lock:
+            return self._epoch, self._generations.get(collection_name, 0)
+
+    def invalidate(self, collection_name: str) -> None:
+        """
+        Bump the generation of a collection so its cached results are no longer served.
+
+        Args:
+            collection_name: Name of the collection that was written to
+        """
+        with self._lock:
+            self._generations[collection_name] = self._generations.get(collection_name, 0) + 1
+
+    def forget(self, collection_name: str) -> None:
+        """
+        Drop the cached results and the generation counter of a deleted collection.
+
+        Args:
+            collection_name: Name of the deleted collection
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == collection_name]:
+                self._remove(key)
+            self._generations.pop(collection_name, None)
+            self._epoch += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with hit, miss and entry counts and the size of the entries in bytes
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
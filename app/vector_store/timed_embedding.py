@@ -0,0 +1,23 @@
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+
+class TimedEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Embedding function recording the duration of every call of the wrapped function in a
+    Prometheus histogram.
+    """
+
+    def __init__(self, embedding_function: EmbeddingFunction, histogram):
+        """
+        Initialize the timed embedding function.
+
+        Args:
+            embedding_function: The embedding function to time
+            histogram: Prometheus histogram receiving the call durations
+        """
+        self.embedding_function = embedding_function
+        self.histogram = histogram
+
+    def __call__(self, input: Documents) -> Embeddings:
+        with self.histogram.time():
+            return self.embedding_function(input)
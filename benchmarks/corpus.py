@@ -0,0 +1,81 @@
+import random
+from typing import Dict, List
+
+_DIRECTORIES = [
+    "app", "api", "core", "services", "models", "utils", "handlers", "config", "db", "tests",
+    "components", "hooks", "pages", "scripts", "workers", "auth", "billing", "search", "storage"
+]
+_EXTENSIONS = {
+    ".py": "Python", ".ts": "TypeScript", ".tsx": "TypeScript React", ".js": "JavaScript",
+    ".java": "Java", ".go": "Go", ".md": "Markdown", ".yaml": "YAML", ".json": "JSON"
+}
+_NOUNS = [
+    "request", "response", "collection", "user", "session", "token", "cache", "queue", "message",
+    "record", "schema", "index", "query", "result", "payload", "config", "client", "server",
+    "handler", "middleware", "router", "model", "embedding", "document", "file", "project",
+    "permission", "event", "job", "worker", "connection", "transaction", "migration", "report"
+]
+_VERBS = [
+    "creates", "validates", "parses", "loads", "stores", "updates", "deletes", "fetches",
+    "serializes", "transforms", "publishes", "consumes", "retries", "caches", "indexes", "renders"
+]
+_QUALIFIERS = [
+    "asynchronously", "in batches", "with retries", "for the current user", "from the database",
+    "through the REST API", "on startup", "when the cache misses", "per project", "in the background"
+]
+
+
+def _sentence(rng: random.Random) -> str:
+    return (
+        f"The {rng.choice(_NOUNS)} {rng.choice(_NOUNS)} {rng.choice(_VERBS)} the "
+        f"{rng.choice(_NOUNS)} {rng.choice(_QUALIFIERS)}."
+    )
+
+
+def _summary(rng: random.Random, path: str, language: str) -> str:
+    # Most summaries are a short paragraph, a few are long multi-paragraph descriptions
+    paragraphs = min(1 + int(rng.expovariate(0.6)), 12)
+    body = "\n\n".join(
+        " ".join(_sentence(rng) for _ in range(rng.randint(2, 6))) for _ in range(paragraphs)
+    )
+    symbols = ", ".join(f"{rng.choice(_VERBS)[:-1]}_{rng.choice(_NOUNS)}" for _ in range(rng.randint(0, 8)))
+    return f"File: {path}\nLanguage: {language}\nSummary: {body}\nDefines: {symbols or 'nothing'}"
+
+
+def generate_corpus(documents: int, seed: int = 0) -> Dict[str, str]:
+    """
+    Generate file summaries shaped like the add_data payloads of the service.
+
+    Args:
+        documents: Number of files to generate
+        seed: Seed of the generator, the same seed always gives the same corpus
+
+    Returns:
+        Dictionary mapping file paths to summaries
+    """
+    rng = random.Random(seed)
+    corpus = {}
+    while len(corpus) < documents:
+        extension = rng.choice(list(_EXTENSIONS))
+        directories = "/".join(rng.choice(_DIRECTORIES) for _ in range(rng.randint(1, 4)))
+        path = f"{directories}/{rng.choice(_NOUNS)}_{rng.choice(_NOUNS)}_{len(corpus)}{extension}"
+        corpus[path] = _summary(rng, path, _EXTENSIONS[extension])
+    return corpus
+
+
+def generate_queries(queries: int, seed: int = 1) -> List[str]:
+    """
+    Generate distinct natural-language search queries over the corpus vocabulary.
+
+    Args:
+        queries: Number of queries to generate
+        seed: Seed of the generator
+
+    Returns:
+        List of queries
+    """
+    rng = random.Random(seed)
+    return [
+        f"where is the {rng.choice(_NOUNS)} that {rng.choice(_VERBS)} {rng.choice(_NOUNS)} {rng.choice(_QUALIFIERS)} #{index}"
+        for index in range(queries)
+    ]
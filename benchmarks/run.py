@@ -0,0 +1,341 @@
+"""
+Benchmark suite of the vector store service. Runs without network access: Chroma is opened
+in a temporary directory, the API is driven in-process through ASGI and Redis is replaced by
+fakeredis unless --redis-url is given.
+
+    python -m benchmarks.run --documents 2000 --queries 200
+    python -m benchmarks.run --real-model --scenarios ingest search
+
+Results are written as JSON so runs can be compared over time.
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+_work_dir = tempfile.mkdtemp(prefix="vector-store-bench-")
+atexit.register(shutil.rmtree, _work_dir, ignore_errors=True)
+# Configuration is read at import time, so it has to be in place before importing the app
+os.environ.setdefault("CHROMA_DB_STORE", os.path.join(_work_dir, "chroma"))
+os.environ.setdefault("LOG_DIR", os.path.join(_work_dir, "logs"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("WARM_UP_ON_STARTUP", "false")
+os.environ.setdefault("VECTOR_STORE_QUEUE", "bench_requests")
+os.environ.setdefault("VECTOR_STORE_RESPONSE_QUEUE", "bench_responses")
+
+import chromadb  # noqa: E402
+
+from app import main, startup  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.messaging import redis_pubsub  # noqa: E402
+from app.queue_manager import QueueManager  # noqa: E402
+from app.vector_store.chroma_vector_store import ChromaVectorStore  # noqa: E402
+from benchmarks.corpus import generate_corpus, generate_queries  # noqa: E402
+from benchmarks.stub_embedder import StubEmbeddingFunction  # noqa: E402
+
+SCENARIOS = ["ingest", "search", "api", "redis"]
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """
+    Summarize latencies in milliseconds.
+
+    Args:
+        samples: Latencies in seconds
+
+    Returns:
+        Dictionary with count, mean, p50, p95, p99 and max
+    """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000
+    }
+
+
+def _chunks(corpus: Dict[str, str], size: int) -> List[Dict[str, str]]:
+    items = list(corpus.items())
+    return [dict(items[start:start + size]) for start in range(0, len(items), size)]
+
+
+def use_store(store: ChromaVectorStore) -> None:
+    """Point the API and the queue handlers at the benchmark store"""
+    main.chroma_vector_store = store
+    startup.chroma_vector_store = store
+
+
+def bench_ingest(store: ChromaVectorStore, corpus: Dict[str, str], args) -> Dict[str, Any]:
+    chunks = _chunks(corpus, args.batch_size)
+
+    started = time.perf_counter()
+    for chunk in chunks:
+        store.add_dictionary("bench_ingest", chunk)
+    add_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for chunk in chunks:
+        store.sync_dictionary("bench_sync", chunk)
+    sync_seconds = time.perf_counter() - started
+
+    # Nothing changed, so the second sync only hashes and compares
+    started = time.perf_counter()
+    for chunk in chunks:
+        store.sync_dictionary("bench_sync", chunk)
+    resync_seconds = time.perf_counter() - started
+
+    return {
+        "documents": len(corpus),
+        "batch_size": args.batch_size,
+        "add_docs_per_second": len(corpus) / add_seconds,
+        "sync_docs_per_second": len(corpus) / sync_seconds,
+        "unchanged_resync_docs_per_second": len(corpus) / resync_seconds
+    }
+
+
+def bench_search(store: ChromaVectorStore, queries: List[str], args) -> Dict[str, Any]:
+    def run_all() -> List[float]:
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            store.search(query, args.n_results, "bench_ingest")
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    uncached = run_all()
+    # The same queries again are answered by the search result cache
+    cached = run_all()
+    return {"n_results": args.n_results, "uncached": latency_summary(uncached), "cached": latency_summary(cached)}
+
+
+def bench_api(queries: List[str], args) -> Dict[str, Any]:
+    import httpx
+
+    async def run() -> Dict[str, Any]:
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+        statuses: Dict[int, int] = {}
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def one(query: str) -> None:
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post(
+                        "/collections/bench_ingest/search", json={"query": query, "n_results": args.n_results}
+                    )
+                    latencies.append(time.perf_counter() - started)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            # Distinct query texts so the search cache does not answer the requests
+            requests = [f"{queries[index % len(queries)]} api {index}" for index in range(args.api_requests)]
+            started = time.perf_counter()
+            await asyncio.gather(*(one(query) for query in requests))
+            elapsed = time.perf_counter() - started
+        return {
+            "requests": len(requests),
+            "concurrency": args.concurrency,
+            "requests_per_second": len(requests) / elapsed,
+            "statuses": {str(status): count for status, count in sorted(statuses.items())},
+            "latency": latency_summary(latencies)
+        }
+
+    return asyncio.run(run())
+
+
+def _connect_redis(args) -> str:
+    """Install the connection pool used by every queue manager, returning a description of it"""
+    if args.redis_url:
+        redis_pubsub._connection_pool = redis_pubsub.redis.BlockingConnectionPool.from_url(
+            args.redis_url, max_connections=Config.REDIS_MAX_CONNECTIONS
+        )
+        return args.redis_url
+    import fakeredis
+    redis_pubsub._connection_pool = fakeredis.FakeRedis().connection_pool
+    return "fakeredis"
+
+
+def _await_responses(expected: int, responses: Dict[str, float], timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while len(responses) < expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def bench_redis(corpus: Dict[str, str], queries: List[str], args) -> Dict[str, Any]:
+    target = _connect_redis(args)
+    request_queue = f"{Config.VECTOR_STORE_QUEUE}_{uuid.uuid4().hex[:8]}"
+    collection_name = "bench_redis"
+
+    responses: Dict[str, float] = {}
+    errors = []
+
+    def on_responses(messages: List[Any]) -> None:
+        received_at = time.perf_counter()
+        for message in messages:
+            if isinstance(message, dict):
+                if message.get("status") == "error":
+                    errors.append(message.get("error"))
+                responses[message.get("request_id")] = received_at
+
+    response_consumer = QueueManager(receive_queue_url=Config.VECTOR_STORE_RESPONSE_QUEUE)
+    response_consumer.start_background_processing(on_responses, batch_size=Config.QUEUE_DRAIN_BATCH_SIZE)
+    worker = QueueManager(receive_queue_url=request_queue)
+    worker.start_background_processing(
+        startup.batch_message_handler,
+        workers=Config.QUEUE_WORKERS,
+        partition_key=startup.message_partition_key,
+        batch_size=Config.QUEUE_DRAIN_BATCH_SIZE
+    )
+    producer = QueueManager(send_queue_url=request_queue)
+
+    def run_phase(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        responses.clear()
+        sent_at = {}
+        started = time.perf_counter()
+        for message in messages:
+            sent_at[message["request_id"]] = time.perf_counter()
+            producer.send_message(message)
+        _await_responses(len(messages), responses, args.redis_timeout)
+        elapsed = time.perf_counter() - started
+        return {
+            "messages": len(messages),
+            "responses": len(responses),
+            "seconds": elapsed,
+            "latency": latency_summary([
+                responses[request_id] - sent for request_id, sent in sent_at.items() if request_id in responses
+            ])
+        }
+
+    try:
+        add_messages = [
+            {"action": "add_data", "request_id": str(uuid.uuid4()), "collection_name": collection_name, "data": chunk}
+            for chunk in _chunks(corpus, args.message_size)
+        ]
+        ingest = run_phase(add_messages)
+        ingest["docs_per_second"] = len(corpus) / ingest["seconds"]
+
+        search_messages = [
+            {"action": "search", "request_id": str(uuid.uuid4()), "collection_name": collection_name,
+             "query": f"{query} redis", "n_results": args.n_results}
+            for query in queries
+        ]
+        search = run_phase(search_messages)
+        search["messages_per_second"] = search["responses"] / search["seconds"]
+    finally:
+        worker.stop_background_processing()
+        startup.get_response_queue_manager().redis_publisher.flush()
+        response_consumer.stop_background_processing()
+
+    return {
+        "redis": target,
+        "queue_backend": Config.QUEUE_BACKEND,
+        "workers": Config.QUEUE_WORKERS,
+        "message_size": args.message_size,
+        "add_data": ingest,
+        "search": search,
+        "errors": errors[:10]
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def parse_args(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the vector store service without network access")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--documents", type=int, default=1000, help="Size of the synthetic corpus")
+    parser.add_argument("--queries", type=int, default=200, help="Number of distinct search queries")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the corpus and query generators")
+    parser.add_argument("--batch-size", type=int, default=256, help="Documents per add call in the ingest scenario")
+    parser.add_argument("--n-results", type=int, default=25)
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent requests in the API scenario")
+    parser.add_argument("--api-requests", type=int, default=500)
+    parser.add_argument("--message-size", type=int, default=16, help="Documents per add_data queue message")
+    parser.add_argument("--redis-url", help="Redis to benchmark against, e.g. redis://localhost:6379/0; "
+                                            "defaults to an in-process fakeredis")
+    parser.add_argument("--redis-timeout", type=float, default=300, help="Seconds to wait for queue responses")
+    parser.add_argument("--real-model", action="store_true",
+                        help="Embed with the configured model instead of the stub embedder")
+    parser.add_argument("--output", help="JSON result file, defaults to benchmarks/results/<timestamp>.json")
+    return parser.parse_args(argv)
+
+
+def main_cli(argv: List[str] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    corpus = generate_corpus(args.documents, seed=args.seed)
+    queries = generate_queries(args.queries, seed=args.seed + 1)
+
+    client = chromadb.PersistentClient(path=os.path.join(_work_dir, "bench_chroma"))
+    store = ChromaVectorStore(client=client, embedding_function=None if args.real_model else StubEmbeddingFunction())
+    if args.real_model:
+        store.warm_up()
+    use_store(store)
+
+    benchmarks: Dict[str, Callable[[], Dict[str, Any]]] = {
+        "ingest": lambda: bench_ingest(store, corpus, args),
+        "search": lambda: bench_search(store, queries, args),
+        "api": lambda: bench_api(queries, args),
+        "redis": lambda: bench_redis(corpus, queries, args),
+    }
+    # Search scenarios read the collection written by the ingest scenario
+    selected = [name for name in SCENARIOS if name in args.scenarios]
+    if any(name in selected for name in ("search", "api")) and "ingest" not in selected:
+        selected.insert(0, "ingest")
+
+    results = {}
+    for name in selected:
+        print(f"Running {name} benchmark...", file=sys.stderr)
+        results[name] = benchmarks[name]()
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "embedder": store.model_name,
+        "parameters": vars(args),
+        "corpus_characters": sum(len(text) for text in corpus.values()),
+        "results": results
+    }
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results",
+        f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+    return report
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,34 @@
+import hashlib
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+
+class StubEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Deterministic, model-free embedding function for measuring the overhead around the model.
+
+    Every token is hashed to a signed dimension of the vector (the hashing trick), so texts
+    sharing words get similar vectors and searches return meaningful neighbours.
+    """
+
+    def __init__(self, dimension: int = 384):
+        """
+        Initialize the stub.
+
+        Args:
+            dimension: Length of the produced vectors
+        """
+        self.dimension = dimension
+        self.model_name = f"stub-{dimension}"
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in text.lower().split():
+            digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dimension] += 1.0 if digest & (1 << 63) else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return [self._embed(text) for text in input]
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.async_executor import BoundedExecutor, ExecutorSaturatedError
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    monkeypatch.setattr(main, "chroma_vector_store", store)
+    monkeypatch.setattr(main, "ingest_executor", BoundedExecutor("ingest", max_workers=2, max_queue=8))
+    monkeypatch.setattr(main, "search_executor", BoundedExecutor("search", max_workers=2, max_queue=8))
+    return TestClient(main.app)
+
+
+def test_saturated_executor_answers_503(client, store, monkeypatch):
+    store.add_dictionary("project", {"a.py": "alpha"})
+    monkeypatch.setattr(main, "search_executor", BoundedExecutor("search", max_workers=1, max_queue=0))
+
+    response = client.post("/collections/project/search", json={"query": "alpha"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert main.search_executor.stats()["rejected"] == 1
+
+
+def test_ingest_does_not_depend_on_the_search_executor(client, store, monkeypatch):
+    store.create_collection("project")
+    monkeypatch.setattr(main, "search_executor", BoundedExecutor("search", max_workers=1, max_queue=0))
+
+    response = client.post("/collections/project/items", json={"item_dict": {"a.py": "alpha"}})
+
+    assert response.status_code == 200
+    assert store.get_collection("project").count() == 1
+
+
+def test_executor_rejects_tasks_beyond_its_queue():
+    executor = BoundedExecutor("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        while executor.stats()["in_flight"] == 0:
+            await asyncio.sleep(0.01)
+        queued = asyncio.ensure_future(executor.run(lambda: "queued"))
+        await asyncio.sleep(0)
+        with pytest.raises(ExecutorSaturatedError):
+            await executor.run(lambda: "rejected")
+        release.set()
+        return await running, await queued
+
+    try:
+        assert asyncio.run(scenario()) == (True, "queued")
+        assert executor.stats()["rejected"] == 1
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_search_in_missing_collection_answers_404(client):
+    response = client.post("/collections/missing/search", json={"query": "alpha"})
+
+    assert response.status_code == 404
+
+
+def test_invalid_search_parameters_answer_400(client, store, monkeypatch):
+    store.add_dictionary("project", {"a.py": "alpha"})
+
+    def search(**kwargs):
+        raise ValueError("Unknown filters ['owner']")
+    monkeypatch.setattr(store, "search", search)
+    response = client.post("/collections/project/search", json={"query": "alpha"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown filters ['owner']"
+
+
+def test_non_positive_n_results_is_rejected(client, store):
+    store.add_dictionary("project", {"a.py": "alpha"})
+
+    assert client.post("/collections/project/search", json={"query": "alpha", "n_results": 0}).status_code == 422
+    with pytest.raises(ValueError):
+        store.search("alpha", 0, "project")
+    with pytest.raises(ValueError):
+        store.search_batch([{"query": "alpha", "n_results": -1}], "project")
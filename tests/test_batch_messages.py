@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+import app.startup as startup
+
+
+@pytest.fixture
+def responses(fake_redis, store, monkeypatch):
+    """Handle messages with the test store; returns a function reading the published responses"""
+    monkeypatch.setattr(startup, "chroma_vector_store", store)
+    monkeypatch.setattr(startup.Config, "VECTOR_STORE_RESPONSE_QUEUE", "responses")
+    monkeypatch.setattr(startup, "_response_queue_manager", None)
+
+    def read():
+        startup.get_response_queue_manager().close()
+        return [json.loads(data) for data in fake_redis.lrange("responses", 0, -1)]
+    return read
+
+
+def add_data(request_id, data, sync=False):
+    return {"action": "add_data", "collection_name": "project", "data": data, "sync": sync, "request_id": request_id}
+
+
+def test_adjacent_add_data_messages_share_one_write(store, responses, monkeypatch):
+    calls = []
+    add_dictionary = store.add_dictionary
+    monkeypatch.setattr(store, "add_dictionary", lambda name, data: (calls.append(sorted(data)), add_dictionary(name, data)))
+
+    startup.batch_message_handler([add_data("r0", {"a.py": "alpha"}), add_data("r1", {"b.py": "beta"})])
+
+    assert calls == [["a.py", "b.py"]]
+    assert [(response["request_id"], response["status"]) for response in responses()] == [("r0", "success"), ("r1", "success")]
+    assert store.get_collection("project").count() == 2
+
+
+def test_messages_repeating_a_source_are_not_merged(store, responses, monkeypatch):
+    calls = []
+    add_dictionary = store.add_dictionary
+    monkeypatch.setattr(store, "add_dictionary", lambda name, data: (calls.append(sorted(data)), add_dictionary(name, data)))
+
+    startup.batch_message_handler([add_data("r0", {"a.py": "one"}), add_data("r1", {"a.py": "two"})])
+
+    assert calls == [["a.py"], ["a.py"]]
+    assert len(responses()) == 2
+
+
+def test_coalesced_sync_answers_each_message_with_its_own_counts(store, responses):
+    store.sync_dictionary("project", {"a.py": "alpha"})
+
+    startup.batch_message_handler([
+        add_data("r0", {"a.py": "alpha", "b.py": "beta"}, sync=True),
+        add_data("r1", {"c.py": "gamma"}, sync=True),
+    ])
+
+    first, second = responses()
+    assert first["request_id"] == "r0"
+    assert {key: first[key] for key in ("added", "updated", "unchanged", "removed")} == \
+        {"added": 1, "updated": 0, "unchanged": 1, "removed": 0}
+    assert {key: second[key] for key in ("added", "updated", "unchanged", "removed")} == \
+        {"added": 1, "updated": 0, "unchanged": 0, "removed": 0}
+
+
+def test_coalesced_sync_response_matches_the_single_message_schema(store, responses):
+    startup.batch_message_handler([add_data("single", {"a.py": "alpha"}, sync=True)])
+    startup.batch_message_handler([add_data("r0", {"b.py": "beta"}, sync=True), add_data("r1", {"c.py": "gamma"}, sync=True)])
+
+    single, coalesced, _ = responses()
+    assert set(single) == set(coalesced)
+
+
+def test_failed_group_falls_back_to_one_message_at_a_time(store, responses):
+    startup.batch_message_handler([
+        add_data("r0", {"a.py": "alpha"}),
+        add_data("bad", {"b.py": 5}),
+        add_data("r2", {"c.py": "gamma"}),
+    ])
+
+    statuses = {response["request_id"]: response["status"] for response in responses()}
+    assert statuses == {"r0": "success", "bad": "error", "r2": "success"}
+    assert sorted(metadata["source"] for metadata in store.get_collection("project").get()["metadatas"]) == ["a.py", "c.py"]
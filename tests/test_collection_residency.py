@@ -0,0 +1,134 @@
+import sys
+from collections import namedtuple
+
+import pytest
+
+from app.vector_store.collection_residency import ChromaSegments, CollectionResidencyManager
+from benchmarks.stub_embedder import StubEmbeddingFunction
+
+Collection = namedtuple("Collection", ["name", "id"])
+
+
+class FakeSegments:
+    """Segments of a fixed size per collection, recording which ones were unloaded"""
+
+    supported = True
+
+    def __init__(self, sizes):
+        self.sizes = sizes
+        self.unloaded = []
+        self.loaded = []
+
+    def size(self, collection_id):
+        return self.sizes[collection_id]
+
+    def load(self, collection_id):
+        self.loaded.append(collection_id)
+
+    def unload(self, collection_id):
+        self.unloaded.append(collection_id)
+        return True
+
+
+def collections(*names):
+    return {name: Collection(name, f"id-{name}") for name in names}
+
+
+def manager(sizes, budget_bytes, **kwargs):
+    segments = FakeSegments({f"id-{name}": size for name, size in sizes.items()})
+    return CollectionResidencyManager(segments, budget_bytes=budget_bytes, **kwargs), segments
+
+
+def test_least_recently_used_collection_is_evicted():
+    evicted = []
+    residency, segments = manager({"a": 40, "b": 40, "c": 40}, budget_bytes=100, on_evict=evicted.append)
+    handles = collections("a", "b", "c")
+    for name in ("a", "b"):
+        with residency.use(handles[name]):
+            pass
+    with residency.use(handles["a"]):
+        pass
+
+    with residency.use(handles["c"]):
+        pass
+
+    assert segments.unloaded == ["id-b"]
+    assert evicted == ["b"]
+    assert residency.stats()["resident_bytes"] == 80
+    assert residency.stats()["evictions"] == 1
+
+
+def test_collection_in_use_is_not_evicted():
+    residency, segments = manager({"a": 60, "b": 60}, budget_bytes=100)
+    handles = collections("a", "b")
+
+    with residency.use(handles["a"]):
+        with residency.use(handles["b"]):
+            pass
+        assert segments.unloaded == []
+
+    assert segments.unloaded == ["id-b"]
+
+
+def test_collection_larger_than_the_budget_stays_loaded_while_most_recent():
+    residency, segments = manager({"a": 10, "big": 500}, budget_bytes=100)
+    handles = collections("a", "big")
+    with residency.use(handles["a"]):
+        pass
+
+    with residency.use(handles["big"]):
+        pass
+
+    assert segments.unloaded == ["id-a"]
+    assert residency.stats()["resident"] == 1
+
+    with residency.use(handles["a"]):
+        pass
+    assert segments.unloaded == ["id-a", "id-big"]
+
+
+def test_no_budget_never_evicts():
+    residency, segments = manager({"a": 500, "b": 500}, budget_bytes=0)
+    for handle in collections("a", "b").values():
+        with residency.use(handle):
+            pass
+
+    assert segments.unloaded == []
+
+
+def test_history_preloads_hottest_collections_within_budget(tmp_path):
+    history_path = str(tmp_path / "history.json")
+    residency, _ = manager({"a": 40, "b": 40, "c": 40}, budget_bytes=100, history_path=history_path)
+    for handle in collections("a", "b", "c").values():
+        with residency.use(handle):
+            pass
+    residency.save_history()
+
+    restarted, segments = manager({"a": 40, "b": 40, "c": 40}, budget_bytes=100, history_path=history_path)
+    handles = collections("a", "b", "c")
+    preloaded = [name for name in restarted.hot_collections(3) if restarted.preload(handles[name])]
+
+    assert preloaded == ["c", "b"]
+    assert segments.loaded == ["id-c", "id-b"]
+
+
+def test_chroma_vector_segments_are_unloaded_and_reloaded(store, chroma_client):
+    assert ChromaSegments.manages(chroma_client)
+    store.add_dictionary("project", {f"f{index}.py": f"document {index}" for index in range(50)})
+    collection = store.get_collection("project")
+    segments = ChromaSegments(lambda: chroma_client)
+    assert segments.size(collection.id) > 0
+
+    assert segments.unload(collection.id)
+    assert not segments.unload(collection.id)
+
+    assert len(store.search("document 7", 3, "project")) == 3
+
+
+def test_memory_budget_requires_a_client_it_can_manage(monkeypatch):
+    module = sys.modules["app.vector_store.chroma_vector_store"]
+    monkeypatch.setattr(module.Config, "COLLECTION_MEMORY_BUDGET_MB", 64)
+
+    assert not ChromaSegments.manages(object())
+    with pytest.raises(RuntimeError):
+        module.ChromaVectorStore(client=object(), embedding_function=StubEmbeddingFunction())
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from app.vector_store.embedding_batcher import BatchingEmbeddingFunction
+from benchmarks.stub_embedder import StubEmbeddingFunction
+
+
+class RecordingEmbedder:
+    def __init__(self, fail=False):
+        self.embedder = StubEmbeddingFunction(dimension=8)
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model failed")
+        return self.embedder(texts)
+
+
+def call_concurrently(function, inputs):
+    results = [None] * len(inputs)
+    start = threading.Barrier(len(inputs))
+
+    def call(index):
+        start.wait()
+        try:
+            results[index] = function(inputs[index])
+        except Exception as e:
+            results[index] = e
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(len(inputs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_share_a_forward_pass():
+    embedder = RecordingEmbedder()
+    batcher = BatchingEmbeddingFunction(embedder, max_batch_size=32, max_wait_ms=200)
+    inputs = [[f"query {index}"] for index in range(4)] + [["two", "texts"]]
+
+    results = call_concurrently(batcher, inputs)
+
+    assert len(embedder.calls) < len(inputs)
+    assert sorted(text for call in embedder.calls for text in call) == sorted(text for texts in inputs for text in texts)
+    for texts, vectors in zip(inputs, results):
+        assert [list(vector) for vector in vectors] == [list(vector) for vector in embedder.embedder(texts)]
+
+
+def test_batch_size_is_bounded():
+    embedder = RecordingEmbedder()
+    batcher = BatchingEmbeddingFunction(embedder, max_batch_size=2, max_wait_ms=200)
+
+    call_concurrently(batcher, [[f"query {index}"] for index in range(6)])
+
+    assert max(len(call) for call in embedder.calls) <= 2
+
+
+def test_failure_reaches_every_caller_of_the_batch():
+    batcher = BatchingEmbeddingFunction(RecordingEmbedder(fail=True), max_batch_size=32, max_wait_ms=50)
+
+    results = call_concurrently(batcher, [["a"], ["b"]])
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    with pytest.raises(RuntimeError):
+        batcher(["c"])
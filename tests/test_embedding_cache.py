@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from app.vector_store.embedding_cache import CachedEmbeddingFunction, EmbeddingCache
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, texts):
+        self.texts.extend(texts)
+        return [np.full(4, len(text), dtype=np.float32) for text in texts]
+
+
+def vector(value):
+    return np.full(4, value, dtype=np.float32)
+
+
+def test_only_missing_texts_are_embedded():
+    embedder = CountingEmbedder()
+    cached = CachedEmbeddingFunction(embedder, EmbeddingCache(max_entries=10), model_name="model")
+
+    cached(["a", "bb"])
+    vectors = cached(["bb", "ccc", "ccc"])
+
+    assert embedder.texts == ["a", "bb", "ccc"]
+    assert [float(vector[0]) for vector in vectors] == [2.0, 3.0, 3.0]
+
+
+def test_keys_depend_on_the_model():
+    assert EmbeddingCache.make_key("model-a", "text") != EmbeddingCache.make_key("model-b", "text")
+
+
+def test_disk_writes_are_batched(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(max_entries=10, disk_path=path, commit_batch_size=3, commit_interval_seconds=60)
+    reader = EmbeddingCache(max_entries=0, disk_path=path)
+
+    cache.put_many({"a": vector(1), "b": vector(2)})
+    assert reader.get_many(["a", "b"]) == {}
+    # Not on disk yet, but served to this process
+    assert sorted(cache.get_many(["a", "b"])) == ["a", "b"]
+
+    cache.put_many({"c": vector(3)})
+    assert sorted(reader.get_many(["a", "b", "c"])) == ["a", "b", "c"]
+
+
+def test_flush_writes_the_rest(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(max_entries=10, disk_path=path, commit_batch_size=100, commit_interval_seconds=60)
+    cache.put_many({"a": vector(1)})
+
+    cache.flush()
+
+    found = EmbeddingCache(max_entries=0, disk_path=path).get_many(["a"])
+    assert found["a"].tolist() == vector(1).tolist()
+
+
+def test_disk_tier_outlives_memory_eviction(tmp_path):
+    cache = EmbeddingCache(max_entries=1, disk_path=str(tmp_path / "cache.sqlite3"), commit_batch_size=1)
+    cache.put_many({"a": vector(1)})
+    cache.put_many({"b": vector(2)})
+
+    assert sorted(cache.get_many(["a", "b"])) == ["a", "b"]
+    assert cache.stats() == {"hits": 2, "misses": 0, "memory_entries": 1}
+
+
+def test_custom_embedding_function_needs_a_model_name(chroma_client):
+    from app.vector_store.chroma_vector_store import ChromaVectorStore
+
+    with pytest.raises(ValueError):
+        ChromaVectorStore(client=chroma_client, embedding_function=CountingEmbedder())
+    store = ChromaVectorStore(client=chroma_client, embedding_function=CountingEmbedder(), model_name="counting")
+    assert store.model_name == "counting"
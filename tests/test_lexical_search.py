@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from app.vector_store.lexical_index import LexicalIndex, query_terms, tokenize
+
+
+def test_tokenize_splits_identifiers():
+    assert tokenize("RedisSubscriber handles HTTPServer") == [
+        "redissubscriber", "redis", "subscriber", "handles", "httpserver", "http", "server"
+    ]
+    assert query_terms("docker-compose.yml")[-1] == "docker-compose.yml"
+
+
+def test_file_name_match_ranks_first(store):
+    store.add_dictionary("project", {
+        "app/docker-compose.yml": "services and networks",
+        "README.md": "run docker compose up to start the services",
+    })
+
+    results = store.search("docker-compose.yml", 2, "project", mode="lexical")
+
+    assert results[0]["metadata"]["source"] == "app/docker-compose.yml"
+
+
+@pytest.mark.parametrize("mode", ["lexical", "hybrid", "auto"])
+def test_scored_results_never_carry_a_distance(store, mode):
+    store.add_dictionary("project", {f"src/module{index}.py": f"alpha helper {index}" for index in range(10)})
+
+    results = store.search("alpha module3", 5, "project", mode=mode)
+
+    assert results
+    assert all("score" in result and "distance" not in result for result in results)
+    assert [result["score"] for result in results] == sorted((result["score"] for result in results), reverse=True)
+
+
+def test_writes_reach_a_built_index(store):
+    store.add_dictionary("project", {"a.py": "alpha"})
+    assert len(store.search("beta", 5, "project", mode="lexical")) == 0
+
+    store.sync_dictionary("project", {"b.py": "beta"})
+
+    assert [result["metadata"]["source"] for result in store.search("beta", 5, "project", mode="lexical")] == ["b.py"]
+
+
+def test_scoring_one_collection_does_not_block_another():
+    index = LexicalIndex()
+    busy = index.ensure("busy", lambda: [("1", "a.py", "alpha")])
+    other = index.ensure("other", lambda: [("1", "b.py", "beta")])
+    searched = threading.Event()
+
+    with busy.lock:
+        thread = threading.Thread(target=lambda: (index.add("other", [("2", "c.py", "beta")]),
+                                                  index.search(other, "beta", 5), searched.set()))
+        thread.start()
+        assert searched.wait(timeout=5)
+    thread.join()
+    assert len(index.search(other, "beta", 5)) == 2
@@ -0,0 +1,78 @@
+import pytest
+
+from app.vector_store.path_filters import build_where, path_metadata
+
+
+def sources(results):
+    return sorted(result["metadata"]["source"] for result in results)
+
+
+def test_build_where_without_filters():
+    assert build_where(None) is None
+    assert build_where({}) is None
+    assert build_where({"path_prefix": "/"}) is None
+
+
+def test_build_where_single_filters():
+    assert build_where({"path_prefix": "src/app/"}) == {"dir_2": "src/app"}
+    assert build_where({"path_prefix": "/workspace/p"}) == {"dir_2": "/workspace/p"}
+    assert build_where({"directory": "src\\app"}) == {"directory": "src/app"}
+    assert build_where({"directory": ""}) == {"directory": ""}
+    assert build_where({"extension": "PY"}) == {"extension": ".py"}
+    assert build_where({"extension": ["py", ".pyi"]}) == {"extension": {"$in": [".py", ".pyi"]}}
+    assert build_where({"max_depth": 0}) == {"depth": {"$lte": 0}}
+
+
+def test_build_where_combines_filters():
+    assert build_where({"path_prefix": "src", "extension": ".py"}) == {"$and": [{"dir_1": "src"}, {"extension": ".py"}]}
+
+
+def test_build_where_rejects_unknown_filters():
+    with pytest.raises(ValueError):
+        build_where({"owner": "alice"})
+
+
+def test_path_metadata_is_relative_to_the_base_path():
+    assert path_metadata("/workspace/p/src/app/a.py", "/workspace/p/") == {
+        "directory": "src/app", "extension": ".py", "depth": 2, "dir_1": "src", "dir_2": "src/app"
+    }
+    # Sources outside the base path keep their own components
+    assert path_metadata("/other/a.py", "/workspace/p")["dir_1"] == "/other"
+
+
+def test_filters_are_relative_to_the_collection_base_path(store):
+    store.create_collection("project", base_path="/workspace/p")
+    store.add_dictionary("project", {
+        "/workspace/p/src/a.py": "alpha",
+        "/workspace/p/src/app/b.py": "alpha",
+        "/workspace/p/top.md": "alpha",
+    })
+
+    assert sources(store.search("alpha", 10, "project", filters={"path_prefix": "src"})) == \
+        ["/workspace/p/src/a.py", "/workspace/p/src/app/b.py"]
+    assert sources(store.search("alpha", 10, "project", filters={"max_depth": 0})) == ["/workspace/p/top.md"]
+    assert sources(store.search("alpha", 10, "project", filters={"extension": ".md"}, mode="lexical")) == \
+        ["/workspace/p/top.md"]
+
+
+def test_relative_prefix_without_base_path_matches_nothing(store):
+    # Created implicitly by the first add, so without a base path
+    store.add_dictionary("project", {"/workspace/p/src/a.py": "alpha", "/workspace/p/b.py": "alpha"})
+
+    assert store.search("alpha", 10, "project", filters={"path_prefix": "src"}) == []
+    assert sources(store.search("alpha", 10, "project", filters={"path_prefix": "/workspace/p/src"})) == \
+        ["/workspace/p/src/a.py"]
+
+
+def test_backfill_adds_path_metadata_without_reembedding(store):
+    collection = store.create_collection("legacy")
+    collection.add(ids=["u1", "u2"], documents=["alpha", "alpha beta"],
+                   metadatas=[{"source": "lib/x.py"}, {"source": "doc/y.md"}])
+    assert store.search("alpha", 10, "legacy", filters={"extension": ".py"}) == []
+    embeddings = collection.get(include=["embeddings"])["embeddings"]
+
+    assert store.backfill_path_metadata("legacy") == 2
+    assert store.backfill_path_metadata("legacy") == 0
+
+    assert sources(store.search("alpha", 10, "legacy", filters={"extension": ".py"})) == ["lib/x.py"]
+    assert (collection.get(include=["embeddings"])["embeddings"] == embeddings).all()
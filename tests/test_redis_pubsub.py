@@ -0,0 +1,82 @@
+import json
+
+import pytest
+import redis
+
+from app.messaging.redis_pubsub import BufferedRedisPublisher
+
+
+class FlakyPipelines:
+    """Wraps a client's pipeline() so the next `failures` executions raise a connection error"""
+
+    def __init__(self, client, failures):
+        self.pipeline = client.pipeline
+        self.failures = failures
+
+    def __call__(self, *args, **kwargs):
+        pipeline = self.pipeline(*args, **kwargs)
+        execute = pipeline.execute
+
+        def flaky_execute():
+            if self.failures > 0:
+                self.failures -= 1
+                raise redis.exceptions.ConnectionError("connection lost")
+            return execute()
+        pipeline.execute = flaky_execute
+        return pipeline
+
+
+@pytest.fixture
+def publisher(fake_redis):
+    # A long interval keeps the background flusher out of the way; the tests flush explicitly
+    publisher = BufferedRedisPublisher(flush_interval_ms=60000, max_batch_size=1000, max_attempts=3)
+    yield publisher
+    publisher._closed.set()
+    publisher._pending.set()
+
+
+def read(client, channel):
+    return [json.loads(data) for data in client.lrange(channel, 0, -1)]
+
+
+def test_flush_pushes_buffered_messages_in_order(publisher, fake_redis):
+    for index in range(3):
+        publisher.publish("responses", {"index": index})
+
+    assert publisher.flush()
+    assert read(fake_redis, "responses") == [{"index": 0}, {"index": 1}, {"index": 2}]
+
+
+def test_failed_flush_keeps_messages_ahead_of_newer_ones(publisher, fake_redis):
+    publisher.redis_client.pipeline = FlakyPipelines(publisher.redis_client, failures=1)
+    publisher.publish("responses", {"index": 0})
+
+    assert not publisher.flush()
+    publisher.publish("responses", {"index": 1})
+    assert publisher.flush()
+
+    assert read(fake_redis, "responses") == [{"index": 0}, {"index": 1}]
+
+
+def test_messages_are_dropped_after_max_attempts(publisher, fake_redis):
+    publisher.redis_client.pipeline = FlakyPipelines(publisher.redis_client, failures=3)
+    publisher.publish("responses", {"index": 0})
+
+    assert not publisher.flush()
+    assert not publisher.flush()
+    assert publisher.flush()
+
+    assert publisher._buffer == []
+    publisher.publish("responses", {"index": 1})
+    assert publisher.flush()
+    assert read(fake_redis, "responses") == [{"index": 1}]
+
+
+def test_close_retries_a_failed_flush(fake_redis):
+    publisher = BufferedRedisPublisher(flush_interval_ms=60000, max_attempts=3)
+    publisher.redis_client.pipeline = FlakyPipelines(publisher.redis_client, failures=1)
+    publisher.publish("responses", {"index": 0})
+
+    publisher.close()
+
+    assert read(fake_redis, "responses") == [{"index": 0}]
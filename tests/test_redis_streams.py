@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from app.config import Config
+from app.messaging.redis_streams import RedisStreamPublisher, RedisStreamSubscriber
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+@pytest.fixture(autouse=True)
+def fast_claiming(monkeypatch):
+    monkeypatch.setattr(Config, "STREAM_CLAIM_IDLE_MS", 50)
+    monkeypatch.setattr(Config, "STREAM_CLAIM_INTERVAL_SECONDS", 0.02)
+
+
+@pytest.fixture
+def subscribers():
+    started = []
+
+    def start(callback, **kwargs):
+        subscriber = RedisStreamSubscriber(group="workers", consumer=f"consumer-{len(started)}")
+        subscriber.start("requests", callback, **kwargs)
+        started.append(subscriber)
+        return subscriber
+    yield start
+    for subscriber in started:
+        subscriber.stop()
+
+
+def pending(client):
+    return client.xpending("requests", "workers")["pending"]
+
+
+def test_failed_entry_is_claimed_and_acknowledged(fake_redis, subscribers):
+    RedisStreamPublisher().publish("requests", {"request_id": "r0"})
+    attempts = []
+
+    def handle(message):
+        attempts.append(message["request_id"])
+        if len(attempts) == 1:
+            raise RuntimeError("transient failure")
+
+    subscribers(handle)
+
+    wait_until(lambda: len(attempts) == 2 and pending(fake_redis) == 0)
+    assert attempts == ["r0", "r0"]
+
+
+def test_entries_in_progress_are_not_claimed_again(fake_redis, subscribers):
+    publisher = RedisStreamPublisher()
+    for index in range(3):
+        publisher.publish("requests", {"request_id": f"r{index}", "collection_name": f"c{index}"})
+    handled = []
+    lock = threading.Lock()
+
+    def handle(message):
+        # Runs far longer than STREAM_CLAIM_IDLE_MS, so the entries look stale while in progress
+        time.sleep(0.3)
+        with lock:
+            handled.append(message["request_id"])
+
+    subscribers(handle, workers=2, partition_key=lambda message: message.get("collection_name"))
+
+    wait_until(lambda: len(handled) == 3 and pending(fake_redis) == 0)
+    time.sleep(0.2)
+    assert sorted(handled) == ["r0", "r1", "r2"]
+
+
+def test_entry_failing_on_every_delivery_is_dropped(fake_redis, subscribers, monkeypatch):
+    monkeypatch.setattr(Config, "STREAM_MAX_DELIVERIES", 2)
+    RedisStreamPublisher().publish("requests", {"request_id": "poison"})
+    attempts = []
+
+    def handle(message):
+        attempts.append(message["request_id"])
+        raise RuntimeError("permanent failure")
+
+    subscribers(handle)
+
+    wait_until(lambda: len(attempts) == 2 and pending(fake_redis) == 0)
+    time.sleep(0.2)
+    assert attempts == ["poison", "poison"]
+
+
+def test_another_consumer_takes_over_entries_of_a_dead_one(fake_redis, subscribers):
+    RedisStreamPublisher().publish("requests", {"request_id": "r0"})
+    fake_redis.xgroup_create("requests", "workers", id="0")
+    # Read by a consumer that dies before acknowledging
+    fake_redis.xreadgroup("workers", "dead", {"requests": ">"}, count=1)
+    handled = []
+
+    subscribers(lambda message: handled.append(message["request_id"]))
+
+    wait_until(lambda: handled == ["r0"] and pending(fake_redis) == 0)
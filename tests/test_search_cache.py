@@ -0,0 +1,86 @@
+from app.vector_store.search_cache import SearchResultCache
+
+
+def test_write_invalidates_cached_results(store):
+    store.add_dictionary("project", {"a.py": "alpha beta"})
+    assert len(store.search("alpha", 10, "project")) == 1
+    assert len(store.search("alpha", 10, "project")) == 1
+    assert store.search_cache_stats()["hits"] == 1
+
+    store.add_dictionary("project", {"b.py": "alpha gamma"})
+
+    assert len(store.search("alpha", 10, "project")) == 2
+
+
+def test_sync_and_delete_invalidate_cached_results(store):
+    store.sync_dictionary("project", {"a.py": "alpha"})
+    assert len(store.search("alpha", 10, "project")) == 1
+
+    store.sync_dictionary("project", {"b.py": "alpha"})
+    assert len(store.search("alpha", 10, "project")) == 2
+
+    store.delete_collection("project")
+    store.create_collection("project")
+    assert store.search("alpha", 10, "project") == []
+
+
+def test_cached_results_are_copies(store):
+    store.add_dictionary("project", {"a.py": "alpha"})
+    store.search("alpha", 10, "project")[0]["document"] = "changed"
+
+    assert store.search("alpha", 10, "project")[0]["document"] == "alpha"
+
+
+def test_result_of_a_search_overlapping_a_write_is_not_cached():
+    cache = SearchResultCache()
+    generation = cache.generation("project")
+    # The write lands while the search runs
+    cache.invalidate("project")
+
+    cache.put("project", "query", ["stale"], generation)
+
+    assert cache.get("project", "query") is None
+
+
+def test_result_of_a_search_overlapping_a_delete_is_not_cached():
+    cache = SearchResultCache()
+    generation = cache.generation("project")
+    # Forgetting drops the counter, so the collection's generation is back at its start value
+    cache.forget("project")
+
+    cache.put("project", "query", ["stale"], generation)
+
+    assert cache.get("project", "query") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_forget_drops_entries_and_generation():
+    cache = SearchResultCache()
+    cache.put("project", "query", ["result"], cache.generation("project"))
+    cache.invalidate("project")
+
+    cache.forget("project")
+
+    assert cache.stats()["entries"] == 0
+    assert "project" not in cache._generations
+
+
+def test_byte_budget_evicts_least_recently_used():
+    entry = ["x" * 1000]
+    cache = SearchResultCache(max_entries=100, max_bytes=2500)
+    for query in ("first", "second", "third"):
+        cache.put("project", query, entry, cache.generation("project"))
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= 2500
+    assert cache.get("project", "first") is None
+    assert cache.get("project", "third") == entry
+
+
+def test_entry_larger_than_the_budget_is_not_cached():
+    cache = SearchResultCache(max_bytes=100)
+
+    cache.put("project", "query", ["x" * 1000], cache.generation("project"))
+
+    assert cache.stats() == {"hits": 0, "misses": 0, "entries": 0, "bytes": 0}
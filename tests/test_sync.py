@@ -0,0 +1,34 @@
+def test_sync_counts_each_outcome(store):
+    first = store.sync_dictionary("project", {"a.py": "alpha", "b.py": "beta"})
+    assert first == {"added": 2, "updated": 0, "unchanged": 0, "removed": 0}
+
+    second = store.sync_dictionary("project", {"a.py": "alpha", "b.py": "beta changed", "c.py": "gamma"})
+    assert second == {"added": 1, "updated": 1, "unchanged": 1, "removed": 0}
+
+
+def test_sync_removes_missing_sources(store):
+    store.sync_dictionary("project", {"a.py": "alpha", "b.py": "beta", "c.py": "gamma"})
+
+    counts = store.sync_dictionary("project", {"a.py": "alpha"}, remove_missing=True)
+
+    assert counts == {"added": 0, "updated": 0, "unchanged": 1, "removed": 2}
+    assert store.get_collection("project").get()["ids"] == ["a.py"]
+
+
+def test_sync_uses_sources_as_ids(store):
+    store.sync_dictionary("project", {"a.py": "alpha"})
+    store.sync_dictionary("project", {"a.py": "alpha again"})
+
+    items = store.get_collection("project").get(include=["documents", "metadatas"])
+    assert items["ids"] == ["a.py"]
+    assert items["documents"] == ["alpha again"]
+    assert items["metadatas"][0]["source"] == "a.py"
+
+
+def test_sync_by_source_reports_every_source(store):
+    store.sync_dictionary("project", {"a.py": "alpha", "b.py": "beta"})
+
+    outcomes = store.sync_dictionary_by_source("project", {"a.py": "alpha", "b.py": "beta 2", "c.py": "gamma"})
+
+    assert outcomes == {"a.py": "unchanged", "b.py": "updated", "c.py": "added"}
+    assert store.sync_counts(outcomes.values()) == {"added": 1, "updated": 1, "unchanged": 1, "removed": 0}